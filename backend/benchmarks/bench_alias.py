@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Độ trễ tìm alias: quét toàn bảng như trước (đọc mọi Alias + normalize_name) so với
+chỉ mục trong bộ nhớ (services/alias_index.py), có và không có lọc theo cận trên,
+kèm recall@k của bản lọc so với quét toàn bộ (phải là 1.0).
+
+    python -m backend.benchmarks.bench_alias --aliases 200000 --maps 4 --queries 200
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from rapidfuzz import fuzz, process
+from sqlmodel import Session, select
+
+from backend.benchmarks.synthetic import make_engine, populate_aliases
+from backend.models.entities import Alias
+from backend.services.alias_index import build_alias_index
+from backend.utils.norm import normalize_name
+
+
+def percentiles(samples_ms):
+    s = sorted(samples_ms)
+    p = lambda q: s[min(len(s) - 1, int(q * len(s)))]
+    return f"p50 {p(0.50):7.2f} ms  p99 {p(0.99):7.2f} ms  mean {statistics.mean(s):7.2f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--aliases", type=int, default=100_000)
+    ap.add_argument("--maps", type=int, default=1)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--full-scan-queries", type=int, default=10)
+    ap.add_argument("-k", type=int, default=5)
+    args = ap.parse_args()
+
+    engine = make_engine()
+    populate_aliases(engine, args.aliases, args.maps)
+    rnd = random.Random(3)
+
+    with Session(engine) as session:
+        names = [a for a in session.exec(select(Alias.name)).all()]
+        queries = []
+        for _ in range(args.queries):
+            name = rnd.choice(names)
+            # gõ dở (cắt ngắn tên) hoặc gõ sai 1 ký tự
+            if rnd.random() < 0.7:
+                queries.append(name[: rnd.randint(3, len(name))])
+            else:
+                i = rnd.randrange(len(name))
+                queries.append(name[:i] + rnd.choice("abcdefghik") + name[i + 1 :])
+
+        t0 = time.perf_counter()
+        idx = build_alias_index(session, None)
+        print(f"{len(idx)} alias, dựng chỉ mục {(time.perf_counter() - t0) * 1000.0:.0f} ms")
+
+        old = []
+        for q in queries[: args.full_scan_queries]:
+            t0 = time.perf_counter()
+            items = session.exec(select(Alias)).all()
+            norm_map = {a.id: normalize_name(a.name) for a in items}
+            process.extract(normalize_name(q), norm_map, scorer=fuzz.token_set_ratio, limit=args.k)
+            old.append((time.perf_counter() - t0) * 1000.0)
+        print(f"quét toàn bảng : {percentiles(old)}")
+
+    exhaustive, exh_res = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        exh_res.append(idx.search_exhaustive(normalize_name(q), args.k))
+        exhaustive.append((time.perf_counter() - t0) * 1000.0)
+    print(f"chỉ mục (quét) : {percentiles(exhaustive)}")
+
+    t0 = time.perf_counter()
+    idx.search("warmup", args.k)  # dựng chỉ mục cận trên (token, bitmask ký tự)
+    print(f"dựng cận trên  : {(time.perf_counter() - t0) * 1000.0:.0f} ms")
+
+    pre, pre_res = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        pre_res.append(idx.search(normalize_name(q), args.k))
+        pre.append((time.perf_counter() - t0) * 1000.0)
+    print(f"chỉ mục (lọc)  : {percentiles(pre)}")
+
+    # recall@k theo alias; 'cùng điểm' tính cả trường hợp hoà điểm khác thứ tự
+    hit = sum(len({p for p, _ in a} & {p for p, _ in b}) for a, b in zip(exh_res, pre_res))
+    total = sum(len(a) for a in exh_res)
+    same_scores = sum(1 for a, b in zip(exh_res, pre_res) if [s for _, s in a] == [s for _, s in b])
+    print(f"recall@{args.k}: {hit / max(total, 1):.4f}, cùng dãy điểm top-{args.k}: {same_scores}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
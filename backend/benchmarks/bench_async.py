@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Thông lượng /route, /nl-route, /aliases/search khi nhiều request đồng thời: handler
+sync (threadpool + Session mỗi request) so với chế độ async (snapshot trong bộ nhớ,
+trượt thì aiosqlite). Gọi app trực tiếp qua ASGI (httpx.ASGITransport), không qua mạng.
+Dòng "map vừa sửa" đo các request đầu tiên sau một lần sửa map: snapshot trượt,
+chế độ async đọc lại DB qua AsyncSession.
+
+    python -m backend.benchmarks.bench_async --rows 60 --cols 60 --requests 3000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+# engine của app đọc URL lúc import -> đặt trước khi import backend
+os.environ["WAYFINDER_DB_URL"] = "sqlite:///" + tempfile.mktemp(suffix=".db", prefix="wayfinder_bench_")
+
+import httpx
+from fastapi import FastAPI
+from sqlmodel import Session, select
+
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.core.db import DB_URL
+from backend.models.entities import Alias, Node
+from backend.routers import aliases, async_routes, routes
+from backend.services.graph_cache import bump_map_version
+from backend.services.route_cache import resolve_cache, route_cache
+from backend.services.snapshots import serving_stats, warm_snapshots
+
+
+def make_app(mode: str) -> FastAPI:
+    app = FastAPI()
+    if mode == "async":
+        app.include_router(async_routes.router)
+    app.include_router(routes.router)
+    app.include_router(aliases.router, prefix="/aliases")
+    return app
+
+
+async def run(app: FastAPI, reqs, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(method, url, kw):
+            async with sem:
+                r = await client.request(method, url, **kw)
+                assert r.status_code == 200, r.text
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(*r) for r in reqs))
+        return time.perf_counter() - t0
+
+
+async def compare(reqs, concurrency: int, map_id=None) -> str:
+    line = []
+    for mode in ("sync", "async"):
+        route_cache.clear()
+        resolve_cache.clear()
+        if map_id is not None:
+            bump_map_version(map_id)
+        secs = await run(make_app(mode), reqs, concurrency)
+        line.append(f"{mode} {len(reqs) / secs:8.0f} req/s")
+    return " | ".join(line)
+
+
+async def bench(reqs, map_id: int, cold: int) -> None:
+    # cùng một event loop cho mọi lần đo (AsyncEngine và lock của serve gắn với loop)
+    for concurrency in (1, 16, 64):
+        print(f"đồng thời {concurrency:3d}: " + await compare(reqs, concurrency))
+    print(f"map vừa sửa ({cold} request đầu, đồng thời 16): " + await compare(reqs[:cold], 16, map_id))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=60)
+    ap.add_argument("--cols", type=int, default=60)
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--pairs", type=int, default=300, help="số cặp (start, end) khác nhau")
+    ap.add_argument("--cold", type=int, default=200, help="số request đo ngay sau khi sửa map")
+    args = ap.parse_args()
+
+    engine = make_engine(DB_URL[len("sqlite:///"):])
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh")
+
+    with Session(engine) as session:
+        node_ids = session.exec(select(Node.id).where(Node.map_id == map_id)).all()
+        names = session.exec(select(Alias.name).limit(200)).all()
+    rnd = random.Random(11)
+    pairs = [tuple(rnd.sample(node_ids, 2)) for _ in range(args.pairs)]
+    reqs = []
+    for k in range(args.requests):
+        kind = k % 4
+        if kind < 2:
+            s, t = rnd.choice(pairs)
+            reqs.append(("POST", "/route", {"json": {"map_id": map_id, "start_id": s, "end_id": t}}))
+        elif kind == 2:
+            a, b = rnd.sample(names, 2)
+            reqs.append(("GET", "/nl-route", {"params": {"map_id": map_id, "q": f"từ {a} đến {b}"}}))
+        else:
+            reqs.append(("GET", "/aliases/search", {"params": {"q": rnd.choice(names)[:6], "map_id": map_id}}))
+
+    warm_snapshots()
+    asyncio.run(bench(reqs, map_id, args.cold))
+    print("async:", serving_stats())
+
+
+if __name__ == "__main__":
+    main()
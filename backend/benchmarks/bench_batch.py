@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+So sánh tìm đường hàng loạt (iter_batch_routes, một cây Dijkstra cho mỗi nguồn)
+với gọi compute_route lần lượt cho từng cặp, trên map lưới tổng hợp.
+
+    python -m backend.benchmarks.bench_batch --rows 100 --cols 100 --sources 5 --targets 40
+"""
+
+import argparse
+import random
+import time
+
+from sqlmodel import Session, select
+
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.models.entities import Node
+from backend.routers.routes import compute_route, iter_batch_routes
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100)
+    ap.add_argument("--cols", type=int, default=100)
+    ap.add_argument("--sources", type=int, default=5)
+    ap.add_argument("--targets", type=int, default=40, help="số đích cho mỗi nguồn")
+    args = ap.parse_args()
+
+    engine = make_engine()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh")
+
+    with Session(engine) as session:
+        node_ids = session.exec(select(Node.id).where(Node.map_id == map_id)).all()
+    rnd = random.Random(3)
+    pairs = [
+        (s, rnd.choice(node_ids))
+        for s in rnd.sample(node_ids, args.sources)
+        for _ in range(args.targets)
+    ]
+
+    with Session(engine) as session:
+        # làm ấm cache (CSR, bảng tên, landmark) để chỉ đo phần tìm đường
+        compute_route(session, map_id, pairs[0][0], pairs[0][1], "dijkstra")
+
+        t0 = time.perf_counter()
+        single = [compute_route(session, map_id, s, t, "dijkstra") for s, t in pairs]
+        single_ms = (time.perf_counter() - t0) * 1000.0
+
+        t0 = time.perf_counter()
+        batch = list(iter_batch_routes(session, map_id, pairs))
+        batch_ms = (time.perf_counter() - t0) * 1000.0
+
+    by_index = {item.index: item.route for item in batch}
+    same = sum(
+        1 for i, r in enumerate(single) if abs(by_index[i].length_px - r.length_px) < 1e-6
+    )
+    n = len(pairs)
+    print(f"{n} cặp, {args.sources} nguồn")
+    print(f"từng cặp (compute_route): {single_ms:9.1f} ms  ({single_ms / n:.2f} ms/cặp)")
+    print(f"batch (cây mỗi nguồn)   : {batch_ms:9.1f} ms  ({batch_ms / n:.2f} ms/cặp)")
+    print(f"cùng độ dài: {same}/{n}")
+
+
+if __name__ == "__main__":
+    main()
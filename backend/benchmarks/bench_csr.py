@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+So sánh engine CSR với networkx trên map lưới tổng hợp.
+
+    python -m backend.benchmarks.bench_csr --rows 200 --cols 250 --queries 200
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+import networkx as nx
+from sqlmodel import Session
+
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.services.csr import build_csr_for_map
+from backend.services.graph import build_graph_for_map
+
+
+def measure_build(fn):
+    # thời gian đo riêng, vì tracemalloc làm chậm việc cấp phát
+    gc.collect()
+    t0 = time.perf_counter()
+    fn()
+    ms = (time.perf_counter() - t0) * 1000.0
+    gc.collect()
+    tracemalloc.start()
+    obj = fn()
+    cur, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, ms, cur
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--cols", type=int, default=250)
+    ap.add_argument("--queries", type=int, default=200)
+    args = ap.parse_args()
+
+    engine = make_engine()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh")
+
+    with Session(engine) as session:
+        (G, node_pos), nx_ms, nx_bytes = measure_build(lambda: build_graph_for_map(session, map_id))
+    with Session(engine) as session:
+        g, csr_ms, csr_bytes = measure_build(lambda: build_csr_for_map(session, map_id))
+
+    per = 100_000 / max(n_edges, 1)
+    print(f"dựng networkx : {nx_ms:8.1f} ms, {nx_bytes * per / 2**20:8.1f} MiB / 100k cạnh")
+    print(f"dựng csr      : {csr_ms:8.1f} ms, {csr_bytes * per / 2**20:8.1f} MiB / 100k cạnh")
+
+    rnd = random.Random(1)
+    ids = list(g.index)
+    pairs = [(rnd.choice(ids), rnd.choice(ids)) for _ in range(args.queries)]
+
+    t0 = time.perf_counter()
+    nx_paths = [nx.shortest_path(G, s, t, weight="weight") for s, t in pairs]
+    nx_q = (time.perf_counter() - t0) * 1000.0 / len(pairs)
+
+    t0 = time.perf_counter()
+    csr_paths = []
+    for s, t in pairs:
+        path_idx, _arcs, _settled = g.dijkstra(g.index[s], g.index[t])
+        csr_paths.append([g.node_ids[i] for i in path_idx])
+    csr_q = (time.perf_counter() - t0) * 1000.0 / len(pairs)
+
+    same = sum(1 for a, b in zip(nx_paths, csr_paths) if a == b)
+    same_cost = sum(
+        1
+        for a, b in zip(nx_paths, csr_paths)
+        if abs(nx.path_weight(G, a, "weight") - nx.path_weight(G, b, "weight")) < 1e-6
+    )
+    print(f"truy vấn networkx: {nx_q:8.2f} ms/query")
+    print(f"truy vấn csr     : {csr_q:8.2f} ms/query  (x{nx_q / csr_q:.1f})")
+    print(f"cùng path_node_ids: {same}/{len(pairs)}, cùng chi phí: {same_cost}/{len(pairs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Edge.polyline dạng JSON (cột cũ) so với blob float64 Edge.polyline_xy trên một map
+lưới lớn: cỡ trung bình của cột polyline mỗi hàng, cỡ file DB (sau VACUUM), thời
+gian chuyển đổi (migrate_edge_polylines, rồi clear_legacy_polylines), và thời gian đọc lên:
+  - dựng CSR từ DB (như build_csr_for_map),
+  - giải mã polyline của mọi cạnh như GET /edges (list điểm và format=encoded).
+
+    python -m backend.benchmarks.bench_edge_storage --rows 200 --cols 250
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# engine của app đọc URL lúc import -> đặt trước khi import backend
+os.environ["WAYFINDER_DB_URL"] = "sqlite:///" + tempfile.mktemp(suffix=".db", prefix="wayfinder_bench_")
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from backend.benchmarks.synthetic import populate_grid
+from backend.core.db import DB_URL, clear_legacy_polylines, engine, init_db, migrate_edge_polylines
+from backend.models.entities import Node
+from backend.services.csr import build_csr, build_csr_for_map
+from backend.utils.polyline import encode_polyline_blobs, encode_polylines, unpack_polyline, unpack_polylines
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def storage(column: str):
+    """(byte trung bình của cột mỗi hàng, cỡ file DB MB sau VACUUM)."""
+    with engine.connect() as conn:
+        avg = conn.execute(text(f"SELECT avg(length({column})) FROM edge")).scalar()
+        conn.execute(text("VACUUM"))
+    return avg, os.path.getsize(DB_URL[len("sqlite:///") :]) / 1024 / 1024
+
+
+def csr_from_json(session: Session, map_id: int):
+    # cách cũ của build_csr_for_map: json.loads từng hàng
+    nodes = session.exec(select(Node.id, Node.x, Node.y, Node.floor).where(Node.map_id == map_id)).all()
+    edges = session.execute(
+        text("SELECT id, start_node_id, end_node_id, weight, polyline FROM edge WHERE map_id = :m AND kind = 'walk'"),
+        {"m": map_id},
+    ).all()
+    return build_csr(nodes, ((eid, u, v, w, json.loads(p)) for eid, u, v, w, p in edges))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--cols", type=int, default=250)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    init_db()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh")
+
+    # đưa DB về dạng cũ: JSON trong Edge.polyline, polyline_xy rỗng
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, polyline_xy FROM edge")).all()
+        conn.execute(
+            text("UPDATE edge SET polyline = :p, polyline_xy = NULL WHERE id = :id"),
+            [{"id": eid, "p": json.dumps(unpack_polyline(xy))} for eid, xy in rows],
+        )
+
+    with Session(engine) as session:
+        texts = [r[0] for r in session.execute(text("SELECT polyline FROM edge")).all()]
+        j_row, j_db = storage("polyline")
+        g_json = csr_from_json(session, map_id)
+        j_csr = best_of(lambda: csr_from_json(session, map_id), args.repeat)
+        j_list = best_of(lambda: [json.loads(t) for t in texts], args.repeat)
+        j_enc = best_of(lambda: encode_polylines([json.loads(t) for t in texts]), args.repeat)
+
+        t0 = time.perf_counter()
+        moved = migrate_edge_polylines()
+        mig = time.perf_counter() - t0
+        # cỡ cột / file dưới đây là sau bước xoá JSON cũ (gọi tay, không chạy lúc khởi động)
+        t0 = time.perf_counter()
+        clear_legacy_polylines()
+        clear = time.perf_counter() - t0
+
+        blobs = [r[0] for r in session.execute(text("SELECT polyline_xy FROM edge")).all()]
+        b_row, b_db = storage("polyline_xy")
+        b_csr = best_of(lambda: build_csr_for_map(session, map_id), args.repeat)
+        b_list = best_of(lambda: unpack_polylines(blobs), args.repeat)
+        b_enc = best_of(lambda: encode_polyline_blobs(blobs), args.repeat)
+        # float64 giữ nguyên toạ độ: CSR dựng từ blob trùng với CSR từ JSON gốc
+        assert build_csr_for_map(session, map_id).poly_xy == g_json.poly_xy
+
+    print(f"chuyển {moved} hàng JSON -> blob: {mig:.2f} s, xoá JSON cũ: {clear:.2f} s")
+    print(f"{'':26s} {'JSON':>10s} {'blob':>10s}")
+    print(f"{'cột polyline / hàng (B)':26s} {j_row:10.1f} {b_row:10.1f}")
+    print(f"{'file DB (MB)':26s} {j_db:10.1f} {b_db:10.1f}")
+    print(f"{'dựng CSR từ DB (ms)':26s} {j_csr:10.1f} {b_csr:10.1f}")
+    print(f"{'giải mã list điểm (ms)':26s} {j_list:10.1f} {b_list:10.1f}")
+    print(f"{'format=encoded (ms)':26s} {j_enc:10.1f} {b_enc:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
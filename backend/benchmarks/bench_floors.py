@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tìm đường nhiều tầng (services/floors.py) trên toà nhà tổng hợp: mỗi tầng là một
+lưới rows x cols, tầng kề nhau nối bằng cầu thang + thang máy. Đo thời gian truy vấn
+lạnh/ấm và số tầng thực sự được nạp khi đi giữa hai tầng gần nhau.
+
+    python -m backend.benchmarks.bench_floors --rows 60 --cols 60 --floors 20
+"""
+
+import argparse
+import random
+import time
+
+from sqlmodel import Session, select
+
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.models.entities import Node
+from backend.routers.routes import compute_route
+from backend.services.floors import get_floor_overlay
+from backend.services.graph_cache import bump_map_version
+from backend.services.route_cache import route_cache
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=60)
+    ap.add_argument("--cols", type=int, default=60)
+    ap.add_argument("--floors", type=int, default=20)
+    ap.add_argument("--queries", type=int, default=50)
+    args = ap.parse_args()
+
+    engine = make_engine()
+    t0 = time.perf_counter()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols, floors=args.floors)
+    print(
+        f"{args.floors} tầng x lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh "
+        f"({(time.perf_counter() - t0):.1f} s sinh dữ liệu)"
+    )
+
+    with Session(engine) as session:
+        by_floor = {}
+        for nid, floor in session.exec(select(Node.id, Node.floor).where(Node.map_id == map_id)):
+            by_floor.setdefault(floor, []).append(nid)
+    rnd = random.Random(5)
+
+    def pairs(gap):
+        out = []
+        for _ in range(args.queries):
+            f = rnd.randint(1, args.floors - gap)
+            out.append((rnd.choice(by_floor[f]), rnd.choice(by_floor[f + gap])))
+        return out
+
+    with Session(engine) as session:
+        for gap in (1, args.floors // 2, args.floors - 1):
+            if gap < 1:
+                continue
+            qs = pairs(gap)
+            bump_map_version(map_id)
+            route_cache.clear()
+            t0 = time.perf_counter()
+            compute_route(session, map_id, qs[0][0], qs[0][1], "dijkstra")
+            cold_ms = (time.perf_counter() - t0) * 1000.0
+            loaded = len(get_floor_overlay(session, map_id).floors_loaded)
+
+            t0 = time.perf_counter()
+            for s, t in qs[1:]:
+                compute_route(session, map_id, s, t, "dijkstra")
+            warm_ms = (time.perf_counter() - t0) * 1000.0 / max(len(qs) - 1, 1)
+            route_cache.clear()
+            print(
+                f"cách {gap:2d} tầng: truy vấn đầu {cold_ms:8.1f} ms (nạp {loaded}/{args.floors} tầng), "
+                f"sau đó {warm_ms:6.2f} ms/truy vấn"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Hậu xử lý polyline của một tuyến dài (mặc định 5000 đỉnh): các hàm list/tuple cũ
+trong utils/geo.py (ghép, dedupe, độ dài, góc rẽ từng đỉnh) so với kernel vector
+hoá trên một mảng (N, 2), cộng thời gian và số đỉnh còn lại sau Douglas-Peucker.
+Không cần DB; không tính tra landmark của hướng dẫn.
+
+    python -m backend.benchmarks.bench_geo --vertices 5000 --repeat 20
+"""
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from backend.utils.geo import (
+    cumulative_distance,
+    dedupe_mask,
+    dedupe_polyline,
+    heading_angle_from_polyline,
+    heading_angle_xy,
+    merge_polys_with_tol,
+    merge_polys_xy,
+    polyline_length,
+    signed_turn_angle_screen,
+    simplify_mask,
+    turn_angles,
+)
+
+
+def make_route(vertices: int, per_edge: int, seed: int = 1):
+    """Polyline từng cạnh (đã orient) của một tuyến đi ngẫu nhiên; ~5% đỉnh sát nhau (jitter)."""
+    rnd = random.Random(seed)
+    polys = []
+    x, y, heading = 0.0, 0.0, 0.0
+    total = 0
+    while total < vertices:
+        poly = [(x, y)]
+        for _ in range(per_edge - 1):
+            heading += rnd.uniform(-0.6, 0.6)
+            step = 0.5 if rnd.random() < 0.05 else rnd.uniform(5.0, 40.0)
+            x += step * math.cos(heading)
+            y += step * math.sin(heading)
+            poly.append((x, y))
+        polys.append(poly)
+        total += per_edge - 1
+    return polys
+
+
+def old_pipeline(polys):
+    # như routes.py trước đây: đổi list/tuple nhiều lần, lặp từng đỉnh bằng Python
+    merged = merge_polys_with_tol(polys, tol=1.5)
+    merged = [[float(x), float(y)] for (x, y) in merged]
+    merged = dedupe_polyline([(x, y) for x, y in merged], tol=1.0)
+    merged = [[float(x), float(y)] for (x, y) in merged]
+    total = polyline_length([(x, y) for x, y in merged])
+    heading = heading_angle_from_polyline([(float(x), float(y)) for x, y in merged], 25.0)
+    seg_len = [0.0]
+    for i in range(1, len(merged)):
+        seg_len.append(math.hypot(merged[i][0] - merged[i - 1][0], merged[i][1] - merged[i - 1][1]))
+    turns = []
+    prev = 0
+    for i in range(1, len(merged) - 1):
+        a = signed_turn_angle_screen(tuple(merged[i - 1]), tuple(merged[i]), tuple(merged[i + 1]))
+        if abs(a) > 25.0:
+            turns.append((i, sum(seg_len[prev + 1 : i + 1])))
+            prev = i
+    return merged, total, heading, turns
+
+
+def new_pipeline(polys):
+    xy = merge_polys_xy(polys, tol=1.5)
+    xy = xy[dedupe_mask(xy, tol=1.0)]
+    cum = cumulative_distance(xy).tolist()
+    heading = heading_angle_xy(xy, 25.0)
+    turns = []
+    prev = 0
+    for i in (np.flatnonzero(np.abs(turn_angles(xy)) > 25.0) + 1).tolist():
+        turns.append((i, cum[i] - cum[prev]))
+        prev = i
+    return xy.tolist(), cum[-1], heading, turns
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--vertices", type=int, default=5000)
+    ap.add_argument("--per-edge", type=int, default=10, help="số đỉnh mỗi polyline cạnh")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--simplify", type=float, default=2.0, help="tolerance Douglas-Peucker (px)")
+    args = ap.parse_args()
+
+    polys = make_route(args.vertices, args.per_edge)
+    old = old_pipeline(polys)
+    new = new_pipeline(polys)
+    assert old[0] == new[0] and [t[0] for t in old[3]] == [t[0] for t in new[3]]
+    assert abs(old[1] - new[1]) < 1e-6 and abs(old[2] - new[2]) < 1e-9
+    print(f"tuyến {len(polys)} cạnh, {sum(len(p) for p in polys)} đỉnh -> {len(new[0])} đỉnh sau dedupe, {len(new[3])} chỗ rẽ")
+
+    merged = merge_polys_with_tol(polys, tol=1.5)
+    xy = merge_polys_xy(polys, tol=1.5)
+    ded = dedupe_polyline(merged, tol=1.0)
+    dxy = xy[dedupe_mask(xy, tol=1.0)]
+    rows = [
+        ("ghép polyline", lambda: merge_polys_with_tol(polys, 1.5), lambda: merge_polys_xy(polys, 1.5)),
+        ("dedupe", lambda: dedupe_polyline(merged, 1.0), lambda: xy[dedupe_mask(xy, 1.0)]),
+        ("độ dài + cộng dồn", lambda: polyline_length(ded), lambda: cumulative_distance(dxy)),
+        (
+            "góc rẽ từng đỉnh",
+            lambda: [signed_turn_angle_screen(ded[i - 1], ded[i], ded[i + 1]) for i in range(1, len(ded) - 1)],
+            lambda: turn_angles(dxy),
+        ),
+        ("cả pipeline", lambda: old_pipeline(polys), lambda: new_pipeline(polys)),
+    ]
+    print(f"{'':20s} {'list (ms)':>10s} {'numpy (ms)':>11s} {'nhanh hơn':>10s}")
+    for name, old_fn, new_fn in rows:
+        a = best_of(old_fn, args.repeat)
+        b = best_of(new_fn, args.repeat)
+        print(f"{name:20s} {a:10.3f} {b:11.3f} {a / b:9.1f}x")
+
+    kept = int(simplify_mask(dxy, args.simplify).sum())
+    dp_ms = best_of(lambda: simplify_mask(dxy, args.simplify), args.repeat)
+    print(f"Douglas-Peucker {args.simplify:g} px: {len(dxy)} -> {kept} đỉnh, {dp_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Nhập một tầng dạng lưới rows x cols: từng request như editor (POST /nodes, /aliases,
+/edges, mỗi cái một commit) so với một POST /maps/{id}/import (id tạm, executemany,
+một giao dịch). Gọi app qua TestClient trên SQLite tạm.
+
+    python -m backend.benchmarks.bench_import --rows 20 --cols 20 --big-rows 100 --big-cols 100
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+# engine của app đọc URL lúc import -> đặt trước khi import backend
+os.environ["WAYFINDER_DB_URL"] = "sqlite:///" + tempfile.mktemp(suffix=".db", prefix="wayfinder_bench_")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from backend.core.db import engine, init_db
+from backend.models.entities import Map
+from backend.routers import aliases, edges, maps, nodes
+
+
+def grid_doc(rows: int, cols: int, spacing: float = 40.0, floor: int = 1):
+    doc = {"nodes": [], "edges": []}
+    for r in range(rows):
+        for c in range(cols):
+            doc["nodes"].append(
+                {"id": f"{r}:{c}", "x": c * spacing, "y": r * spacing, "floor": floor, "names": [f"phòng {r}-{c}"]}
+            )
+            if c + 1 < cols:
+                doc["edges"].append({"start": f"{r}:{c}", "end": f"{r}:{c + 1}"})
+            if r + 1 < rows:
+                doc["edges"].append({"start": f"{r}:{c}", "end": f"{r + 1}:{c}"})
+    return doc
+
+
+def new_map(name: str) -> int:
+    with Session(engine) as session:
+        m = Map(name=name, image_path="bench.png", width=4000, height=4000)
+        session.add(m)
+        session.commit()
+        session.refresh(m)
+        return m.id
+
+
+def per_request(client: TestClient, map_id: int, doc) -> float:
+    t0 = time.perf_counter()
+    real = {}
+    for n in doc["nodes"]:
+        r = client.post("/nodes", json={"map_id": map_id, "x": n["x"], "y": n["y"], "floor": n["floor"]})
+        real[n["id"]] = r.json()["id"]
+        for name in n["names"]:
+            client.post("/aliases", json={"node_id": real[n["id"]], "name": name})
+    for e in doc["edges"]:
+        r = client.post(
+            "/edges", json={"map_id": map_id, "start_node_id": real[e["start"]], "end_node_id": real[e["end"]]}
+        )
+        assert r.status_code == 200, r.text
+    return time.perf_counter() - t0
+
+
+def bulk(client: TestClient, map_id: int, doc):
+    t0 = time.perf_counter()
+    r = client.post(f"/maps/{map_id}/import", json=doc)
+    assert r.status_code == 200, r.text
+    return time.perf_counter() - t0, r.json()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20)
+    ap.add_argument("--cols", type=int, default=20)
+    ap.add_argument("--big-rows", type=int, default=100)
+    ap.add_argument("--big-cols", type=int, default=100)
+    args = ap.parse_args()
+
+    init_db()
+    app = FastAPI()
+    app.include_router(maps.router, prefix="/maps")
+    app.include_router(nodes.router, prefix="/nodes")
+    app.include_router(aliases.router, prefix="/aliases")
+    app.include_router(edges.router, prefix="/edges")
+    client = TestClient(app)
+
+    doc = grid_doc(args.rows, args.cols)
+    rows = 2 * len(doc["nodes"]) + len(doc["edges"])
+    one = per_request(client, new_map("từng request"), doc)
+    secs, res = bulk(client, new_map("import"), doc)
+    print(f"lưới {args.rows}x{args.cols}: {rows} dòng (node + alias + cạnh)")
+    print(f"từng request: {one:8.2f} s  ({rows / one:9.0f} dòng/s)")
+    print(f"import      : {secs:8.2f} s  ({rows / secs:9.0f} dòng/s, server báo {res['rows_per_s']:.0f} dòng/s)")
+
+    big = grid_doc(args.big_rows, args.big_cols)
+    rows = 2 * len(big["nodes"]) + len(big["edges"])
+    secs, res = bulk(client, new_map("import lớn"), big)
+    print(
+        f"import lưới {args.big_rows}x{args.big_cols}: {res['nodes']} node, {res['aliases']} alias, "
+        f"{res['edges']} cạnh trong {secs:.2f} s ({rows / secs:.0f} dòng/s, "
+        f"server {res['elapsed_ms']:.0f} ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
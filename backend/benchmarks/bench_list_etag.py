@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+GET /nodes và GET /edges của một map lưới lớn qua TestClient: lần đầu sau khi map
+đổi (truy vấn + serialize), lần sau (body đã cache theo revision) và khi trình duyệt
+hỏi lại bằng If-None-Match (304, không đụng DB), cộng số byte mỗi kiểu.
+
+    python -m backend.benchmarks.bench_list_etag --rows 100 --cols 100
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+# engine của app đọc URL lúc import -> đặt trước khi import backend
+os.environ["WAYFINDER_DB_URL"] = "sqlite:///" + tempfile.mktemp(suffix=".db", prefix="wayfinder_bench_")
+os.environ["WAYFINDER_ARTIFACT_DIR"] = tempfile.mkdtemp(prefix="wayfinder_bench_")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.benchmarks.synthetic import populate_grid
+from backend.core.db import engine, init_db
+from backend.routers import edges, nodes
+from backend.services.graph_cache import bump_map_version
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100)
+    ap.add_argument("--cols", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    init_db()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    app = FastAPI()
+    app.include_router(nodes.router, prefix="/nodes")
+    app.include_router(edges.router, prefix="/edges")
+    client = TestClient(app)
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh")
+    print(f"{'':22s} {'map vừa đổi':>14s} {'body đã cache':>14s} {'304':>10s}")
+
+    for url in (f"/nodes?map_id={map_id}", f"/edges?map_id={map_id}", f"/edges?map_id={map_id}&format=encoded"):
+
+        def cold():
+            bump_map_version(map_id)  # như sau một lần sửa map: revision mới, cache trống
+            return client.get(url)
+
+        cold_ms, r = timed(cold, args.repeat)
+        warm_ms, r2 = timed(lambda: client.get(url), args.repeat)
+        etag = r2.headers["etag"]
+        nm_ms, r3 = timed(lambda: client.get(url, headers={"If-None-Match": etag}), args.repeat)
+        assert r.content == r2.content and r3.status_code == 304
+        name = url.split("?")[0] + (" (encoded)" if "encoded" in url else "")
+        print(f"{name:22s} {cold_ms:11.1f} ms {warm_ms:11.1f} ms {nm_ms:7.2f} ms")
+        print(f"{'':22s} {len(r.content) / 1024:11.0f} KB {len(r2.content) / 1024:11.0f} KB {len(r3.content):8d} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Bộ nhớ mỗi worker khi N tiến trình (như N worker uvicorn) cùng nạp snapshot của
+một map lớn: đọc chép vào bộ nhớ riêng (copy) so với map chung file (mmap).
+Mỗi worker chạm mọi trang của các mảng rồi đọc /proc/self/smaps_rollup:
+RSS tính cả trang dùng chung vào mỗi worker, PSS chia trang dùng chung cho số
+tiến trình đang map nó - tổng PSS là bộ nhớ thật của cả nhóm worker.
+
+    python -m backend.benchmarks.bench_mmap --rows 200 --cols 250 --workers 4
+"""
+
+import argparse
+import hashlib
+import multiprocessing as mp
+import os
+import tempfile
+
+# snapshot ghi vào ARTIFACT_DIR (đọc lúc import) -> thư mục tạm, không đụng data/db/cache
+os.environ["WAYFINDER_ARTIFACT_DIR"] = tempfile.mkdtemp(prefix="wayfinder_bench_")
+
+from sqlmodel import Session
+
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.services.graph_snapshot import _FIELDS, build_graph_snapshot, load_snapshot_file, snapshot_path
+
+
+def memory_kb():
+    """(RSS, PSS) của tiến trình hiện tại, KB (Linux)."""
+    out = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                out[parts[0][:-1]] = int(parts[1])
+    return out["Rss"], out["Pss"]
+
+
+def worker(mode, path, sig, barrier, results):
+    rss0, pss0 = memory_kb()
+    snap = load_snapshot_file(path, sig, copy=(mode == "copy"))
+    # chạm mọi trang (sha1 đọc thẳng buffer, không chép)
+    h = hashlib.sha1()
+    g = snap.csr
+    for f in _FIELDS[1:]:
+        arr = getattr(g, f) if hasattr(g, f) else getattr(snap, f)
+        h.update(arr)
+    barrier.wait()  # mọi worker đều đang giữ snapshot lúc đo
+    rss1, pss1 = memory_kb()
+    results.put((rss1 - rss0, pss1 - pss0, h.hexdigest()))
+    barrier.wait()
+
+
+def run(mode, path, sig, workers):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(mode, path, sig, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    assert len({r[2] for r in rows}) == 1
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--cols", type=int, default=250)
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("Cần Linux (/proc/self/smaps_rollup) để đo RSS/PSS.")
+
+    engine = make_engine()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    with Session(engine) as session:
+        sig = build_graph_snapshot(session, map_id).signature
+    path = snapshot_path(map_id)
+    size_mb = os.path.getsize(path) / 1024
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh; file snapshot {size_mb / 1024:.1f} MB")
+    print(f"{args.workers} worker, tăng bộ nhớ sau khi nạp + chạm mọi trang (MB):")
+    for mode in ("copy", "mmap"):
+        rows = run(mode, path, sig, args.workers)
+        rss = [r[0] / 1024 for r in rows]
+        pss = [r[1] / 1024 for r in rows]
+        print(
+            f"  {mode:4s}: RSS/worker {sum(rss) / len(rss):7.1f}  PSS/worker {sum(pss) / len(pss):7.1f}"
+            f"  tổng PSS {sum(pss):7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
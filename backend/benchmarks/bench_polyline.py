@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Polyline dạng mảng JSON [[x, y], ...] so với chuỗi mã hoá (format=encoded):
+số byte của body và thời gian serialize (mã hoá + model_dump_json) cho một tuyến
+dài (mặc định 5000 đỉnh, RouteResponse) và cho GET /edges của một map lưới.
+Cột "gzip" là cỡ body sau nén, như qua proxy có bật gzip.
+
+    python -m backend.benchmarks.bench_polyline --vertices 5000 --rows 100 --cols 100
+"""
+
+import argparse
+import gzip
+import time
+
+from pydantic import TypeAdapter
+from sqlmodel import Session, select
+
+from backend.benchmarks.bench_geo import make_route
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.models.entities import Edge
+from backend.routers.edges import EdgeOut
+from backend.routers.routes import RouteResponse, encode_route
+from backend.utils.geo import merge_polys_xy
+from backend.utils.polyline import decode_polyline, encode_polyline_blobs, unpack_polylines
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0, out
+
+
+def report(name, json_fn, enc_fn, repeat):
+    ta, a = best_of(json_fn, repeat)
+    tb, b = best_of(enc_fn, repeat)
+    za, zb = len(gzip.compress(a)), len(gzip.compress(b))
+    print(f"{name:22s} json  {len(a) / 1024:9.1f} KB  gzip {za / 1024:8.1f} KB  {ta:8.2f} ms")
+    print(
+        f"{'':22s} mã hoá {len(b) / 1024:8.1f} KB  gzip {zb / 1024:8.1f} KB  {tb:8.2f} ms"
+        f"  ({len(a) / len(b):.1f}x nhỏ hơn)"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--vertices", type=int, default=5000)
+    ap.add_argument("--rows", type=int, default=100)
+    ap.add_argument("--cols", type=int, default=100)
+    ap.add_argument("--precision", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+    p = args.precision
+
+    # --- một tuyến dài ---
+    xy = merge_polys_xy(make_route(args.vertices, 10), tol=1.5)
+    resp = RouteResponse(path_node_ids=list(range(len(xy) // 9)), polyline=xy.tolist(), length_px=0.0, instructions=[])
+    err = abs(decode_polyline(encode_route(resp, p).polyline, p) - xy).max()
+    print(f"tuyến {len(xy)} đỉnh, sai số lớn nhất sau giải mã {err:.3g} px (precision {p})")
+    report(
+        "RouteResponse",
+        lambda: resp.model_dump_json().encode(),
+        lambda: encode_route(resp, p).model_dump_json().encode(),
+        args.repeat,
+    )
+
+    # --- GET /edges của map lưới ---
+    engine = make_engine()
+    map_id, _n_nodes, _n_edges = populate_grid(engine, args.rows, args.cols)
+    with Session(engine) as session:
+        edges = session.exec(select(Edge).where(Edge.map_id == map_id)).all()
+    rows = [e.model_dump(exclude={"polyline", "polyline_xy"}) for e in edges]
+    blobs = [e.polyline_xy for e in edges]
+    adapter = TypeAdapter(list[EdgeOut])
+
+    def as_json():
+        return adapter.dump_json([EdgeOut(**r, polyline=pl) for r, pl in zip(rows, unpack_polylines(blobs))])
+
+    def as_encoded():
+        polys = encode_polyline_blobs(blobs, p)
+        return adapter.dump_json(
+            [EdgeOut(**r, polyline=s, polyline_precision=p) for r, s in zip(rows, polys)]
+        )
+
+    print(f"map lưới {args.rows}x{args.cols}: {len(rows)} cạnh")
+    report("GET /edges", as_json, as_encoded, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
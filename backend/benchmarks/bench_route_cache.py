@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Đo cache kết quả /route với tải kiểu kiosk: một nhóm cặp (start, end) "phổ biến"
+được hỏi lặp lại theo phân bố Zipf.
+
+    python -m backend.benchmarks.bench_route_cache --rows 100 --cols 100 --pairs 50 --requests 2000
+"""
+
+import argparse
+import random
+import time
+
+from sqlmodel import Session, select
+
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.models.entities import Node
+from backend.routers.routes import compute_route
+from backend.services.route_cache import route_cache
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100)
+    ap.add_argument("--cols", type=int, default=100)
+    ap.add_argument("--pairs", type=int, default=50)
+    ap.add_argument("--requests", type=int, default=2000)
+    args = ap.parse_args()
+
+    engine = make_engine()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh")
+
+    with Session(engine) as session:
+        node_ids = session.exec(select(Node.id).where(Node.map_id == map_id)).all()
+        rnd = random.Random(11)
+        popular = [(rnd.choice(node_ids), rnd.choice(node_ids)) for _ in range(args.pairs)]
+        zipf = [1.0 / (k + 1) for k in range(args.pairs)]
+        load = rnd.choices(popular, weights=zipf, k=args.requests)
+
+        # làm ấm cache đồ thị, rồi đo không có cache kết quả (mỗi lần dọn sạch)
+        compute_route(session, map_id, *load[0])
+        t0 = time.perf_counter()
+        for s, t in load[:200]:
+            route_cache.clear()
+            compute_route(session, map_id, s, t)
+        cold_ms = (time.perf_counter() - t0) * 1000.0 / min(200, len(load))
+
+        route_cache.clear()
+        h0, m0 = route_cache.hits, route_cache.misses
+        t0 = time.perf_counter()
+        for s, t in load:
+            compute_route(session, map_id, s, t)
+        warm_ms = (time.perf_counter() - t0) * 1000.0 / len(load)
+
+    hits = route_cache.hits - h0
+    misses = route_cache.misses - m0
+    st = route_cache.stats()
+    print(f"không cache: {cold_ms:8.3f} ms/request")
+    print(f"có cache   : {warm_ms:8.3f} ms/request, hit rate {hits / (hits + misses):.3f}")
+    print(f"cache: {st['entries']} entry, {st['bytes'] / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
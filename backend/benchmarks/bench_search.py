@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+So sánh các thuật toán tìm đường trên CSRGraph: thời gian/truy vấn và số node đã settle.
+
+    python -m backend.benchmarks.bench_search --rows 200 --cols 250 --queries 200
+"""
+
+import argparse
+import random
+import time
+
+from sqlmodel import Session
+
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.services.alt import select_landmarks, AltTables
+from backend.services.ch import build_ch
+from backend.services.csr import build_csr_for_map
+
+
+def run(name, pairs, search, cost):
+    settled = 0
+    costs = []
+    t0 = time.perf_counter()
+    for s, t in pairs:
+        _path, hops, n = search(s, t)
+        settled += n
+        costs.append(hops)
+    ms = (time.perf_counter() - t0) * 1000.0 / len(pairs)
+    print(f"{name:10s}: {ms:8.2f} ms/query, settled trung bình {settled / len(pairs):10.1f}")
+    return [cost(h) for h in costs]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--cols", type=int, default=250)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--landmarks", type=int, default=8)
+    ap.add_argument("--no-ch", action="store_true", help="bỏ qua CH (tiền xử lý lâu trên lưới lớn)")
+    args = ap.parse_args()
+
+    engine = make_engine()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh")
+    with Session(engine) as session:
+        g = build_csr_for_map(session, map_id)
+
+    rnd = random.Random(1)
+    pairs = [(rnd.randrange(g.num_nodes), rnd.randrange(g.num_nodes)) for _ in range(args.queries)]
+
+    def arc_cost(arcs):
+        return sum(g.weights[a] for a in arcs)
+
+    slot_weight = {}
+    for a in range(len(g.arc_edge)):
+        slot_weight[g.arc_edge[a]] = g.weights[a]
+
+    def slot_cost(slots):
+        return sum(slot_weight[sl] for sl in slots)
+
+    base = run("dijkstra", pairs, g.dijkstra, arc_cost)
+    results = {
+        "astar": run("astar", pairs, lambda s, t: g.astar(s, t, g.euclid_heuristic(t)), arc_cost)
+    }
+
+    t0 = time.perf_counter()
+    lms, dist = select_landmarks(g, [], args.landmarks)
+    alt = AltTables(g.signature(), lms, dist)
+    print(f"tiền xử lý ALT (K={len(lms)}): {(time.perf_counter() - t0) * 1000.0:.0f} ms")
+    results["alt"] = run(
+        "alt", pairs, lambda s, t: g.astar(s, t, alt.heuristic(t, g.euclid_heuristic(t))), arc_cost
+    )
+
+    if not args.no_ch:
+        t0 = time.perf_counter()
+        ch = build_ch(g)
+        print(f"tiền xử lý CH: {(time.perf_counter() - t0) * 1000.0:.0f} ms, {ch.num_shortcuts} shortcut")
+        results["ch"] = run("ch", pairs, ch.query, slot_cost)
+
+    for name, costs in results.items():
+        ok = sum(1 for a, b in zip(base, costs) if abs(a - b) < 1e-6)
+        print(f"{name}: cùng chi phí với dijkstra {ok}/{len(pairs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+So sánh chọn điểm xuất phát từ (cx, cy): cách cũ (đọc mọi Node rồi sort theo
+khoảng cách) với chỉ mục lưới SnapIndex (node gần nhất + điểm gần nhất trên cạnh).
+
+    python -m backend.benchmarks.bench_snap --rows 200 --cols 250 --queries 500
+"""
+
+import argparse
+import math
+import random
+import time
+
+from sqlmodel import Session, select
+
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.models.entities import Node
+from backend.services.csr import get_csr
+from backend.services.spatial import build_snap_index
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--cols", type=int, default=250)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--sort-queries", type=int, default=20, help="số truy vấn cho cách cũ (chậm)")
+    args = ap.parse_args()
+
+    engine = make_engine()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh")
+
+    with Session(engine) as session:
+        xs, ys = zip(*session.exec(select(Node.x, Node.y).where(Node.map_id == map_id)).all())
+        rnd = random.Random(5)
+        pts = [
+            (rnd.uniform(min(xs), max(xs)), rnd.uniform(min(ys), max(ys)))
+            for _ in range(args.queries)
+        ]
+
+        t0 = time.perf_counter()
+        for cx, cy in pts[: args.sort_queries]:
+            nodes = session.exec(select(Node).where(Node.map_id == map_id)).all()
+            nodes.sort(key=lambda n: math.hypot(n.x - cx, n.y - cy))
+        sort_ms = (time.perf_counter() - t0) * 1000.0 / min(args.sort_queries, len(pts))
+
+        t0 = time.perf_counter()
+        get_csr(session, map_id)
+        csr_ms = (time.perf_counter() - t0) * 1000.0
+        t0 = time.perf_counter()
+        idx = build_snap_index(session, map_id)  # dùng CSR đã có trong cache
+        build_ms = (time.perf_counter() - t0) * 1000.0
+
+    t0 = time.perf_counter()
+    for cx, cy in pts:
+        idx.nearest_node(cx, cy)
+    node_us = (time.perf_counter() - t0) * 1e6 / len(pts)
+    t0 = time.perf_counter()
+    for cx, cy in pts:
+        idx.nearest_edge(cx, cy)
+    edge_us = (time.perf_counter() - t0) * 1e6 / len(pts)
+
+    print(f"cách cũ (đọc + sort mọi node): {sort_ms:9.2f} ms/truy vấn")
+    print(f"dựng CSR                     : {csr_ms:9.1f} ms")
+    print(f"dựng SnapIndex (từ CSR)      : {build_ms:9.1f} ms (một lần mỗi version map)")
+    print(f"node gần nhất (lưới)         : {node_us:9.1f} µs/truy vấn")
+    print(f"điểm gần nhất trên cạnh      : {edge_us:9.1f} µs/truy vấn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Nạp đồ thị một map lớn: build_graph_for_map (networkx, json.loads từng polyline),
+build_csr_for_map (CSR từ DB) so với đọc snapshot nhị phân (dấu vân tay DB + file),
+cộng kích thước file snapshot.
+
+    python -m backend.benchmarks.bench_snapshot --rows 200 --cols 250
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+# snapshot ghi vào ARTIFACT_DIR (đọc lúc import) -> thư mục tạm, không đụng data/db/cache
+os.environ["WAYFINDER_ARTIFACT_DIR"] = tempfile.mkdtemp(prefix="wayfinder_bench_")
+
+from sqlmodel import Session
+
+from backend.benchmarks.synthetic import make_engine, populate_grid
+from backend.services.csr import build_csr_for_map
+from backend.services.graph import build_graph_for_map
+from backend.services.graph_snapshot import (
+    build_graph_snapshot,
+    db_signature,
+    load_snapshot_file,
+    snapshot_path,
+)
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--cols", type=int, default=250)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    engine = make_engine()
+    map_id, n_nodes, n_edges = populate_grid(engine, args.rows, args.cols)
+    print(f"map lưới {args.rows}x{args.cols}: {n_nodes} node, {n_edges} cạnh")
+
+    with Session(engine) as session:
+        nx_ms, _ = best_of(lambda: build_graph_for_map(session, map_id), args.repeat)
+        csr_ms, _ = best_of(lambda: build_csr_for_map(session, map_id), args.repeat)
+        write_ms, snap = best_of(lambda: build_graph_snapshot(session, map_id), 1)
+        sig_ms, sig = best_of(lambda: db_signature(session, map_id), args.repeat)
+        path = snapshot_path(map_id)
+        load_ms, loaded = best_of(lambda: load_snapshot_file(path, sig), args.repeat)
+
+    assert loaded is not None and loaded.csr.signature() == snap.csr.signature()
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"build_graph_for_map (networkx)     : {nx_ms:8.1f} ms")
+    print(f"build_csr_for_map (DB + json)      : {csr_ms:8.1f} ms")
+    print(f"dựng snapshot lần đầu (DB + ghi)   : {write_ms:8.1f} ms")
+    print(f"nạp snapshot: vân tay DB {sig_ms:6.1f} ms + đọc file {load_ms:6.1f} ms = {sig_ms + load_ms:8.1f} ms")
+    print(f"file snapshot: {size_mb:.1f} MB; nhanh hơn networkx {nx_ms / (sig_ms + load_ms):.1f}x, CSR từ DB {csr_ms / (sig_ms + load_ms):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Đọc/ghi đồng thời trên SQLite: R luồng đọc (tra node + alias, thỉnh thoảng đọc cả
+bảng edge như khi dựng lại đồ thị) và W luồng ghi (sửa toạ độ node rồi commit) chạy cùng lúc trong D giây,
+so sánh profile "default" (journal rollback) với "production" (WAL + pragma + pool
+chỉ-đọc riêng, xem backend/core/db.py).
+
+    python -m backend.benchmarks.bench_sqlite --readers 8 --writers 2 --seconds 5
+"""
+
+import argparse
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel, Session, select
+
+from backend.benchmarks.synthetic import populate_grid
+from backend.core.db import make_sqlite_engine
+from backend.models.entities import Node
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000.0
+
+
+def run(profile: str, args):
+    url = "sqlite:///" + tempfile.mktemp(suffix=".db", prefix="wayfinder_bench_")
+    writer = make_sqlite_engine(url, profile)
+    SQLModel.metadata.create_all(writer)
+    map_id, n_nodes, _n_edges = populate_grid(writer, args.rows, args.cols)
+    reader = make_sqlite_engine(url, profile, readonly=profile == "production")
+    with Session(writer) as session:
+        node_ids = session.exec(select(Node.id).where(Node.map_id == map_id)).all()
+
+    stop = time.perf_counter() + args.seconds
+    lat = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+
+    def read_loop(seed):
+        rnd = random.Random(seed)
+        mine, errs, k = [], 0, 0
+        while time.perf_counter() < stop:
+            k += 1
+            t0 = time.perf_counter()
+            try:
+                with reader.connect() as conn:
+                    if k % args.scan_every == 0:
+                        # đọc cả đồ thị như khi dựng lại CSR sau khi map đổi
+                        conn.execute(
+                            text("SELECT id, start_node_id, end_node_id, weight, polyline FROM edge WHERE map_id = :m"),
+                            {"m": map_id},
+                        ).all()
+                    else:
+                        nid = rnd.choice(node_ids)
+                        conn.execute(text("SELECT x, y, floor FROM node WHERE id = :n"), {"n": nid}).all()
+                        conn.execute(text("SELECT name FROM alias WHERE node_id = :n"), {"n": nid}).all()
+                mine.append(time.perf_counter() - t0)
+            except OperationalError:
+                errs += 1
+        with lock:
+            lat["read"] += mine
+            errors["read"] += errs
+
+    def write_loop(seed):
+        rnd = random.Random(seed)
+        mine, errs = [], 0
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            try:
+                with writer.begin() as conn:
+                    conn.execute(
+                        text("UPDATE node SET x = x + :d WHERE id = :n"),
+                        [{"d": rnd.uniform(-1, 1), "n": nid} for nid in rnd.sample(node_ids, args.batch)],
+                    )
+                mine.append(time.perf_counter() - t0)
+            except OperationalError:
+                errs += 1
+        with lock:
+            lat["write"] += mine
+            errors["write"] += errs
+
+    threads = [threading.Thread(target=read_loop, args=(k,)) for k in range(args.readers)]
+    threads += [threading.Thread(target=write_loop, args=(100 + k,)) for k in range(args.writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.dispose()
+    reader.dispose()
+
+    secs = args.seconds
+    print(
+        f"{profile:10s}: đọc {len(lat['read']) / secs:8.0f}/s (p99 {pct(lat['read'], 0.99):7.1f} ms, lỗi {errors['read']}) | "
+        f"ghi {len(lat['write']) / secs:6.0f}/s (p50 {pct(lat['write'], 0.5):6.1f} ms, "
+        f"p99 {pct(lat['write'], 0.99):7.1f} ms, lỗi {errors['write']})"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=60)
+    ap.add_argument("--cols", type=int, default=60)
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--writers", type=int, default=2)
+    ap.add_argument("--batch", type=int, default=20, help="số node sửa trong mỗi giao dịch ghi")
+    ap.add_argument("--scan-every", type=int, default=20, help="mỗi N lần đọc có 1 lần đọc cả bảng edge")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    args = ap.parse_args()
+
+    print(f"{args.readers} luồng đọc, {args.writers} luồng ghi, {args.seconds:.0f} s")
+    for profile in ("default", "production"):
+        run(profile, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Sinh map tổng hợp dạng lưới (rows x cols) vào một SQLite tạm để benchmark.
+
+Mỗi ô lưới là 1 node, cạnh nối 4 hướng với polyline có vài điểm "rung tay",
+một phần node là landmark và node nào cũng có 1 alias.
+"""
+
+from typing import Tuple
+import random
+import tempfile
+
+from sqlalchemy import insert
+from sqlmodel import SQLModel, Session, create_engine
+
+from backend.models.entities import Map, Node, Alias, Edge
+from backend.utils.geo import polyline_length
+from backend.utils.norm import normalize_name
+from backend.utils.polyline import pack_polyline
+
+ROOM_NAMES = ["phòng", "thư viện", "căng tin", "nhà vệ sinh", "thang máy", "sảnh", "khu", "tòa"]
+
+
+def make_engine(path: str = None):
+    if path is None:
+        path = tempfile.mktemp(suffix=".db", prefix="wayfinder_bench_")
+    eng = create_engine(f"sqlite:///{path}", echo=False, connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(eng)
+    return eng
+
+
+def _alias_rows(node_ids, rnd):
+    rows = []
+    for k, nid in enumerate(node_ids):
+        name = f"{rnd.choice(ROOM_NAMES)} {chr(65 + k % 26)}{k}"
+        rows.append(
+            {"node_id": nid, "name": name, "norm_name": normalize_name(name), "lang": "vi", "weight": 1.0, "generated": True}
+        )
+    return rows
+
+
+def populate_aliases(engine, count: int, maps: int = 1, seed: int = 7):
+    """Chỉ sinh node + alias (không cạnh) rải trên `maps` map; trả danh sách map_id."""
+    rnd = random.Random(seed)
+    map_ids = []
+    with Session(engine) as session:
+        per_map = max(count // maps, 1)
+        for k in range(maps):
+            m = Map(name=f"aliases {k}", image_path="bench.png", width=4000, height=4000)
+            session.add(m)
+            session.commit()
+            session.refresh(m)
+            map_ids.append(m.id)
+            rows = session.execute(insert(Node).returning(Node.id, sort_by_parameter_order=True), [
+                {"map_id": m.id, "x": rnd.uniform(0, 4000), "y": rnd.uniform(0, 4000), "is_landmark": False, "floor": 1, "meta": None}
+                for _ in range(per_map)
+            ]).all()
+            session.execute(insert(Alias), _alias_rows([r[0] for r in rows], rnd))
+        session.commit()
+    return map_ids
+
+
+def populate_grid(
+    engine,
+    rows: int,
+    cols: int,
+    spacing: float = 40.0,
+    jitter_points: int = 3,
+    seed: int = 7,
+    floors: int = 1,
+) -> Tuple[int, int, int]:
+    """
+    Trả (map_id, số node, số cạnh). Với floors > 1, mỗi tầng là một lưới giống nhau,
+    tầng kề nhau nối bằng cầu thang ở góc đầu và thang máy ở góc cuối lưới.
+    """
+    rnd = random.Random(seed)
+    with Session(engine) as session:
+        m = Map(name=f"grid {rows}x{cols}", image_path="bench.png", width=int(cols * spacing), height=int(rows * spacing))
+        session.add(m)
+        session.commit()
+        session.refresh(m)
+        map_id = m.id
+
+        all_ids = []
+        edge_rows = []
+        for floor in range(1, floors + 1):
+            first = session.execute(insert(Node).returning(Node.id, sort_by_parameter_order=True), [
+                {
+                    "map_id": map_id,
+                    "x": c * spacing,
+                    "y": r * spacing,
+                    "is_landmark": rnd.random() < 0.05,
+                    "floor": floor,
+                    "meta": None,
+                }
+                for r in range(rows)
+                for c in range(cols)
+            ]).all()
+            ids = [row[0] for row in first]
+            session.execute(insert(Alias), _alias_rows(ids, rnd))
+
+            for r in range(rows):
+                for c in range(cols):
+                    u = ids[r * cols + c]
+                    for dr, dc in ((0, 1), (1, 0)):
+                        rr, cc = r + dr, c + dc
+                        if rr >= rows or cc >= cols:
+                            continue
+                        v = ids[rr * cols + cc]
+                        x0, y0 = c * spacing, r * spacing
+                        x1, y1 = cc * spacing, rr * spacing
+                        poly = [[x0, y0]]
+                        for k in range(1, jitter_points + 1):
+                            t = k / (jitter_points + 1)
+                            poly.append([x0 + (x1 - x0) * t + rnd.uniform(-2, 2), y0 + (y1 - y0) * t + rnd.uniform(-2, 2)])
+                        poly.append([x1, y1])
+                        edge_rows.append(
+                            {
+                                "map_id": map_id,
+                                "start_node_id": u,
+                                "end_node_id": v,
+                                "floor": floor,
+                                "polyline_xy": pack_polyline(poly),
+                                "weight": polyline_length(poly),
+                                "bidirectional": True,
+                                "meta": None,
+                                "kind": "walk",
+                            }
+                        )
+            if all_ids:
+                below = all_ids[-1]
+                for k, kind, cost in ((0, "stairs", 150.0), (-1, "elevator", 250.0)):
+                    x, y = (0.0, 0.0) if k == 0 else ((cols - 1) * spacing, (rows - 1) * spacing)
+                    edge_rows.append(
+                        {
+                            "map_id": map_id,
+                            "start_node_id": below[k],
+                            "end_node_id": ids[k],
+                            "floor": floor - 1,
+                            "polyline_xy": pack_polyline([[x, y], [x, y]]),
+                            "weight": cost,
+                            "bidirectional": True,
+                            "meta": None,
+                            "kind": kind,
+                        }
+                    )
+            all_ids.append(ids)
+        session.execute(insert(Edge), edge_rows)
+        session.commit()
+    return map_id, sum(len(ids) for ids in all_ids), len(edge_rows)
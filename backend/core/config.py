@@ -0,0 +1,62 @@
+from pathlib import Path
+import os
+from dotenv import load_dotenv
+
+# Cùng quy ước với backend/core/db.py: đọc .env ở gốc project và cạnh file này
+BASE_PKG = Path(__file__).resolve().parents[2]
+load_dotenv(dotenv_path=BASE_PKG / ".env")
+load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
+
+# Engine tìm đường: "csr" (mảng CSR + Dijkstra heap) hoặc "networkx" (cách cũ)
+ROUTING_ENGINE = (os.getenv("WAYFINDER_ROUTING_ENGINE") or "csr").strip().lower()
+
+# Thuật toán tìm đường mặc định: "astar" (heuristic Euclid) hoặc "dijkstra";
+# RouteRequest.algorithm có thể ghi đè cho từng request
+ROUTING_ALGORITHM = (os.getenv("WAYFINDER_ROUTING_ALGORITHM") or "astar").strip().lower()
+
+# Thư mục chứa dữ liệu dẫn xuất (bảng ALT, snapshot, ...) nằm cạnh data/db
+ARTIFACT_DIR = Path(os.getenv("WAYFINDER_ARTIFACT_DIR") or (BASE_PKG / "data" / "db" / "cache"))
+
+# Đọc artifact (snapshot, ALT, CH) qua mmap chỉ-đọc: các worker uvicorn dùng chung
+# trang vật lý thay vì mỗi worker giữ một bản sao (0 = đọc chép vào bộ nhớ như cũ)
+ARTIFACT_MMAP = (os.getenv("WAYFINDER_ARTIFACT_MMAP") or "1").strip() not in ("0", "false", "no")
+
+# Chu kỳ (ms) kiểm tra phiên bản map do worker khác ghi (ARTIFACT_DIR/versions);
+# 0 = kiểm tra ở mọi lần tra cache
+VERSION_POLL_MS = float(os.getenv("WAYFINDER_VERSION_POLL_MS") or 20)
+
+# Số landmark K cho thuật toán ALT
+ALT_LANDMARKS = int(os.getenv("WAYFINDER_ALT_LANDMARKS") or 8)
+
+# Cache kết quả /route (RouteResponse hoàn chỉnh): dung lượng tối đa (MB, 0 = tắt)
+# và thời gian sống của mỗi entry (giây, 0 = chỉ hết hạn khi map đổi hoặc bị đẩy ra)
+ROUTE_CACHE_MB = float(os.getenv("WAYFINDER_ROUTE_CACHE_MB") or 32)
+ROUTE_CACHE_TTL = float(os.getenv("WAYFINDER_ROUTE_CACHE_TTL") or 0)
+
+# Cache phân giải câu hỏi tự nhiên (q, vị trí) -> (start_id, end_id), MB (0 = tắt)
+RESOLVE_CACHE_MB = float(os.getenv("WAYFINDER_RESOLVE_CACHE_MB") or 4)
+
+# Body JSON đã serialize của GET /maps, /nodes, /edges, /aliases theo revision của map
+# (ETag / 304), MB (0 = không giữ body, vẫn trả 304 khi ETag khớp)
+LIST_CACHE_MB = float(os.getenv("WAYFINDER_LIST_CACHE_MB") or 32)
+
+# Douglas-Peucker cho polyline trả về của /route (px, 0 = tắt; ghi đè bằng simplify_px)
+# và cho polyline của cạnh lúc ghi (POST /edges, PATCH /edges, nhập hàng loạt; 0 = giữ nguyên)
+ROUTE_SIMPLIFY_PX = float(os.getenv("WAYFINDER_ROUTE_SIMPLIFY_PX") or 0)
+EDGE_SIMPLIFY_PX = float(os.getenv("WAYFINDER_EDGE_SIMPLIFY_PX") or 0)
+
+# Số chữ số thập phân giữ lại khi trả polyline dạng mã hoá (format=encoded; 1 = 0.1 px)
+POLYLINE_PRECISION = int(os.getenv("WAYFINDER_POLYLINE_PRECISION") or 1)
+
+# Chế độ phục vụ /route, /nl-route, /aliases/search: "sync" (handler def + threadpool)
+# hoặc "async" (trả lời từ snapshot trong bộ nhớ, trượt thì đọc DB qua driver async)
+SERVING_MODE = (os.getenv("WAYFINDER_SERVING_MODE") or "sync").strip().lower()
+
+# Cấu hình SQLite: "default" (như cũ) hoặc "production" - WAL, synchronous=NORMAL,
+# mmap, cache lớn, busy_timeout và pool kết nối chỉ-đọc riêng cho route/search
+SQLITE_PROFILE = (os.getenv("WAYFINDER_SQLITE_PROFILE") or "default").strip().lower()
+SQLITE_MMAP_MB = int(os.getenv("WAYFINDER_SQLITE_MMAP_MB") or 256)
+SQLITE_CACHE_MB = int(os.getenv("WAYFINDER_SQLITE_CACHE_MB") or 64)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("WAYFINDER_SQLITE_BUSY_TIMEOUT_MS") or 5000)
+# số kết nối chỉ-đọc giữ sẵn trong pool (profile production)
+SQLITE_READ_POOL = int(os.getenv("WAYFINDER_SQLITE_READ_POOL") or 8)
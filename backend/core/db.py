@@ -1,8 +1,20 @@
 from pathlib import Path
+import json
 import os
+from typing import Dict
+from sqlalchemy import LargeBinary, event, inspect, text
+from sqlalchemy.pool import QueuePool
 from sqlmodel import create_engine, SQLModel
 from dotenv import load_dotenv
 
+from backend.core.config import (
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_MB,
+    SQLITE_MMAP_MB,
+    SQLITE_PROFILE,
+    SQLITE_READ_POOL,
+)
+
 # Resolve project root and load .env explicitly to avoid CWD issues
 BASE_PKG = Path(__file__).resolve().parents[2]
 load_dotenv(dotenv_path=BASE_PKG / ".env")
@@ -22,10 +34,143 @@ else:
     DB_PATH = (DB_DIR / "wayfinder.db").resolve()
     DB_URL = f"sqlite:///{DB_PATH.as_posix()}"
 
+
+def sqlite_pragmas(profile: str, readonly: bool = False) -> Dict[str, object]:
+    """PRAGMA chạy trên mỗi kết nối SQLite mới theo profile."""
+    if profile != "production":
+        return {}
+    pragmas: Dict[str, object] = {
+        # WAL: người đọc không chặn người ghi và ngược lại
+        "journal_mode": "WAL",
+        # an toàn với WAL (chỉ có thể mất giao dịch cuối khi mất điện, không hỏng DB)
+        "synchronous": "NORMAL",
+        "mmap_size": SQLITE_MMAP_MB * 1024 * 1024,
+        "cache_size": -SQLITE_CACHE_MB * 1024,  # số âm = KiB
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    }
+    if readonly:
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def install_pragmas(eng, pragmas: Dict[str, object]):
+    """Gắn listener "connect" chạy các PRAGMA cho engine (sync, hoặc AsyncEngine.sync_engine)."""
+    if not pragmas:
+        return eng
+
+    @event.listens_for(eng, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for key, value in pragmas.items():
+            cur.execute(f"PRAGMA {key}={value}")
+        cur.close()
+
+    return eng
+
+
+def make_sqlite_engine(url: str, profile: str = "default", readonly: bool = False):
+    kwargs = {"echo": False, "connect_args": {"check_same_thread": False}}
+    if profile == "production":
+        kwargs["connect_args"]["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000.0
+        if readonly:
+            kwargs.update(poolclass=QueuePool, pool_size=SQLITE_READ_POOL, max_overflow=SQLITE_READ_POOL)
+    return install_pragmas(create_engine(url, **kwargs), sqlite_pragmas(profile, readonly))
+
+
 if DB_URL.startswith("sqlite"):
-    engine = create_engine(DB_URL, echo=False, connect_args={"check_same_thread": False})
+    engine = make_sqlite_engine(DB_URL, SQLITE_PROFILE)
+    # route/search đọc qua pool riêng (query_only) để không tranh kết nối với API ghi
+    read_engine = (
+        make_sqlite_engine(DB_URL, SQLITE_PROFILE, readonly=True)
+        if SQLITE_PROFILE == "production"
+        else engine
+    )
 else:
     engine = create_engine(DB_URL, echo=False)
+    read_engine = engine
+
+# URL cho driver async (chế độ WAYFINDER_SERVING_MODE=async); SQLite tự suy ra aiosqlite
+ASYNC_DB_URL = os.getenv("WAYFINDER_ASYNC_DB_URL") or (
+    DB_URL.replace("sqlite:", "sqlite+aiosqlite:", 1) if DB_URL.startswith("sqlite:") else None
+)
+_async_engine = None
+
+
+def get_async_engine():
+    """AsyncEngine chỉ-đọc dùng chung (tạo lười); None nếu không có URL async hoặc thiếu driver."""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = False
+        if ASYNC_DB_URL:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            try:
+                _async_engine = create_async_engine(ASYNC_DB_URL, echo=False)
+            except ImportError:
+                pass
+            else:
+                if ASYNC_DB_URL.startswith("sqlite"):
+                    install_pragmas(_async_engine.sync_engine, sqlite_pragmas(SQLITE_PROFILE, True))
+    return _async_engine or None
+
+# Cột thêm sau khi đã có DB thật: (bảng, cột, DDL cho ALTER TABLE ... ADD COLUMN);
+# DDL là kiểu SQLAlchemy thì dịch theo dialect của engine (LargeBinary: BLOB, BYTEA...)
+# create_all không sửa bảng đã tồn tại nên init_db tự bổ sung các cột còn thiếu.
+ADDED_COLUMNS = [
+    ("edge", "kind", "VARCHAR NOT NULL DEFAULT 'walk'"),
+    ("edge", "polyline_xy", LargeBinary()),
+]
+
+
+def migrate_columns():
+    insp = inspect(engine)
+    tables = set(insp.get_table_names())
+    with engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            if column in {c["name"] for c in insp.get_columns(table)}:
+                continue
+            if not isinstance(ddl, str):
+                ddl = ddl.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def migrate_edge_polylines(batch: int = 5000) -> int:
+    """
+    Chép Edge.polyline (JSON) của các hàng cũ sang blob polyline_xy. Cột cũ được giữ
+    nguyên làm bản sao lưu (chỉ xoá khi gọi clear_legacy_polylines).
+    Chạy theo lô, mỗi lô một giao dịch; trả số hàng đã chuyển.
+    """
+    from backend.utils.polyline import pack_polyline
+
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, polyline FROM edge WHERE polyline_xy IS NULL LIMIT :n"),
+                {"n": batch},
+            ).all()
+            if not rows:
+                return moved
+            conn.execute(
+                text("UPDATE edge SET polyline_xy = :xy WHERE id = :id"),
+                [{"id": eid, "xy": pack_polyline(json.loads(p or "[]"))} for eid, p in rows],
+            )
+        moved += len(rows)
+
+
+def clear_legacy_polylines() -> int:
+    """
+    Xoá JSON cũ trong Edge.polyline của các hàng đã có polyline_xy (không chạy lúc
+    khởi động; gọi tay qua `python -m backend.init_database --clear-legacy-polylines`
+    sau khi đã sao lưu DB). Trả số hàng đã xoá.
+    """
+    with engine.begin() as conn:
+        res = conn.execute(
+            text("UPDATE edge SET polyline = '' WHERE polyline_xy IS NOT NULL AND polyline <> ''")
+        )
+    return res.rowcount or 0
 
 
 def init_db():
@@ -33,3 +178,5 @@ def init_db():
     from backend.models.entities import Map, Node, Alias, Edge
 
     SQLModel.metadata.create_all(engine)
+    migrate_columns()
+    migrate_edge_polylines()
@@ -4,6 +4,7 @@ Script để khởi tạo database cho Indoor Wayfinder
 Chạy script này trước khi start server để tạo các bảng cần thiết
 """
 
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -12,13 +13,22 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(project_root))
 
-from backend.core.db import init_db
+from backend.core.db import clear_legacy_polylines, init_db
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--clear-legacy-polylines",
+        action="store_true",
+        help="xoá JSON cũ trong edge.polyline của cạnh đã có polyline_xy (không hoàn tác được)",
+    )
+    args = ap.parse_args()
     print("Đang khởi tạo database...")
     try:
         init_db()
         print("✅ Database đã được khởi tạo thành công!")
+        if args.clear_legacy_polylines:
+            print(f"Đã xoá polyline JSON cũ của {clear_legacy_polylines()} cạnh.")
         print("Bây giờ bạn có thể chạy server với: uvicorn backend.main:app --reload")
     except Exception as e:
         print(f"❌ Lỗi khi khởi tạo database: {e}")
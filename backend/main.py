@@ -1,8 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.core.db import init_db
+from backend.core.config import SERVING_MODE
+from backend.core.db import init_db, read_engine
 from fastapi.staticfiles import StaticFiles
-from backend.routers import maps, nodes, aliases, edges, routes, admin
+from backend.routers import maps, nodes, aliases, edges, routes, admin, async_routes
+from backend.services.graph_snapshot import load_snapshots
+from backend.services.snapshots import warm_snapshots
+from sqlmodel import Session
 
 app = FastAPI(title="Indoor Wayfinder API", version="0.1.0")
 
@@ -23,6 +27,12 @@ app.mount("/app", StaticFiles(directory="frontend"), name="app")
 @app.on_event("startup")
 def on_startup():
     init_db()
+    # nạp snapshot nhị phân còn hợp lệ thay vì đọc lại toàn bộ node/cạnh/alias từ DB
+    with Session(read_engine) as session:
+        load_snapshots(session)
+    if SERVING_MODE == "async":
+        # dựng sẵn snapshot để request đầu tiên không phải đọc DB
+        warm_snapshots()
 
 
 @app.get("/health")
@@ -31,6 +41,9 @@ def health():
 
 
 # routers
+if SERVING_MODE == "async":
+    # đặt trước router sync: /route, /nl-route, /aliases/search vào bản async
+    app.include_router(async_routes.router, prefix="", tags=["route"])
 app.include_router(maps.router, prefix="/maps", tags=["maps"])
 app.include_router(nodes.router, prefix="/nodes", tags=["nodes"])
 app.include_router(aliases.router, prefix="/aliases", tags=["aliases"])
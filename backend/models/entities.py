@@ -45,10 +45,16 @@ class Edge(SQLModel, table=True):
     start_node_id: int = Field(foreign_key="node.id")
     end_node_id: int = Field(foreign_key="node.id")
     floor: int = Field(default=1)
-    polyline: str  # JSON
+    # JSON (cột cũ): hàng mới để "", hàng đã chuyển giữ JSON gốc làm bản sao lưu;
+    # dữ liệu được đọc từ polyline_xy
+    polyline: str = ""
+    # float64 x0, y0, x1, y1, ... (utils/polyline.py: pack_polyline / polyline_xy)
+    polyline_xy: Optional[bytes] = None
     weight: float
     bidirectional: bool = True
     meta: Optional[str] = None
+    # "walk" (hành lang trong 1 tầng) | "stairs" | "elevator" (nối 2 tầng, weight = chi phí riêng)
+    kind: str = Field(default="walk")
 
     map: Map = Relationship(back_populates="edges")
 
@@ -61,3 +67,4 @@ class EdgeBase(SQLModel):
     bidirectional: bool = True
     meta: Optional[dict] = None
     floor: Optional[int] = None
+    kind: str = "walk"
@@ -7,6 +7,10 @@ from sqlalchemy import delete as sa_delete
 
 from backend.core.db import engine
 from backend.models.entities import Map, Node, Alias, Edge
+from backend.services.graph_cache import bump_map_version, cache_stats
+from backend.services.list_cache import list_cache
+from backend.services.route_cache import resolve_cache, route_cache
+from backend.services.snapshots import serving_stats
 
 router = APIRouter()
 
@@ -64,6 +68,7 @@ def clear_map(payload: ClearMapIn, session: Session = Depends(get_session)):
                 removed_file = False
 
     session.commit()
+    bump_map_version(payload.map_id)
 
     return {
         "ok": True,
@@ -75,3 +80,25 @@ def clear_map(payload: ClearMapIn, session: Session = Depends(get_session)):
             "upload_removed": removed_file,
         },
     }
+
+
+@router.get("/graph-cache", response_model=dict)
+def graph_cache_stats():
+    """Số liệu cache đồ thị: hit/miss, số lần dựng lại và thời gian dựng (ms)."""
+    return cache_stats()
+
+
+@router.get("/route-cache", response_model=dict)
+def route_cache_stats():
+    """
+    Số liệu cache kết quả /route và cache phân giải câu hỏi tự nhiên: hit rate,
+    dung lượng, số entry bị đẩy ra/hết hạn/huỷ; ở chế độ async thêm số request
+    trả lời từ snapshot / phải đọc DB. "lists": body đã serialize của các API danh
+    sách (ETag, services/list_cache.py).
+    """
+    return {
+        "routes": route_cache.stats(),
+        "resolutions": resolve_cache.stats(),
+        "lists": list_cache.stats(),
+        "serving": serving_stats(),
+    }
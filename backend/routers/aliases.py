@@ -1,10 +1,13 @@
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from pydantic import BaseModel, TypeAdapter
 from sqlmodel import Session, select
-from rapidfuzz import fuzz, process
-from backend.core.db import engine
+from backend.core.db import engine, read_engine
 from backend.models.entities import Alias, Node
+from backend.services.alias_index import get_alias_index
+from backend.services.graph_cache import bump_map_version
+from backend.services.list_cache import cached_list
+from backend.services.snapshots import map_exists
 from backend.utils.norm import normalize_name
 
 router = APIRouter()
@@ -15,6 +18,11 @@ def get_session():
         yield session
 
 
+def get_read_session():
+    with Session(read_engine) as session:
+        yield session
+
+
 class AliasIn(BaseModel):
     node_id: int
     name: str
@@ -50,16 +58,26 @@ def create_alias(payload: AliasIn, session: Session = Depends(get_session)):
     session.add(a)
     session.commit()
     session.refresh(a)
+    bump_map_version(n.map_id)
     return AliasOut(**a.dict())
 
 
+_alias_list = TypeAdapter(List[AliasOut])
+
+
 @router.get("", response_model=List[AliasOut])
-def list_aliases(node_id: Optional[int] = None, session: Session = Depends(get_session)):
-    q = select(Alias)
-    if node_id:
-        q = q.where(Alias.node_id == node_id)
-    items = session.exec(q).all()
-    return [AliasOut(**a.dict()) for a in items]
+def list_aliases(
+    request: Request, node_id: Optional[int] = None, session: Session = Depends(get_session)
+):
+    def build() -> bytes:
+        q = select(Alias)
+        if node_id:
+            q = q.where(Alias.node_id == node_id)
+        items = session.exec(q.order_by(Alias.id)).all()
+        return _alias_list.dump_json([AliasOut(**a.dict()) for a in items])
+
+    # lọc theo node nên không biết map nếu không truy vấn: dùng revision "mọi map"
+    return cached_list(request, None, ("aliases", node_id or None), build)
 
 
 @router.delete("/{alias_id}", response_model=dict)
@@ -67,8 +85,11 @@ def delete_alias(alias_id: int, session: Session = Depends(get_session)):
     a = session.get(Alias, alias_id)
     if not a:
         raise HTTPException(status_code=404, detail="Alias không tồn tại.")
+    n = session.get(Node, a.node_id)
     session.delete(a)
     session.commit()
+    if n is not None:
+        bump_map_version(n.map_id)
     return {"ok": True}
 
 
@@ -86,8 +107,12 @@ class AliasSearchOut(BaseModel):
 def search_alias(
     q: str = Query(..., description="Tên cần tìm"),
     limit: int = 5,
-    session: Session = Depends(get_session),
+    map_id: Optional[int] = Query(None, description="Chỉ tìm trong map này"),
+    session: Session = Depends(get_read_session),
 ):
+    # map lạ: 404 trước khi dựng chỉ mục / snapshot (không để lại file hay entry cache)
+    if map_id is not None and not map_exists(session, map_id):
+        raise HTTPException(status_code=404, detail="Map không tồn tại.")
     # guard
     if not q or not q.strip():
         return []
@@ -95,26 +120,13 @@ def search_alias(
     if not norm_q:
         return []
 
-    items: List[Alias] = session.exec(select(Alias)).all()
-    if not items:
-        return []
-
-    # Chuẩn bị map id -> tên đã chuẩn hoá để fuzzy
-    norm_map = {a.id: normalize_name(a.name) for a in items}
-    items_by_id = {a.id: a for a in items}
-
-    # RapidFuzz trả (choice_value, score, choice_key) khi choices là dict
-    results = process.extract(norm_q, norm_map, scorer=fuzz.token_set_ratio, limit=limit)
-
-    out: List[AliasSearchOut] = []
-    for choice_value, score, choice_key in results:
-        a = items_by_id.get(choice_key)
-        if a is None:
-            # fallback cực đoan (đề phòng lib khác version) — bỏ qua nếu không khớp
-            continue
-        out.append(
-            AliasSearchOut(
-                node_id=a.node_id, alias_id=a.id, name=a.name, score=float(score)
-            )
+    idx = get_alias_index(session, map_id)
+    return [
+        AliasSearchOut(
+            node_id=idx.node_ids[pos],
+            alias_id=idx.alias_ids[pos],
+            name=idx.names[pos],
+            score=score,
         )
-    return out
+        for pos, score in idx.search(norm_q, limit)
+    ]
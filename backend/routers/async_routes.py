@@ -0,0 +1,49 @@
+"""
+Bản async của /route, /nl-route và /aliases/search (WAYFINDER_SERVING_MODE=async).
+
+Cùng logic và response với handler sync (routes.py, aliases.py); khác ở chỗ request
+được trả lời từ snapshot trong bộ nhớ ngay trên event loop, chỉ khi trượt mới đọc
+DB qua driver async (xem services/snapshots.py). main.py gắn router này trước các
+router sync nên các đường dẫn trùng sẽ vào đây.
+"""
+
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Query
+
+from backend.routers.aliases import AliasSearchOut, search_alias
+from backend.routers.routes import RouteRequest, RouteResponse, nl_route, route_api
+from backend.services.snapshots import serve
+
+router = APIRouter()
+
+
+@router.post("/route", response_model=RouteResponse)
+async def route_api_async(payload: RouteRequest):
+    return await serve(route_api, payload)
+
+
+@router.get("/nl-route", response_model=RouteResponse)
+async def nl_route_async(
+    map_id: int = Query(...),
+    q: str = Query(..., description="Câu hỏi: 'từ A đến B'..."),
+    cx: Optional[float] = Query(None),
+    cy: Optional[float] = Query(None),
+    floor: Optional[int] = Query(None, description="Tầng của (cx, cy)"),
+    algorithm: Optional[Literal["dijkstra", "astar", "alt", "ch"]] = Query(None),
+    simplify_px: Optional[float] = Query(None, ge=0, description="Rút gọn polyline (px)"),
+    format: Literal["json", "encoded"] = Query("json", description="encoded = polyline mã hoá gọn"),
+    precision: Optional[int] = Query(None, ge=0, le=6),
+):
+    return await serve(
+        nl_route, map_id=map_id, q=q, cx=cx, cy=cy, floor=floor, algorithm=algorithm,
+        simplify_px=simplify_px, format=format, precision=precision,
+    )
+
+
+@router.get("/aliases/search", response_model=List[AliasSearchOut])
+async def search_alias_async(
+    q: str = Query(..., description="Tên cần tìm"),
+    limit: int = 5,
+    map_id: Optional[int] = Query(None, description="Chỉ tìm trong map này"),
+):
+    return await serve(search_alias, q=q, limit=limit, map_id=map_id)
@@ -1,12 +1,21 @@
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Union
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from pydantic import BaseModel, Field, TypeAdapter
 from sqlmodel import Session, select
-import json
 
+from backend.core.config import POLYLINE_PRECISION
 from backend.core.db import engine
 from backend.models.entities import Edge, Map, Node, EdgeBase
+from backend.services.edge_rules import edge_geometry, stored_polyline
+from backend.services.graph_cache import bump_map_version
+from backend.services.list_cache import cached_list
 from backend.utils.geo import polyline_length
+from backend.utils.polyline import (
+    encode_polyline_blobs,
+    pack_polyline,
+    unpack_polyline,
+    unpack_polylines,
+)
 
 router = APIRouter()
 
@@ -17,14 +26,16 @@ def get_session():
 
 
 class EdgeIn(EdgeBase):
-    pass
+    # chỉ dùng cho cạnh nối tầng: chi phí đi cầu thang/thang máy (thay cho độ dài polyline)
+    cost: Optional[float] = None
 
 
 class EdgeOut(EdgeBase):
     id: int
     floor: int
-    polyline: List[List[float]]
+    polyline: Union[List[List[float]], str]  # chuỗi khi format=encoded
     weight: float
+    polyline_precision: Optional[int] = None  # số chữ số thập phân của polyline mã hoá
 
 
 @router.post("", response_model=EdgeOut)
@@ -38,45 +49,25 @@ def create_edge(payload: EdgeIn, session: Session = Depends(get_session)):
     if not s or not e or s.map_id != m.id or e.map_id != m.id:
         raise HTTPException(status_code=400, detail="Node không hợp lệ hoặc khác map.")
 
-    # Xác định floor:
-    # - Nếu payload.floor có -> phải khớp với cả 2 node
-    # - Nếu không -> lấy theo node start, và kiểm tra end cùng tầng
-    if payload.floor is not None:
-        floor = int(payload.floor)
-        if s.floor != floor or e.floor != floor:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Floor không khớp: start({s.floor})/end({e.floor}) ≠ payload({floor}).",
-            )
-    else:
-        if s.floor != e.floor:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Hai node không cùng tầng: start({s.floor}) vs end({e.floor}).",
-            )
-        floor = int(s.floor)
-
-    # Nếu polyline rỗng, tự tạo đoạn thẳng từ (s) tới (e)
-    poly = payload.polyline or []
-    if len(poly) < 2:
-        poly = [[s.x, s.y], [e.x, e.y]]
-
-    # tính trọng số theo pixel
-    w = polyline_length(poly)
+    floor, poly, w = edge_geometry(
+        payload.kind, s, e, payload.floor, payload.polyline, payload.cost
+    )
 
     edge = Edge(
         map_id=m.id,
         start_node_id=s.id,
         end_node_id=e.id,
         floor=floor,
-        polyline=json.dumps(poly),
+        polyline_xy=pack_polyline(poly),
         weight=w,
         bidirectional=payload.bidirectional,
         meta=payload.meta,
+        kind=payload.kind,
     )
     session.add(edge)
     session.commit()
     session.refresh(edge)
+    bump_map_version(edge.map_id)
 
     return EdgeOut(
         id=edge.id,
@@ -84,42 +75,69 @@ def create_edge(payload: EdgeIn, session: Session = Depends(get_session)):
         start_node_id=edge.start_node_id,
         end_node_id=edge.end_node_id,
         floor=edge.floor,  # <<<<<< THÊM
-        polyline=json.loads(edge.polyline),
+        polyline=poly,
         weight=edge.weight,
         bidirectional=edge.bidirectional,
         meta=edge.meta,
+        kind=edge.kind,
     )
 
 
+_edge_list = TypeAdapter(List[EdgeOut])
+
+
 @router.get("", response_model=List[EdgeOut])
 def list_edges(
-    map_id: int, floor: Optional[int] = None, session: Session = Depends(get_session)
+    request: Request,
+    map_id: int,
+    floor: Optional[int] = None,
+    format: Literal["json", "encoded"] = Query("json", description="encoded = polyline mã hoá gọn"),
+    precision: Optional[int] = Query(None, ge=0, le=6),
+    session: Session = Depends(get_session),
 ):
-    stmt = select(Edge).where(Edge.map_id == map_id)
-    if floor is not None:
-        stmt = stmt.where(Edge.floor == floor)
-    edges = session.exec(stmt).all()
-
-    return [
-        EdgeOut(
-            id=edge.id,
-            map_id=edge.map_id,
-            start_node_id=edge.start_node_id,
-            end_node_id=edge.end_node_id,
-            floor=edge.floor,
-            polyline=json.loads(edge.polyline),
-            weight=edge.weight,
-            bidirectional=edge.bidirectional,
-            meta=edge.meta,
+    encoded = format == "encoded"
+    if encoded:
+        precision = POLYLINE_PRECISION if precision is None else precision
+    else:
+        precision = None
+
+    def build() -> bytes:
+        stmt = select(Edge).where(Edge.map_id == map_id)
+        if floor is not None:
+            stmt = stmt.where(Edge.floor == floor)
+        edges = session.exec(stmt.order_by(Edge.id)).all()
+
+        # một lượt NumPy trên các blob polyline_xy của mọi cạnh thay vì giải mã từng cạnh
+        blobs = [edge.polyline_xy for edge in edges]
+        polys = encode_polyline_blobs(blobs, precision) if encoded else unpack_polylines(blobs)
+        return _edge_list.dump_json(
+            [
+                EdgeOut(
+                    id=edge.id,
+                    map_id=edge.map_id,
+                    start_node_id=edge.start_node_id,
+                    end_node_id=edge.end_node_id,
+                    floor=edge.floor,
+                    polyline=poly,
+                    weight=edge.weight,
+                    bidirectional=edge.bidirectional,
+                    meta=edge.meta,
+                    kind=edge.kind,
+                    polyline_precision=precision,
+                )
+                for edge, poly in zip(edges, polys)
+            ]
         )
-        for edge in edges
-    ]
+
+    # ETag theo revision của map: 304 không truy vấn, không giải mã polyline
+    return cached_list(request, map_id, ("edges", floor, format, precision), build)
 
 
 class EdgeUpdate(BaseModel):
     polyline: Optional[List[List[float]]] = None
     bidirectional: Optional[bool] = None
     meta: Optional[str] = None
+    cost: Optional[float] = None  # chỉ cho cạnh nối tầng
 
 
 @router.patch("/{edge_id}", response_model=EdgeOut)
@@ -134,8 +152,19 @@ def update_edge(
     if payload.polyline is not None:
         if len(payload.polyline) < 2:
             raise HTTPException(status_code=400, detail="Polyline cần >= 2 điểm.")
-        ed.polyline = json.dumps(payload.polyline)
-        ed.weight = polyline_length(payload.polyline)
+        poly = stored_polyline(payload.polyline) if ed.kind == "walk" else payload.polyline
+        ed.polyline_xy = pack_polyline(poly)
+        if ed.kind == "walk":
+            ed.weight = polyline_length(poly)
+        changed = True
+    if payload.cost is not None:
+        if ed.kind == "walk":
+            raise HTTPException(
+                status_code=400, detail="cost chỉ dùng cho cạnh nối tầng (stairs/elevator)."
+            )
+        if payload.cost < 0:
+            raise HTTPException(status_code=400, detail="cost phải >= 0.")
+        ed.weight = float(payload.cost)
         changed = True
     if payload.bidirectional is not None:
         ed.bidirectional = payload.bidirectional
@@ -148,6 +177,7 @@ def update_edge(
         session.add(ed)
         session.commit()
         session.refresh(ed)
+        bump_map_version(ed.map_id)
 
     return EdgeOut(
         id=ed.id,
@@ -155,10 +185,11 @@ def update_edge(
         start_node_id=ed.start_node_id,
         end_node_id=ed.end_node_id,
         floor=ed.floor,
-        polyline=json.loads(ed.polyline),
+        polyline=unpack_polyline(ed.polyline_xy),
         weight=ed.weight,
         bidirectional=ed.bidirectional,
         meta=ed.meta,
+        kind=ed.kind,
     )
 
 
@@ -167,6 +198,8 @@ def delete_edge(edge_id: int, session: Session = Depends(get_session)):
     ed = session.get(Edge, edge_id)
     if not ed:
         raise HTTPException(status_code=404, detail="Edge không tồn tại.")
+    map_id = ed.map_id
     session.delete(ed)
     session.commit()
+    bump_map_version(map_id)
     return {"ok": True}
@@ -1,11 +1,22 @@
+import json
 import os, shutil
 from datetime import datetime
+from typing import Any, Dict
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi import Depends
+from fastapi import Body, Depends, Request, Response
 from PIL import Image
 from sqlmodel import Session, select
 from backend.core.db import engine
 from backend.models.entities import Map
+from backend.services.graph_cache import bump_map_version
+from backend.services.graph_snapshot import get_graph_snapshot, snapshot_bytes, snapshot_from_bytes
+from backend.services.list_cache import cached_list
+from backend.services.importer import (
+    ImportResult,
+    import_doc_from_snapshot,
+    import_graph,
+    parse_import,
+)
 
 router = APIRouter()
 
@@ -52,6 +63,8 @@ async def create_map(
     session.add(m)
     session.commit()
     session.refresh(m)
+    # id có thể được SQLite dùng lại sau khi xoá map -> bỏ mọi cache còn nhớ id này
+    bump_map_version(m.id)
 
     return {
         "id": m.id,
@@ -81,10 +94,10 @@ def get_map(map_id: int, session: Session = Depends(get_session)):
 
 
 @router.get("", response_model=dict)
-def list_maps(session: Session = Depends(get_session)):
-    maps = session.exec(select(Map).order_by(Map.created_at.desc())).all()
-    return {
-        "items": [
+def list_maps(request: Request, session: Session = Depends(get_session)):
+    def build() -> bytes:
+        maps = session.exec(select(Map).order_by(Map.created_at.desc())).all()
+        items = [
             {
                 "id": m.id,
                 "name": m.name,
@@ -96,4 +109,47 @@ def list_maps(session: Session = Depends(get_session)):
             }
             for m in maps
         ]
-    }
+        # như JSONResponse mặc định của FastAPI
+        return json.dumps({"items": items}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    # tạo/xoá map đều bump version nên revision "mọi map" đổi theo
+    return cached_list(request, None, ("maps",), build)
+
+
+@router.post("/{map_id}/import", response_model=ImportResult)
+def import_map_graph(
+    map_id: int,
+    payload: Dict[str, Any] = Body(..., description="JSON {nodes, aliases, edges} hoặc GeoJSON FeatureCollection"),
+    session: Session = Depends(get_session),
+):
+    """Nhập hàng loạt node/alias/cạnh với id tạm, một giao dịch (xem services/importer.py)."""
+    if not session.get(Map, map_id):
+        raise HTTPException(status_code=404, detail="Map không tồn tại.")
+    return import_graph(session, map_id, parse_import(payload))
+
+
+@router.get("/{map_id}/snapshot")
+def export_map_snapshot(map_id: int, session: Session = Depends(get_session)):
+    """Snapshot nhị phân của đồ thị map (node, CSR, polyline, alias; xem services/graph_snapshot.py)."""
+    if not session.get(Map, map_id):
+        raise HTTPException(status_code=404, detail="Map không tồn tại.")
+    return Response(
+        content=snapshot_bytes(get_graph_snapshot(session, map_id)),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="map_{map_id}.snap"'},
+    )
+
+
+@router.post("/{map_id}/snapshot", response_model=ImportResult)
+def import_map_snapshot(
+    map_id: int,
+    data: bytes = Body(..., media_type="application/octet-stream", description="File .snap đã xuất"),
+    session: Session = Depends(get_session),
+):
+    """Nhập snapshot đã xuất vào map (thêm node/alias/cạnh mới, như /import)."""
+    if not session.get(Map, map_id):
+        raise HTTPException(status_code=404, detail="Map không tồn tại.")
+    snap = snapshot_from_bytes(data)
+    if snap is None:
+        raise HTTPException(status_code=400, detail="File snapshot không hợp lệ hoặc khác phiên bản.")
+    return import_graph(session, map_id, import_doc_from_snapshot(snap))
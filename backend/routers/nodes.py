@@ -1,9 +1,11 @@
 from typing import Optional, List
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Request
+from pydantic import BaseModel, TypeAdapter
 from sqlmodel import Session, select
 from backend.core.db import engine
 from backend.models.entities import Node, Map, Alias, Edge
+from backend.services.graph_cache import bump_map_version
+from backend.services.list_cache import cached_list
 
 router = APIRouter()
 
@@ -41,17 +43,29 @@ def create_node(payload: NodeIn, session: Session = Depends(get_session)):
     session.add(n)
     session.commit()
     session.refresh(n)
+    bump_map_version(n.map_id)
     return NodeOut(**n.dict())
 
 
+_node_list = TypeAdapter(List[NodeOut])
+
+
 @router.get("", response_model=List[NodeOut])
 def list_nodes(
-    map_id: int, floor: Optional[int] = None, session: Session = Depends(get_session)
+    request: Request,
+    map_id: int,
+    floor: Optional[int] = None,
+    session: Session = Depends(get_session),
 ):
-    stmt = select(Node).where(Node.map_id == map_id)
-    if floor is not None:
-        stmt = stmt.where(Node.floor == floor)
-    return session.exec(stmt).all()
+    def build() -> bytes:
+        stmt = select(Node).where(Node.map_id == map_id)
+        if floor is not None:
+            stmt = stmt.where(Node.floor == floor)
+        rows = session.exec(stmt.order_by(Node.id)).all()
+        return _node_list.dump_json([NodeOut(**n.dict()) for n in rows])
+
+    # ETag theo revision của map: 304 không truy vấn (services/list_cache.py)
+    return cached_list(request, map_id, ("nodes", floor), build)
 
 
 @router.get("/{node_id}", response_model=NodeOut)
@@ -83,6 +97,7 @@ def update_node(
     session.add(n)
     session.commit()
     session.refresh(n)
+    bump_map_version(n.map_id)
     return NodeOut(**n.dict())
 
 
@@ -105,6 +120,8 @@ def delete_node(node_id: int, session: Session = Depends(get_session)):
         session.delete(e)
 
     # Cuối cùng xoá node
+    map_id = n.map_id
     session.delete(n)
     session.commit()
+    bump_map_version(map_id)
     return {"ok": True}
@@ -1,34 +1,66 @@
-from typing import List, Optional, Dict, Tuple
+from typing import Callable, Iterator, List, Optional, Dict, Tuple, Literal, Union
 from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
 import networkx as nx
+import numpy as np
 
-from backend.core.db import engine
+from backend.core.config import (
+    POLYLINE_PRECISION,
+    ROUTE_SIMPLIFY_PX,
+    ROUTING_ENGINE,
+    ROUTING_ALGORITHM,
+)
+from backend.core.db import read_engine
 from backend.models.entities import Map, Node, Alias
-from backend.services.graph import build_graph_for_map
+from backend.services.alias_index import get_alias_index
+from backend.services.alt import get_alt
+from backend.services.ch import get_ch
+from backend.services.csr import get_csr
+from backend.services.distance import distance_matrix, one_to_many
+from backend.services.floors import FloorLeg, get_floor_overlay
+from backend.services.graph import astar_path
+from backend.services.graph_cache import get_graph, get_map_version
+from backend.services.names import get_node_names
+from backend.services.route_cache import (
+    RESOLVE_ENTRY_BYTES,
+    ROUTE_ENTRY_BYTES,
+    ROUTE_INSTRUCTION_BYTES,
+    ROUTE_LEG_BYTES,
+    ROUTE_NODE_BYTES,
+    ROUTE_POINT_BYTES,
+    resolve_cache,
+    route_cache,
+)
+from backend.services.snapshots import map_exists
+from backend.services.spatial import get_landmark_index, get_snap_index
 from backend.utils.geo import (
     merge_polylines,
     polyline_length,
     angle_signed,
-    signed_turn_angle_screen,
-    polyline_length,
-    merge_polys_with_tol,
+    merge_polys_xy,
     orient_polyline_to_uv,
     initial_heading_text_from_angle,
-    heading_angle_from_polyline,
-    dedupe_polyline,
+    heading_angle_xy,
+    cumulative_distance,
+    dedupe_mask,
+    simplify_mask,
+    turn_angles,
+    project_point_to_polyline,
 )
 from backend.utils.nlp import extract_a_b
+from backend.utils.polyline import encode_polyline
 from backend.utils.norm import normalize_name
-from rapidfuzz import process, fuzz
 import math
+import time
 
 router = APIRouter()
 
 
 def get_session():
-    with Session(engine) as session:
+    # router chỉ đọc -> pool chỉ-đọc (profile SQLite production)
+    with Session(read_engine) as session:
         yield session
 
 
@@ -43,31 +75,103 @@ class RouteRequest(BaseModel):
     q: Optional[str] = None
     cx: Optional[float] = None
     cy: Optional[float] = None
+    floor: Optional[int] = None  # tầng của (cx, cy); None = tầng có hành lang gần nhất
+    # Ghi đè thuật toán mặc định (WAYFINDER_ROUTING_ALGORITHM)
+    algorithm: Optional[Literal["dijkstra", "astar", "alt", "ch"]] = None
+    # Rút gọn polyline trả về (Douglas-Peucker, px; 0 = giữ nguyên; None = WAYFINDER_ROUTE_SIMPLIFY_PX)
+    simplify_px: Optional[float] = Field(None, ge=0)
+    # "encoded": polyline là chuỗi mã hoá gọn (utils/polyline.py) thay cho mảng [[x, y], ...]
+    format: Literal["json", "encoded"] = "json"
+    precision: Optional[int] = Field(None, ge=0, le=6)  # None = WAYFINDER_POLYLINE_PRECISION
 
 
 class Instruction(BaseModel):
-    kind: str  # "straight" | "left" | "right"
+    kind: str  # "start" | "heading" | "straight" | "left" | "right" | "arrive" | "stairs" | "elevator"
     text: str
     at_index: int  # index trong polyline hợp nhất (điểm "rẽ")
     distance_px: float
 
 
+class ConnectorInstruction(Instruction):
+    # kind: "stairs" | "elevator"; at_index = điểm cuối của chặng trước khi đổi tầng
+    from_floor: int
+    to_floor: int
+
+
+class RouteLeg(BaseModel):
+    floor: int
+    start_index: int  # đoạn polyline[start_index..end_index] nằm trên tầng này
+    end_index: int
+
+
 class RouteResponse(BaseModel):
     path_node_ids: List[int]
-    polyline: List[List[float]]
-    length_px: float
-    instructions: List[Instruction]
+    polyline: Union[List[List[float]], str]  # chuỗi khi format=encoded
+    length_px: float  # chỉ tính quãng đi bộ trong tầng
+    instructions: List[Union[ConnectorInstruction, Instruction]]
+    algorithm: Optional[str] = None
+    expanded_nodes: Optional[int] = None  # số node đã settle khi tìm đường
+    legs: Optional[List[RouteLeg]] = None  # chỉ có với tuyến nhiều tầng
+    polyline_precision: Optional[int] = None  # số chữ số thập phân của polyline mã hoá
+
+
+class RoutePair(BaseModel):
+    start_id: int
+    end_id: int
+
+
+class BatchRouteRequest(BaseModel):
+    map_id: int
+    # Danh sách cặp (start, end) ...
+    pairs: Optional[List[RoutePair]] = None
+    # ... hoặc một nguồn với nhiều đích
+    source_id: Optional[int] = None
+    target_ids: Optional[List[int]] = None
+    simplify_px: Optional[float] = Field(None, ge=0)  # như RouteRequest
+
+
+class MatrixRequest(BaseModel):
+    map_id: int
+    # Mỗi phía chọn bằng id và/hoặc tên alias (vd. "nhà vệ sinh")
+    source_ids: Optional[List[int]] = None
+    source_q: Optional[str] = None
+    target_ids: Optional[List[int]] = None
+    target_q: Optional[str] = None
+
+
+class MatrixResponse(BaseModel):
+    source_ids: List[int]
+    target_ids: List[int]
+    # distances[i][j]: source_ids[i] -> target_ids[j] (px theo trọng số cạnh), null nếu không tới được
+    distances: List[List[Optional[float]]]
+    settled: int
+    elapsed_ms: float
+
+
+class NearestResponse(BaseModel):
+    from_id: int
+    node_ids: List[int]  # tăng dần theo khoảng cách
+    distances: List[float]
+    names: List[str]
+    settled: int
+    elapsed_ms: float
+
+
+class BatchRouteItem(BaseModel):
+    index: int  # vị trí cặp trong yêu cầu (kết quả trả theo nhóm nguồn, không theo thứ tự)
+    start_id: int
+    end_id: int
+    status_code: int = 200
+    route: Optional[RouteResponse] = None
+    error: Optional[str] = None
 
 
 # ------- Helpers -------
 
 
-def best_alias_for_node(session: Session, node_id: int) -> str:
-    als = session.exec(select(Alias).where(Alias.node_id == node_id)).all()
-    if not als:
-        return f"điểm #{node_id}"
-    als.sort(key=lambda a: (-a.weight, a.id))
-    return als[0].name
+def best_alias_for_node(session: Session, map_id: int, node_id: int) -> str:
+    name = get_node_names(session, map_id).get(node_id)
+    return name if name is not None else f"điểm #{node_id}"
 
 
 def find_best_alias_node(
@@ -79,38 +183,99 @@ def find_best_alias_node(
 ) -> Optional[int]:
     """Tìm node_id theo tên (alias) gần đúng. Nếu trùng nhiều node, ưu tiên gần (cx,cy)."""
     norm_q = normalize_name(query)
-    aliases = session.exec(
-        select(Alias, Node).where(Alias.node_id == Node.id).where(Node.map_id == map_id)
-    ).all()
-    if not aliases:
+    idx = get_alias_index(session, map_id)
+    best = idx.search(norm_q, limit=5)
+    if not best:
         return None
 
-    # id -> tên chuẩn hoá; và map id -> (Alias, Node)
-    choices = {a.id: normalize_name(a.name) for (a, _n) in aliases}
-    by_id = {a.id: (a, n) for (a, n) in aliases}
+    # Nếu có vị trí (cx,cy), ưu tiên node gần nhất
+    if cx is not None and cy is not None:
+        pos = min(best, key=lambda t: math.hypot(idx.xs[t[0]] - cx, idx.ys[t[0]] - cy))[0]
+        return idx.node_ids[pos]
 
-    # RapidFuzz tuple: (choice_value, score, choice_key)
-    best = process.extract(norm_q, choices, scorer=fuzz.token_set_ratio, limit=5)
-    cand = []
-    for choice_value, score, choice_key in best:
-        pair = by_id.get(choice_key)
-        if pair:
-            _a, n = pair
-            cand.append((n, score))
+    # Ngược lại chọn score cao nhất
+    pos = min(best, key=lambda t: (-t[1], idx.node_ids[t[0]]))[0]
+    return idx.node_ids[pos]
 
-    if not cand:
-        return None
 
-    # Nếu có vị trí (cx,cy), ưu tiên node gần nhất
-    import math as _math
+def nearest_node_id(session: Session, map_id: int, cx: float, cy: float) -> int:
+    """Node thật gần (cx, cy) nhất của map (HTTP 400 nếu map chưa có node)."""
+    hit = get_snap_index(session, map_id).nearest_node(cx, cy)
+    if hit is None:
+        raise HTTPException(status_code=400, detail="Map chưa có node.")
+    return get_csr(session, map_id).node_ids[hit[0]]
+
+
+# Điểm tối thiểu để một alias được tính vào tập ứng viên (matrix/nearest)
+CANDIDATE_MIN_SCORE = 90.0
+CANDIDATE_LIMIT = 200
+
 
+def resolve_node_set(
+    session: Session,
+    map_id: int,
+    node_ids: Optional[List[int]] = None,
+    q: Optional[str] = None,
+) -> List[int]:
+    """
+    Tập node theo id và/hoặc theo tên: mọi node có alias khớp `q` với điểm
+    >= CANDIDATE_MIN_SCORE (vd. q="nhà vệ sinh" -> mọi nhà vệ sinh của map).
+    Giữ thứ tự, bỏ trùng.
+    """
+    out: List[int] = list(dict.fromkeys(node_ids or []))
+    if q:
+        idx = get_alias_index(session, map_id)
+        seen = set(out)
+        for pos, score in idx.search(normalize_name(q), limit=CANDIDATE_LIMIT):
+            nid = idx.node_ids[pos]
+            if score >= CANDIDATE_MIN_SCORE and nid not in seen:
+                seen.add(nid)
+                out.append(nid)
+    return out
+
+
+# Lưới làm tròn (px) của (cx, cy) trong khoá cache phân giải câu hỏi
+RESOLVE_GRID_PX = 8.0
+
+
+def resolve_query(
+    session: Session,
+    map_id: int,
+    q: str,
+    cx: Optional[float] = None,
+    cy: Optional[float] = None,
+) -> Tuple[bool, Optional[int], Optional[int]]:
+    """
+    Phân giải câu hỏi tự nhiên thành (có điểm A trong câu?, node A, node B).
+
+    Kết quả được nhớ theo (map, q đã gom khoảng trắng + chữ thường, cx/cy làm tròn
+    RESOLVE_GRID_PX, version map) nên câu hỏi lặp lại bỏ qua hẳn extract_a_b,
+    normalize_name và so khớp alias; version đổi khi alias/node của map đổi.
+    Việc so khớp cũng dùng cx/cy đã làm tròn để kết quả không phụ thuộc hit/miss.
+    """
     if cx is not None and cy is not None:
-        cand.sort(key=lambda t: _math.hypot(t[0].x - cx, t[0].y - cy))
-        return cand[0][0].id
+        cx = round(cx / RESOLVE_GRID_PX) * RESOLVE_GRID_PX
+        cy = round(cy / RESOLVE_GRID_PX) * RESOLVE_GRID_PX
+    else:
+        cx = cy = None
+    text = " ".join(q.lower().split())
+    version = get_map_version(map_id)
+    key = (map_id, text, cx, cy, version)
+    cached = resolve_cache.get(key)
+    if cached is not None:
+        return cached
 
-    # Ngược lại chọn score cao nhất
-    cand.sort(key=lambda t: (-t[1], t[0].id))
-    return cand[0][0].id
+    a_txt, b_txt = extract_a_b(text)
+    if b_txt is None and a_txt is None:
+        raise HTTPException(
+            status_code=400, detail="Không trích xuất được điểm đầu/cuối từ câu hỏi."
+        )
+    a_id = find_best_alias_node(session, map_id, a_txt, cx, cy) if a_txt else None
+    b_id = find_best_alias_node(session, map_id, b_txt, cx, cy) if b_txt else None
+    res = (a_txt is not None, a_id, b_id)
+    if get_map_version(map_id) == version:
+        resolve_cache.put(key, res, RESOLVE_ENTRY_BYTES + len(text))
+    return res
 
 
 def turn_text(angle: float, thresh: float = 25.0):
@@ -123,41 +288,38 @@ def turn_text(angle: float, thresh: float = 25.0):
 
 
 def nearest_landmark_name(
-    session: Session, map_id: int, x: float, y: float, radius: float = 80.0
+    session: Session, map_id: int, x: float, y: float, floor: Optional[int] = None, radius: float = 80.0
 ) -> Optional[str]:
-    """Tìm landmark gần 1 điểm. Trả tên alias 'đẹp' nhất nếu có."""
-    nodes = session.exec(
-        select(Node).where(Node.map_id == map_id).where(Node.is_landmark == True)
-    ).all()
+    """Tìm landmark gần 1 điểm trên tầng `floor` (None: mọi tầng). Trả tên alias 'đẹp' nhất nếu có."""
+    grids = get_landmark_index(session, map_id)
     best = None
-    best_d = None
-    for n in nodes:
-        d = math.hypot(n.x - x, n.y - y)
-        if d <= radius and (best is None or d < best_d):
-            best = n
-            best_d = d
-    if not best:
-        return None
-    # lấy alias có weight cao nhất
-    aliases = session.exec(select(Alias).where(Alias.node_id == best.id)).all()
-    if not aliases:
-        return f"điểm {best.id}"
-    aliases.sort(key=lambda a: (-a.weight, a.id))
-    return aliases[0].name
+    for f in grids if floor is None else (floor,):
+        grid = grids.get(f)
+        hit = grid.nearest(x, y, radius) if grid is not None else None
+        if hit is not None and (best is None or hit[1] < best[1]):
+            best = hit
+    return best[0] if best else None
 
 
 def build_instructions(
     session: Session,
     map_id: int,
-    merged: List[List[float]],
+    merged: np.ndarray,
     start_id: Optional[int] = None,
     end_id: Optional[int] = None,
+    cum: Optional[np.ndarray] = None,
+    floor: Optional[int] = None,
 ) -> List[Instruction]:
+    """
+    Hướng dẫn từng bước từ polyline hợp nhất (mảng (N, 2) từ _merge_route_polys);
+    `cum` là quãng đường thật tới từng đỉnh (khác cộng dồn của merged khi đã rút gọn),
+    `floor` là tầng của polyline (landmark chỉ lấy trên tầng đó).
+    """
     instr: List[Instruction] = []
 
     # --- Start ---
     if start_id is not None:
-        start_name = best_alias_for_node(session, start_id)
+        start_name = best_alias_for_node(session, map_id, start_id)
         instr.append(
             Instruction(
                 kind="start",
@@ -175,7 +337,7 @@ def build_instructions(
     if len(merged) < 2:
         # Arrive luôn nếu có
         if end_id is not None:
-            dest_name = best_alias_for_node(session, end_id)
+            dest_name = best_alias_for_node(session, map_id, end_id)
             instr.append(
                 Instruction(
                     kind="arrive", text=f"Đã đến {dest_name}", at_index=0, distance_px=0.0
@@ -190,9 +352,7 @@ def build_instructions(
         return instr
 
     # --- Initial heading (mượt, tích lũy >= 25 px) ---
-    ang = heading_angle_from_polyline(
-        [(float(x), float(y)) for x, y in merged], min_dist=25.0
-    )
+    ang = heading_angle_xy(merged, min_dist=25.0)
     heading_txt = initial_heading_text_from_angle(ang)
     instr.append(
         Instruction(
@@ -203,9 +363,12 @@ def build_instructions(
         )
     )
 
+    # quãng đường cộng dồn tới từng đỉnh: đoạn giữa hai đỉnh i < j dài cum[j] - cum[i]
+    cum = (cumulative_distance(merged) if cum is None else cum).tolist()
+
     # Nếu chỉ có 2 điểm => đi thẳng là xong
     if len(merged) == 2:
-        total = polyline_length(merged)
+        total = cum[-1]
         instr.append(
             Instruction(
                 kind="straight",
@@ -215,7 +378,7 @@ def build_instructions(
             )
         )
         dest_name = (
-            best_alias_for_node(session, end_id) if end_id is not None else "điểm đích"
+            best_alias_for_node(session, map_id, end_id) if end_id is not None else "điểm đích"
         )
         instr.append(
             Instruction(
@@ -225,37 +388,22 @@ def build_instructions(
         return instr
 
     # ---- Tuyến bình thường: tính rẽ trái/phải dựa trên hướng đang đi (giữa 2 đoạn liên tiếp) ----
-    seg_len = [0.0]
-    for i in range(1, len(merged)):
-        d = math.hypot(merged[i][0] - merged[i - 1][0], merged[i][1] - merged[i - 1][1])
-        seg_len.append(d)
-
-    turns = []  # [{i, kind, phrase, lm}]
-    for i in range(1, len(merged) - 1):
-        a = signed_turn_angle_screen(
-            tuple(merged[i - 1]), tuple(merged[i]), tuple(merged[i + 1])
-        )
-        kind, phrase = turn_text(a, thresh=25.0)  # dương = rẽ phải; âm = rẽ trái
-        if kind == "straight":
-            continue
-        lm = nearest_landmark_name(session, map_id, merged[i][0], merged[i][1])
-        turns.append({"i": i, "kind": kind, "phrase": phrase, "lm": lm})
-
+    angles = turn_angles(merged)  # góc tại đỉnh 1..N-2; dương = rẽ phải; âm = rẽ trái
     prev_idx = 0
-    for t in turns:
-        i = t["i"]
-        dist_before = sum(seg_len[prev_idx + 1 : i + 1])
-        lm_txt = f"gần {t['lm']}, " if t["lm"] else ""
-        text = f"Đi thẳng {int(dist_before)} px, {lm_txt}{t['phrase']}".replace(
-            ",  ", ", "
-        )
+    for i in (np.flatnonzero(np.abs(angles) > 25.0) + 1).tolist():
+        kind, phrase = turn_text(float(angles[i - 1]), thresh=25.0)
+        x, y = merged[i].tolist()
+        lm = nearest_landmark_name(session, map_id, x, y, floor)
+        dist_before = cum[i] - cum[prev_idx]
+        lm_txt = f"gần {lm}, " if lm else ""
+        text = f"Đi thẳng {int(dist_before)} px, {lm_txt}{phrase}".replace(",  ", ", ")
         instr.append(
-            Instruction(kind=t["kind"], text=text, at_index=i, distance_px=dist_before)
+            Instruction(kind=kind, text=text, at_index=i, distance_px=dist_before)
         )
         prev_idx = i
 
     # Đoạn thẳng cuối
-    tail_dist = sum(seg_len[prev_idx + 1 : len(merged)])
+    tail_dist = cum[-1] - cum[prev_idx]
     if tail_dist > 1e-6:
         instr.append(
             Instruction(
@@ -268,7 +416,7 @@ def build_instructions(
 
     # --- Arrive ---
     dest_name = (
-        best_alias_for_node(session, end_id) if end_id is not None else "điểm đích"
+        best_alias_for_node(session, map_id, end_id) if end_id is not None else "điểm đích"
     )
     instr.append(
         Instruction(
@@ -282,25 +430,38 @@ def build_instructions(
     return instr
 
 
-def compute_route(
-    session: Session, map_id: int, start_id: int, end_id: int
-) -> RouteResponse:
-    G, node_pos = build_graph_for_map(session, map_id)
+def _path_networkx(
+    session: Session, map_id: int, start_id: int, end_id: int, algorithm: str
+) -> Tuple[List[int], List[List[Tuple[float, float]]], str, Optional[int]]:
+    G, node_pos = get_graph(session, map_id)
     if start_id not in G.nodes or end_id not in G.nodes:
         raise HTTPException(
             status_code=400,
             detail="start_id hoặc end_id không thuộc map hoặc không tồn tại.",
         )
 
-    try:
-        path_nodes: List[int] = nx.shortest_path(
-            G, source=start_id, target=end_id, weight="weight"
-        )
-    except nx.NetworkXNoPath:
-        raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+    expanded: Optional[int] = None
+    if algorithm in ("alt", "ch"):
+        algorithm = "astar"  # ALT/CH chỉ có cho engine CSR
+    if algorithm == "astar":
+        res = astar_path(G, node_pos, start_id, end_id)
+        if res is None:
+            raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+        path_nodes, expanded = res
+    else:
+        try:
+            path_nodes = nx.shortest_path(
+                G, source=start_id, target=end_id, weight="weight"
+            )
+        except nx.NetworkXNoPath:
+            raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+
+    return path_nodes, _nx_polys(G, node_pos, path_nodes), algorithm, expanded
+
 
+def _nx_polys(G, node_pos, path_nodes: List[int]) -> List[List[Tuple[float, float]]]:
     # Lấy polyline theo từng cạnh và ORIENT theo chiều u->v
-    oriented_polys: List[List[List[float]]] = []
+    oriented_polys: List[List[Tuple[float, float]]] = []
     for i in range(1, len(path_nodes)):
         u, v = path_nodes[i - 1], path_nodes[i]
         data = G.get_edge_data(u, v)
@@ -310,81 +471,557 @@ def compute_route(
         # Định hướng polyline theo node_pos[u] -> node_pos[v]
         u_pos = (float(node_pos[u][0]), float(node_pos[u][1]))
         v_pos = (float(node_pos[v][0]), float(node_pos[v][1]))
-        oriented = orient_polyline_to_uv(
-            [(float(x), float(y)) for x, y in raw], u_pos, v_pos
+        oriented_polys.append(
+            orient_polyline_to_uv([(float(x), float(y)) for x, y in raw], u_pos, v_pos)
+        )
+    return oriented_polys
+
+
+def _path_csr(
+    session: Session, map_id: int, start_id: int, end_id: int, algorithm: str
+) -> Tuple[List[int], List[List[Tuple[float, float]]], str, Optional[int]]:
+    g = get_csr(session, map_id)
+    s = g.index.get(start_id)
+    t = g.index.get(end_id)
+    if s is None or t is None:
+        raise HTTPException(
+            status_code=400,
+            detail="start_id hoặc end_id không thuộc map hoặc không tồn tại.",
+        )
+
+    if algorithm == "ch":
+        # CH trả thẳng các slot cạnh gốc (đã bung shortcut)
+        res = get_ch(session, map_id).query(s, t)
+        if res is None:
+            raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+        path_idx, slots, settled = res
+    else:
+        h = None
+        if algorithm == "astar":
+            h = g.euclid_heuristic(t)
+        elif algorithm == "alt":
+            h = get_alt(session, map_id).heuristic(t, g.euclid_heuristic(t))
+        if h is None:
+            # heuristic Euclid không an toàn trên map này (xem h_scale) -> Dijkstra
+            algorithm = "dijkstra"
+            res = g.dijkstra(s, t)
+        else:
+            res = g.astar(s, t, h)
+        if res is None:
+            raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+        path_idx, arcs, settled = res
+        slots = [g.arc_edge[a] for a in arcs]
+
+    return [g.node_ids[i] for i in path_idx], _csr_polys(g, path_idx, slots), algorithm, settled
+
+
+def _csr_polys(g, path_idx: List[int], slots: List[int]) -> List[List[Tuple[float, float]]]:
+    """Polyline của từng cạnh trên đường (theo slot), đã ORIENT theo chiều đi."""
+    oriented_polys: List[List[Tuple[float, float]]] = []
+    for k, slot in enumerate(slots):
+        u, v = path_idx[k], path_idx[k + 1]
+        oriented_polys.append(
+            orient_polyline_to_uv(g.edge_polyline(slot), g.node_pos(u), g.node_pos(v))
+        )
+    return oriented_polys
+
+
+def _route_entry_bytes(resp: RouteResponse) -> int:
+    """Cỡ ước lượng (xấp xỉ trên cỡ JSON) của tuyến trong route_cache, không serialize."""
+    return (
+        ROUTE_ENTRY_BYTES
+        + ROUTE_POINT_BYTES * len(resp.polyline)
+        + ROUTE_NODE_BYTES * len(resp.path_node_ids)
+        + sum(ROUTE_INSTRUCTION_BYTES + len(ins.text.encode("utf-8")) for ins in resp.instructions)
+        + ROUTE_LEG_BYTES * len(resp.legs or ())
+    )
+
+
+def compute_route(
+    session: Session,
+    map_id: int,
+    start_id: int,
+    end_id: int,
+    algorithm: Optional[str] = None,
+    simplify_px: Optional[float] = None,
+) -> RouteResponse:
+    algorithm = algorithm or ROUTING_ALGORITHM
+    simplify = _simplify_tol(simplify_px)
+    # cặp lặp lại (kiosk) chỉ tốn một lần tra dict; version trong khoá nên map đổi là trượt
+    version = get_map_version(map_id)
+    key = (map_id, start_id, end_id, version, algorithm, simplify)
+    cached = route_cache.get(key)
+    if cached is not None:
+        return cached
+
+    requested = algorithm
+    overlay = get_floor_overlay(session, map_id)
+    start_floor = overlay.node_floor.get(start_id)
+    end_floor = overlay.node_floor.get(end_id)
+    if overlay.connectors and start_floor is not None and end_floor is not None and start_floor != end_floor:
+        # khác tầng: tìm phân cấp qua cầu thang/thang máy
+        resp = _route_floors(session, map_id, start_id, end_id, overlay, simplify)
+    else:
+        if ROUTING_ENGINE == "networkx":
+            path_nodes, oriented_polys, algorithm, expanded = _path_networkx(
+                session, map_id, start_id, end_id, algorithm
+            )
+        else:
+            path_nodes, oriented_polys, algorithm, expanded = _path_csr(
+                session, map_id, start_id, end_id, algorithm
+            )
+        resp = _finish_route(
+            session, map_id, start_id, end_id, path_nodes, oriented_polys, algorithm, expanded,
+            simplify,
         )
-        oriented_polys.append([[p[0], p[1]] for p in oriented])
+    if get_map_version(map_id) == version:
+        route_cache.put((map_id, start_id, end_id, version, requested, simplify), resp, _route_entry_bytes(resp))
+    return resp
+
 
-    # Ghép có tolerance (tránh lệch 1-2 px)
-    merged = merge_polys_with_tol(
-        [[(x, y) for x, y in poly] for poly in oriented_polys], tol=1.5
+# Điểm chiếu cách node thật không quá ngưỡng này (px) thì xuất phát luôn từ node đó
+SNAP_NODE_TOL = 2.0
+
+
+def route_from_point(
+    session: Session,
+    map_id: int,
+    cx: float,
+    cy: float,
+    end_id: int,
+    algorithm: Optional[str] = None,
+    simplify_px: Optional[float] = None,
+    floor: Optional[int] = None,
+) -> RouteResponse:
+    """
+    Tìm đường từ vị trí tự do (cx, cy) trên tầng `floor` (None: tầng có node/cạnh gần
+    nhất) tới end_id. Vị trí được chiếu lên đoạn cạnh gần nhất của tầng; điểm chiếu là
+    một node ảo chia cạnh (u, v) theo tỉ lệ chiều dài polyline, và tìm kiếm bắt đầu từ
+    cả u lẫn v với chi phí ban đầu tương ứng, nên không phải chép hay sửa đồ thị; đích
+    ở tầng khác thì đi qua overlay tầng từ cả u lẫn v. Nếu điểm chiếu trùng node thật
+    (hoặc engine networkx) thì xuất phát từ node thật gần nhất như trước.
+    """
+    algorithm = algorithm or ROUTING_ALGORITHM
+    snap = get_snap_index(session, map_id)
+    if floor is None:
+        floor = snap.nearest_floor(cx, cy)
+        if floor is None:
+            raise HTTPException(status_code=400, detail="Map chưa có node.")
+    node_hit = snap.nearest_node(cx, cy, floor)
+    if node_hit is None:
+        raise HTTPException(status_code=400, detail=f"Tầng {floor} chưa có node.")
+    g = get_csr(session, map_id)
+    edge_hit = snap.nearest_edge(cx, cy, floor)
+    if (
+        ROUTING_ENGINE == "networkx"
+        or edge_hit is None
+        or node_hit[1] <= edge_hit[2] + SNAP_NODE_TOL
+    ):
+        return compute_route(
+            session, map_id, g.node_ids[node_hit[0]], end_id, algorithm, simplify_px
+        )
+
+    slot, q, _d = edge_hit
+    u, v = snap.slot_u[slot], snap.slot_v[slot]
+    poly = orient_polyline_to_uv(g.edge_polyline(slot), g.node_pos(u), g.node_pos(v))
+    k, q, along, _d = project_point_to_polyline(poly, q)
+    total = polyline_length(poly)
+    if along <= SNAP_NODE_TOL or total - along <= SNAP_NODE_TOL:
+        nearest = u if along <= total - along else v
+        return compute_route(session, map_id, g.node_ids[nearest], end_id, algorithm, simplify_px)
+
+    t = g.index.get(end_id)
+    if t is None:
+        raise HTTPException(
+            status_code=400,
+            detail="start_id hoặc end_id không thuộc map hoặc không tồn tại.",
+        )
+    w = snap.slot_w[slot]
+    seeds = [(u, w * along / total), (v, w * (total - along) / total)]
+    # đoạn từ điểm chiếu tới node xuất phát thật (u hoặc v) trên cạnh đã chia
+    heads = {u: [q] + poly[k::-1], v: [q] + poly[k + 1 :]}
+
+    overlay = get_floor_overlay(session, map_id)
+    if overlay.connectors and overlay.node_floor.get(end_id, floor) != floor:
+        return _route_floors_from_seeds(
+            session, map_id, end_id, overlay, seeds, heads, g, _simplify_tol(simplify_px)
+        )
+
+    h = None
+    if algorithm in ("astar", "alt", "ch"):
+        # CH không nhận nhiều điểm xuất phát -> A*
+        h = g.euclid_heuristic(t)
+        if algorithm == "alt" and h is not None:
+            h = get_alt(session, map_id).heuristic(t, h)
+        else:
+            algorithm = "astar"
+    if h is None:
+        algorithm = "dijkstra"
+    res = g.search_seeded(seeds, t, h)
+    if res is None:
+        raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+    path_idx, arcs, settled = res
+    oriented_polys = [heads[path_idx[0]]] + _csr_polys(g, path_idx, [g.arc_edge[a] for a in arcs])
+    return _finish_route(
+        session, map_id, None, end_id, [g.node_ids[i] for i in path_idx],
+        oriented_polys, algorithm, settled, _simplify_tol(simplify_px),
     )
-    merged = [[float(x), float(y)] for (x, y) in merged]
 
-    merged = dedupe_polyline([(x, y) for x, y in merged], tol=1.0)
-    merged = [[float(x), float(y)] for (x, y) in merged]
 
-    total_len = polyline_length([(x, y) for x, y in merged])
+def _simplify_tol(simplify_px: Optional[float]) -> float:
+    return ROUTE_SIMPLIFY_PX if simplify_px is None else float(simplify_px)
+
+
+def _merge_route_polys(
+    oriented_polys: List[List[Tuple[float, float]]], simplify: float = 0.0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Polyline các cạnh -> (mảng (N, 2) đã ghép (tolerance 1.5 px), bỏ điểm trùng (1 px)
+    và rút gọn Douglas-Peucker nếu simplify > 0; quãng đường thật tới từng đỉnh).
+    Rút gọn chạy trước khi sinh hướng dẫn nên at_index trỏ vào polyline đã rút gọn,
+    còn độ dài/khoảng cách vẫn đo trên đường chưa rút gọn.
+    """
+    merged = merge_polys_xy(oriented_polys, tol=1.5)
+    merged = merged[dedupe_mask(merged, tol=1.0)]
+    cum = cumulative_distance(merged)
+    if simplify > 0.0 and len(merged) > 2:
+        keep = simplify_mask(merged, simplify)
+        merged, cum = merged[keep], cum[keep]
+    return merged, cum
+
+
+CONNECTOR_NAMES = {"stairs": "cầu thang", "elevator": "thang máy"}
+
+
+def _route_floors(
+    session: Session, map_id: int, start_id: int, end_id: int, overlay, simplify: float = 0.0
+) -> RouteResponse:
+    """
+    Tuyến qua nhiều tầng (services/floors.py): mỗi chặng trong một tầng đi qua cùng
+    pipeline polyline + hướng dẫn như tuyến một tầng, giữa các chặng chèn hướng dẫn
+    đi cầu thang/thang máy; `legs` cho biết đoạn polyline nào thuộc tầng nào.
+    """
+    res = overlay.route(session, start_id, end_id)
+    if res is None:
+        raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+    floor_legs, _cost, settled = res
+    return _floor_legs_response(session, map_id, start_id, end_id, floor_legs, settled, simplify)
+
+
+def _route_floors_from_seeds(
+    session: Session,
+    map_id: int,
+    end_id: int,
+    overlay,
+    seeds: List[Tuple[int, float]],
+    heads: Dict[int, List[Tuple[float, float]]],
+    g,
+    simplify: float = 0.0,
+) -> RouteResponse:
+    """
+    Tuyến nhiều tầng từ node ảo trên cạnh (route_from_point): overlay tìm từ từng đầu
+    cạnh (chỉ số CSR, chi phí tới đó), chọn tổng nhỏ nhất và nối đoạn head vào chặng đầu.
+    """
+    best = None
+    settled = 0
+    for i, cost0 in seeds:
+        res = overlay.route(session, g.node_ids[i], end_id)
+        if res is None:
+            continue
+        floor_legs, cost, n = res
+        settled += n
+        if best is None or cost0 + cost < best[0]:
+            best = (cost0 + cost, i, floor_legs)
+    if best is None:
+        raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+    _cost, i, floor_legs = best
+    first = floor_legs[0]
+    floor_legs[0] = first._replace(polys=[heads[i]] + first.polys)
+    return _floor_legs_response(session, map_id, None, end_id, floor_legs, settled, simplify)
+
+
+def _floor_legs_response(
+    session: Session,
+    map_id: int,
+    start_id: Optional[int],
+    end_id: int,
+    floor_legs: List[FloorLeg],
+    settled: int,
+    simplify: float = 0.0,
+) -> RouteResponse:
+    polyline: List[List[float]] = []
+    instructions: List[Instruction] = []
+    path_nodes: List[int] = []
+    legs: List[RouteLeg] = []
+    total_len = 0.0
+    last = len(floor_legs) - 1
+    for k, leg in enumerate(floor_legs):
+        path_nodes += leg.node_ids
+        merged, cum = _merge_route_polys(leg.polys, simplify)
+        if len(merged):
+            offset = len(polyline)
+            leg_instr = build_instructions(
+                session,
+                map_id,
+                merged,
+                start_id=start_id if k == 0 else None,
+                end_id=leg.node_ids[-1] if k == last else None,
+                cum=cum,
+                floor=leg.floor,
+            )
+            for ins in leg_instr:
+                if (ins.kind == "start" and k > 0) or (ins.kind == "arrive" and k < last):
+                    continue
+                ins.at_index += offset
+                instructions.append(ins)
+            legs.append(
+                RouteLeg(floor=leg.floor, start_index=offset, end_index=offset + len(merged) - 1)
+            )
+            polyline += merged.tolist()
+            total_len += float(cum[-1])
+        elif k == 0:
+            start_text = "Bắt đầu"
+            if start_id is not None:
+                start_text += f" tại {best_alias_for_node(session, map_id, start_id)}"
+            instructions.append(
+                Instruction(
+                    kind="start",
+                    text=start_text,
+                    at_index=0,
+                    distance_px=0.0,
+                )
+            )
+        elif k == last:
+            dest_name = best_alias_for_node(session, map_id, end_id)
+            instructions.append(
+                Instruction(
+                    kind="arrive",
+                    text=f"Đã đến {dest_name}",
+                    at_index=max(0, len(polyline) - 1),
+                    distance_px=0.0,
+                )
+            )
+
+        if leg.via is not None:
+            to_floor = floor_legs[k + 1].floor
+            prev = instructions[-1] if instructions else None
+            if prev is not None and prev.kind == leg.via.kind and not len(merged):
+                # đi tiếp cùng cầu thang/thang máy qua nhiều tầng -> gộp một hướng dẫn
+                from_floor = prev.from_floor
+                instructions.pop()
+            else:
+                from_floor = leg.floor
+            direction = "lên" if to_floor > from_floor else "xuống"
+            instructions.append(
+                ConnectorInstruction(
+                    kind=leg.via.kind,
+                    text=f"Đi {CONNECTOR_NAMES.get(leg.via.kind, leg.via.kind)} {direction} tầng {to_floor}",
+                    at_index=max(0, len(polyline) - 1),
+                    distance_px=0.0,
+                    from_floor=from_floor,
+                    to_floor=to_floor,
+                )
+            )
+
+    return RouteResponse(
+        path_node_ids=path_nodes,
+        polyline=polyline,
+        length_px=total_len,
+        instructions=instructions,
+        algorithm="hierarchical",
+        expanded_nodes=settled,
+        legs=legs,
+    )
+
+
+def _finish_route(
+    session: Session,
+    map_id: int,
+    start_id: Optional[int],
+    end_id: int,
+    path_nodes: List[int],
+    oriented_polys: List[List[Tuple[float, float]]],
+    algorithm: str,
+    expanded: Optional[int],
+    simplify: float = 0.0,
+) -> RouteResponse:
+    """Từ đường đi (node + polyline từng cạnh) -> polyline hợp nhất + hướng dẫn."""
+    merged, cum = _merge_route_polys(oriented_polys, simplify)
+
+    total_len = float(cum[-1]) if len(cum) else 0.0
+    # cạnh đi bộ không đổi tầng: cả tuyến nằm trên tầng của điểm đến
+    floor = get_floor_overlay(session, map_id).node_floor.get(end_id)
     directions = build_instructions(
-        session, map_id, merged, start_id=start_id, end_id=end_id
+        session, map_id, merged, start_id=start_id, end_id=end_id, cum=cum, floor=floor
     )
 
     return RouteResponse(
         path_node_ids=path_nodes,
-        polyline=merged,
+        polyline=merged.tolist(),
         length_px=total_len,
         instructions=directions,
+        algorithm=algorithm,
+        expanded_nodes=expanded,
     )
 
 
+# ------- Batch (một cây Dijkstra cho mỗi nguồn) -------
+
+MAX_BATCH_PAIRS = 10000
+
+PathTo = Callable[[int], Tuple[List[int], List[List[Tuple[float, float]]]]]
+
+
+def _tree_networkx(
+    session: Session, map_id: int, source_id: int, target_ids: List[int]
+) -> Tuple[PathTo, int]:
+    G, node_pos = get_graph(session, map_id)
+    if source_id not in G.nodes:
+        raise HTTPException(status_code=400, detail="start_id không thuộc map hoặc không tồn tại.")
+    _dist, paths = nx.single_source_dijkstra(G, source_id, weight="weight")
+
+    def path_to(target_id: int):
+        if target_id not in G.nodes:
+            raise HTTPException(status_code=400, detail="end_id không thuộc map hoặc không tồn tại.")
+        path_nodes = paths.get(target_id)
+        if path_nodes is None:
+            raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+        return path_nodes, _nx_polys(G, node_pos, path_nodes)
+
+    return path_to, len(paths)
+
+
+def _tree_csr(
+    session: Session, map_id: int, source_id: int, target_ids: List[int]
+) -> Tuple[PathTo, int]:
+    g = get_csr(session, map_id)
+    s = g.index.get(source_id)
+    if s is None:
+        raise HTTPException(status_code=400, detail="start_id không thuộc map hoặc không tồn tại.")
+    targets = {g.index[t] for t in target_ids if t in g.index}
+    dist, pred, settled = g.shortest_tree(s, targets)
+
+    def path_to(target_id: int):
+        t = g.index.get(target_id)
+        if t is None:
+            raise HTTPException(status_code=400, detail="end_id không thuộc map hoặc không tồn tại.")
+        res = g.path_in_tree(s, t, dist, pred)
+        if res is None:
+            raise HTTPException(status_code=404, detail="Không có đường đi giữa hai điểm.")
+        path_idx, arcs = res
+        slots = [g.arc_edge[a] for a in arcs]
+        return [g.node_ids[i] for i in path_idx], _csr_polys(g, path_idx, slots)
+
+    return path_to, settled
+
+
+def iter_batch_routes(
+    session: Session,
+    map_id: int,
+    pairs: List[Tuple[int, int]],
+    simplify_px: Optional[float] = None,
+) -> Iterator[BatchRouteItem]:
+    """
+    Tìm đường cho nhiều cặp (start, end) của cùng một map: gom theo start, mỗi start
+    chạy MỘT cây Dijkstra (dừng khi đã settle hết các đích của nó), rồi mỗi đích đi
+    qua cùng pipeline polyline + hướng dẫn như compute_route. Lỗi của từng cặp được
+    trả trong item (status_code/error) thay vì làm hỏng cả lô.
+    """
+    groups: Dict[int, List[int]] = {}
+    for i, (start_id, _end_id) in enumerate(pairs):
+        groups.setdefault(start_id, []).append(i)
+
+    simplify = _simplify_tol(simplify_px)
+    tree = _tree_networkx if ROUTING_ENGINE == "networkx" else _tree_csr
+    for start_id, idxs in groups.items():
+        try:
+            path_to, settled = tree(session, map_id, start_id, [pairs[i][1] for i in idxs])
+        except HTTPException as e:
+            for i in idxs:
+                yield BatchRouteItem(
+                    index=i, start_id=start_id, end_id=pairs[i][1],
+                    status_code=e.status_code, error=e.detail,
+                )
+            continue
+
+        for i in idxs:
+            end_id = pairs[i][1]
+            try:
+                path_nodes, oriented_polys = path_to(end_id)
+                route = _finish_route(
+                    session, map_id, start_id, end_id, path_nodes, oriented_polys,
+                    "dijkstra", settled, simplify,
+                )
+            except HTTPException as e:
+                yield BatchRouteItem(
+                    index=i, start_id=start_id, end_id=end_id,
+                    status_code=e.status_code, error=e.detail,
+                )
+                continue
+            yield BatchRouteItem(index=i, start_id=start_id, end_id=end_id, route=route)
+
+
 # ------- Endpoints -------
 
 
+def encode_route(resp: RouteResponse, precision: Optional[int] = None) -> RouteResponse:
+    """Bản sao của resp với polyline mã hoá (bản gốc có thể đang nằm trong route_cache)."""
+    precision = POLYLINE_PRECISION if precision is None else precision
+    return resp.model_copy(
+        update={"polyline": encode_polyline(resp.polyline, precision), "polyline_precision": precision}
+    )
+
+
 @router.post("/route", response_model=RouteResponse)
 def route_api(payload: RouteRequest, session: Session = Depends(get_session)):
-    m = session.get(Map, payload.map_id)
-    if not m:
+    resp = _route_request(payload, session)
+    if payload.format == "encoded":
+        return encode_route(resp, payload.precision)
+    return resp
+
+
+def _route_request(payload: RouteRequest, session: Session) -> RouteResponse:
+    if not map_exists(session, payload.map_id):
         raise HTTPException(status_code=404, detail="Map không tồn tại.")
 
     # Nếu đã có start/end id => đi thẳng
     if payload.start_id and payload.end_id:
-        return compute_route(session, payload.map_id, payload.start_id, payload.end_id)
+        return compute_route(
+            session, payload.map_id, payload.start_id, payload.end_id, payload.algorithm,
+            payload.simplify_px,
+        )
 
     # Nếu không có, cho phép q + (cx,cy)
     if not payload.q:
         raise HTTPException(status_code=400, detail="Thiếu q hoặc start_id/end_id.")
-    a_txt, b_txt = extract_a_b(payload.q)
-    if b_txt is None and a_txt is None:
-        raise HTTPException(
-            status_code=400, detail="Không trích xuất được điểm đầu/cuối từ câu hỏi."
-        )
+    has_a, a_id, b_id = resolve_query(session, payload.map_id, payload.q, payload.cx, payload.cy)
 
     # Tìm node bắt đầu
     start_id = payload.start_id
     end_id = payload.end_id
 
-    if start_id is None and a_txt:
-        start_id = find_best_alias_node(
-            session, payload.map_id, a_txt, payload.cx, payload.cy
-        )
-    if end_id is None and b_txt:
-        end_id = find_best_alias_node(
-            session, payload.map_id, b_txt, payload.cx, payload.cy
-        )
+    if start_id is None and has_a:
+        start_id = a_id
+    if end_id is None:
+        end_id = b_id
 
     # Nếu chỉ có 'đến B' => cần cx,cy để chọn điểm gần nhất làm 'điểm của tôi'
-    if start_id is None and a_txt is None:
+    if start_id is None and not has_a:
         if payload.cx is None or payload.cy is None:
             raise HTTPException(
                 status_code=400,
                 detail="Cần cx,cy (vị trí của bạn) khi chỉ cung cấp điểm đích.",
             )
-        # tạo node giả lập gần nhất (chọn node thật gần nhất làm start)
-        nodes = session.exec(select(Node).where(Node.map_id == payload.map_id)).all()
-        if not nodes:
-            raise HTTPException(status_code=400, detail="Map chưa có node.")
-        nodes.sort(key=lambda n: math.hypot(n.x - payload.cx, n.y - payload.cy))
-        start_id = nodes[0].id
+        if end_id is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Không tìm được node tương ứng với tên (có thể quá mơ hồ).",
+            )
+        # xuất phát từ điểm (cx,cy) chiếu lên hành lang gần nhất (node ảo trên cạnh)
+        return route_from_point(
+            session, payload.map_id, payload.cx, payload.cy, end_id, payload.algorithm,
+            payload.simplify_px, payload.floor,
+        )
 
     if start_id is None or end_id is None:
         raise HTTPException(
@@ -392,7 +1029,117 @@ def route_api(payload: RouteRequest, session: Session = Depends(get_session)):
             detail="Không tìm được node tương ứng với tên (có thể quá mơ hồ).",
         )
 
-    return compute_route(session, payload.map_id, start_id, end_id)
+    return compute_route(
+        session, payload.map_id, start_id, end_id, payload.algorithm, payload.simplify_px
+    )
+
+
+@router.post("/route/batch")
+def route_batch(payload: BatchRouteRequest, session: Session = Depends(get_session)):
+    """
+    Tìm đường hàng loạt trên một map. Kết quả stream dạng NDJSON: mỗi dòng là một
+    BatchRouteItem (route là RouteResponse như /route), theo thứ tự nhóm nguồn.
+    """
+    m = session.get(Map, payload.map_id)
+    if not m:
+        raise HTTPException(status_code=404, detail="Map không tồn tại.")
+
+    pairs: List[Tuple[int, int]] = [(p.start_id, p.end_id) for p in payload.pairs or []]
+    if payload.source_id is not None:
+        pairs += [(payload.source_id, t) for t in payload.target_ids or []]
+    if not pairs:
+        raise HTTPException(
+            status_code=400, detail="Thiếu pairs hoặc source_id/target_ids."
+        )
+    if len(pairs) > MAX_BATCH_PAIRS:
+        raise HTTPException(
+            status_code=400, detail=f"Tối đa {MAX_BATCH_PAIRS} cặp mỗi yêu cầu."
+        )
+
+    map_id = payload.map_id
+    simplify_px = payload.simplify_px
+
+    def stream():
+        # session riêng: stream chạy sau khi handler đã trả về
+        with Session(read_engine) as s:
+            for item in iter_batch_routes(s, map_id, pairs, simplify_px):
+                yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+MAX_MATRIX_CELLS = 250000
+
+
+@router.post("/route/matrix", response_model=MatrixResponse)
+def route_matrix(payload: MatrixRequest, session: Session = Depends(get_session)):
+    """Ma trận khoảng cách N x M; mỗi điểm phía ít hơn chạy một cây Dijkstra."""
+    t0 = time.perf_counter()
+    m = session.get(Map, payload.map_id)
+    if not m:
+        raise HTTPException(status_code=404, detail="Map không tồn tại.")
+    sources = resolve_node_set(session, payload.map_id, payload.source_ids, payload.source_q)
+    targets = resolve_node_set(session, payload.map_id, payload.target_ids, payload.target_q)
+    if not sources or not targets:
+        raise HTTPException(status_code=400, detail="Thiếu điểm nguồn hoặc điểm đích.")
+    if len(sources) * len(targets) > MAX_MATRIX_CELLS:
+        raise HTTPException(
+            status_code=400, detail=f"Ma trận quá lớn (tối đa {MAX_MATRIX_CELLS} ô)."
+        )
+
+    distances, settled = distance_matrix(session, payload.map_id, sources, targets)
+    return MatrixResponse(
+        source_ids=sources,
+        target_ids=targets,
+        distances=distances,
+        settled=settled,
+        elapsed_ms=(time.perf_counter() - t0) * 1000.0,
+    )
+
+
+@router.get("/route/nearest", response_model=NearestResponse)
+def route_nearest(
+    map_id: int = Query(...),
+    from_id: Optional[int] = Query(None, description="Node xuất phát"),
+    cx: Optional[float] = Query(None),
+    cy: Optional[float] = Query(None),
+    q: Optional[str] = Query(None, description="Tên loại điểm cần tìm, vd. 'nhà vệ sinh'"),
+    node_ids: Optional[List[int]] = Query(None, description="Hoặc danh sách node ứng viên"),
+    k: int = Query(1, ge=1, le=100),
+    session: Session = Depends(get_session),
+):
+    """k điểm ứng viên gần nhất theo đường đi (Dijkstra dừng khi đã gặp k ứng viên)."""
+    t0 = time.perf_counter()
+    m = session.get(Map, map_id)
+    if not m:
+        raise HTTPException(status_code=404, detail="Map không tồn tại.")
+    if from_id is None:
+        if cx is None or cy is None:
+            raise HTTPException(status_code=400, detail="Cần from_id hoặc cx,cy.")
+        from_id = nearest_node_id(session, map_id, cx, cy)
+
+    candidates = resolve_node_set(session, map_id, node_ids, q)
+    if not candidates:
+        raise HTTPException(status_code=404, detail="Không tìm được điểm ứng viên nào.")
+
+    res = one_to_many(session, map_id, from_id, candidates, limit=k)
+    if res is None:
+        raise HTTPException(
+            status_code=400, detail="from_id không thuộc map hoặc không tồn tại."
+        )
+    dists, settled = res
+    found = sorted(
+        ((d, nid) for nid, d in zip(candidates, dists) if d is not None),
+        key=lambda t: t[0],
+    )[:k]
+    return NearestResponse(
+        from_id=from_id,
+        node_ids=[nid for _d, nid in found],
+        distances=[d for d, _nid in found],
+        names=[best_alias_for_node(session, map_id, nid) for _d, nid in found],
+        settled=settled,
+        elapsed_ms=(time.perf_counter() - t0) * 1000.0,
+    )
 
 
 @router.get("/nl-route", response_model=RouteResponse)
@@ -401,7 +1148,15 @@ def nl_route(
     q: str = Query(..., description="Câu hỏi: 'từ A đến B'..."),
     cx: Optional[float] = Query(None),
     cy: Optional[float] = Query(None),
+    floor: Optional[int] = Query(None, description="Tầng của (cx, cy)"),
+    algorithm: Optional[Literal["dijkstra", "astar", "alt", "ch"]] = Query(None),
+    simplify_px: Optional[float] = Query(None, ge=0, description="Rút gọn polyline (px)"),
+    format: Literal["json", "encoded"] = Query("json", description="encoded = polyline mã hoá gọn"),
+    precision: Optional[int] = Query(None, ge=0, le=6),
     session: Session = Depends(get_session),
 ):
-    payload = RouteRequest(map_id=map_id, q=q, cx=cx, cy=cy)
+    payload = RouteRequest(
+        map_id=map_id, q=q, cx=cx, cy=cy, floor=floor, algorithm=algorithm, simplify_px=simplify_px,
+        format=format, precision=precision,
+    )
     return route_api(payload, session)
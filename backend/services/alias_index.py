@@ -0,0 +1,250 @@
+"""
+Chỉ mục tìm kiếm alias trong bộ nhớ, theo từng map (và toàn cục với map_id=None).
+
+Các cột được giữ thành list song song (alias_id, node_id, tên, norm_name, toạ độ
+node) để đưa thẳng `norm` vào rapidfuzz.process.extract mà không phải đọc DB hay
+chuẩn hoá lại tên ở mỗi lần gõ phím. Alias.norm_name đã được chuẩn hoá lúc tạo.
+
+Với chỉ mục lớn, một cận trên của fuzz.token_set_ratio cho MỌI alias được tính
+bằng numpy (inverted index token cho phần giao token, bitmask đếm ký tự cho phần
+còn lại - LCS không vượt quá số ký tự chung). RapidFuzz chỉ chấm nhóm có cận trên
+cao nhất, rồi chấm thêm mọi alias có cận trên >= điểm thứ `limit`: alias còn lại
+chắc chắn điểm thấp hơn, nên top-k trùng hệt quét toàn bộ (kể cả thứ tự khi hoà).
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from sqlmodel import Session, select
+
+from backend.models.entities import Alias, Node
+from backend.services.graph_cache import register_builder, get_cached
+from backend.services.graph_snapshot import GraphSnapshot, get_graph_snapshot
+
+
+# Dưới ngưỡng này quét toàn bộ luôn (đủ nhanh, khỏi dựng chỉ mục cận trên)
+PREFILTER_MIN_SIZE = 2000
+# Số ứng viên (cận trên cao nhất) chấm ở lượt đầu
+PREFILTER_CANDIDATES = 256
+# Cần chấm quá tỉ lệ này của chỉ mục thì quét toàn bộ luôn
+PREFILTER_MAX_FRACTION = 0.5
+# Số mức bitmask đếm ký tự (ký tự lặp nhiều hơn ở cả alias lẫn câu hỏi -> quét toàn bộ)
+BOUND_LEVELS = 8
+# Sai số dấu phẩy động khi so cận trên với điểm của RapidFuzz
+_EPS = 1e-6
+
+
+def token_key(s: str) -> Tuple[List[str], str]:
+    """Token không trùng của chuỗi (đã sắp) và chuỗi ghép lại - dạng token_set_ratio so."""
+    toks = sorted(set(s.split()))
+    return toks, " ".join(toks)
+
+
+class AliasIndex:
+    __slots__ = ("alias_ids", "node_ids", "names", "norm", "xs", "ys", "_bounds")
+
+    def __init__(self):
+        self.alias_ids: List[int] = []
+        self.node_ids: List[int] = []
+        self.names: List[str] = []
+        self.norm: List[str] = []
+        self.xs: List[float] = []
+        self.ys: List[float] = []
+        self._bounds: Optional[_BoundIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.alias_ids)
+
+    def search(self, norm_q: str, limit: int = 5) -> List[Tuple[int, float]]:
+        """Top `limit` theo fuzz.token_set_ratio: [(vị trí trong chỉ mục, score)]."""
+        if not norm_q or not self.norm:
+            return []
+        if len(self.norm) >= PREFILTER_MIN_SIZE:
+            res = self._search_prefiltered(norm_q, limit)
+            if res is not None:
+                return res
+        return self.search_exhaustive(norm_q, limit)
+
+    def search_exhaustive(self, norm_q: str, limit: int = 5) -> List[Tuple[int, float]]:
+        res = process.extract(norm_q, self.norm, scorer=fuzz.token_set_ratio, limit=limit)
+        return [(pos, float(score)) for _choice, score, pos in res]
+
+    def _search_prefiltered(self, norm_q: str, limit: int) -> Optional[List[Tuple[int, float]]]:
+        n = len(self.norm)
+        if limit >= n:
+            return None
+        if self._bounds is None:
+            self._bounds = _BoundIndex(self.norm)
+        b = self._bounds.bounds(norm_q)
+        if b is None:
+            return None
+        # est: điểm đúng nếu known, ngược lại cận dưới; ub: cận trên
+        ub, est, known = b
+
+        # lượt 1: chấm nhóm chưa biết điểm có cận trên cao nhất
+        todo = np.flatnonzero(~known)
+        k = min(max(PREFILTER_CANDIDATES, limit * 20), len(todo))
+        if k:
+            cand = todo[np.argpartition(-ub[todo], k - 1)[:k]] if k < len(todo) else todo
+            self._score(norm_q, cand, est, known)
+        tau = _kth_largest(est, limit)
+
+        # lượt 2: mọi alias chưa chấm có cận trên >= tau; còn lại điểm < tau chắc chắn
+        more = np.flatnonzero(~known & (ub >= tau - _EPS))
+        if len(more):
+            if len(more) > n * PREFILTER_MAX_FRACTION:
+                return None
+            self._score(norm_q, more, est, known)
+            tau = _kth_largest(est, limit)
+
+        # top-k: mọi alias trên tau, cộng các alias bằng tau có vị trí nhỏ nhất
+        above = np.flatnonzero(est > tau + _EPS)
+        tied = np.flatnonzero(np.abs(est - tau) <= _EPS)[: limit - len(above)]
+        return self._extract(norm_q, np.union1d(above, tied), limit)
+
+    def _score(self, norm_q: str, pos: np.ndarray, est: np.ndarray, known: np.ndarray):
+        choices = [self.norm[i] for i in pos]
+        est[pos] = process.cdist([norm_q], choices, scorer=fuzz.token_set_ratio, dtype=np.float64)[0]
+        known[pos] = True
+
+    def _extract(self, norm_q: str, pos: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+        # pos tăng dần -> hoà điểm thì vị trí nhỏ trước, như quét toàn bộ
+        res = process.extract(norm_q, [self.norm[i] for i in pos], scorer=fuzz.token_set_ratio, limit=limit)
+        return [(int(pos[i]), float(score)) for _choice, score, i in res]
+
+
+def _kth_largest(a: np.ndarray, k: int) -> float:
+    top = a.max()
+    if np.count_nonzero(a >= top - _EPS) >= k:  # hay gặp: nhiều alias cùng điểm cao nhất
+        return float(top)
+    pos = a[a > 0]
+    return float(np.partition(pos, len(pos) - k)[len(pos) - k]) if len(pos) >= k else 0.0
+
+
+class _BoundIndex:
+    """
+    Chặn điểm fuzz.token_set_ratio(q, alias) cho mọi alias. Với A, B là tập token
+    (ghép lại dài L1, L2), phần giao dài s > 0:
+      - A ⊆ B hoặc B ⊆ A: đúng 100;
+      - ngược lại điểm = max(2s / (s + min(L1, L2)), ratio(phần riêng A, phần riêng B)),
+        vế đầu tính đúng, vế sau <= 2 * (số ký tự chung của A, B) / (L1 + L2)
+        (LCS không vượt quá số ký tự chung). Vế sau không vượt vế đầu -> biết đúng điểm.
+
+    Số ký tự chung = tổng theo ký tự min(số lần trong A, số lần trong B), tính bằng
+    bitmask: levels[j - 1] có bit c khi ký tự (nhóm) c xuất hiện >= j lần, nên
+    min(a, q) = số mức j <= q mà alias có bit c. Ký tự dồn vào 64 nhóm theo mã; gộp
+    nhóm chỉ làm cận trên lỏng hơn (min(a1 + a2, q1 + q2) >= min(a1, q1) + min(a2, q2)).
+    """
+
+    __slots__ = ("postings", "lengths", "ntok", "levels", "deep")
+
+    def __init__(self, norm: List[str]):
+        lists: Dict[str, List[int]] = {}
+        joined = []
+        ntok = np.zeros(len(norm), dtype=np.int32)
+        for pos, s in enumerate(norm):
+            toks, j = token_key(s)
+            joined.append(j)
+            ntok[pos] = len(toks)
+            for t in toks:
+                lists.setdefault(t, []).append(pos)
+        self.postings = {t: np.asarray(p, dtype=np.int32) for t, p in lists.items()}
+        self.ntok = ntok
+        self.lengths = np.fromiter((len(j) for j in joined), dtype=np.intp, count=len(joined))
+
+        # counts[nhóm ký tự, alias] -> bitmask theo từng mức
+        n = len(joined)
+        codes = np.frombuffer("".join(joined).encode("utf-32-le"), dtype=np.uint32)
+        rows = np.repeat(np.arange(n, dtype=np.int64), self.lengths)
+        counts = np.bincount((codes % 64).astype(np.int64) * n + rows, minlength=64 * n).reshape(64, n)
+        top = int(counts.max()) if n else 0
+        bits = np.left_shift(np.uint64(1), np.arange(64, dtype=np.uint64))
+        self.levels = [
+            np.bitwise_or.reduce(np.where(counts >= j, bits[:, None], np.uint64(0)), axis=0)
+            for j in range(1, min(top, BOUND_LEVELS) + 1)
+        ]
+        self.deep = top > BOUND_LEVELS
+
+    def bounds(self, norm_q: str) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """(cận trên, cận dưới, mask đã biết đúng điểm = cận dưới) cho mọi alias; None: không chặn."""
+        n = len(self.lengths)
+        toks, jq = token_key(norm_q)
+        l1 = len(jq)
+        if not toks:
+            return np.zeros(n), np.zeros(n), np.ones(n, dtype=bool)
+        qcounts = Counter(ord(ch) % 64 for ch in jq)
+        if self.deep and max(qcounts.values()) > BOUND_LEVELS:
+            return None
+
+        sect = np.zeros(n, dtype=np.int32)
+        shared = np.zeros(n, dtype=np.int32)
+        for t in toks:
+            p = self.postings.get(t)
+            if p is not None:
+                sect[p] += len(t) + 1  # +1: khoảng trắng sau mỗi token chung
+                shared[p] += 1
+
+        common = np.zeros(n, dtype=np.uint16)
+        tmp = np.empty(n, dtype=np.uint64)
+        for j, level in enumerate(self.levels, start=1):
+            qmask = sum(1 << c for c, cnt in qcounts.items() if cnt >= j)
+            if not qmask:
+                break
+            np.bitwise_and(level, np.uint64(qmask), out=tmp)
+            common += np.bitwise_count(tmp)
+        # 200 / (L1 + L2) tra bảng theo L2 thay cho phép chia trên cả mảng
+        scale = 200.0 / (l1 + np.arange(int(self.lengths.max()) + 1))
+        ub = common * scale[self.lengths]
+
+        lo = np.zeros(n)
+        hit = np.flatnonzero(shared)
+        if len(hit):
+            s = sect[hit] - 1
+            lo[hit] = 200.0 * s / (s + np.minimum(self.lengths[hit], l1))
+            subset = (shared[hit] == len(toks)) | (shared[hit] == self.ntok[hit])
+            lo[hit[subset]] = 100.0
+            ub[hit[subset]] = 100.0
+        np.maximum(ub, lo, out=ub)
+        known = ub <= lo + _EPS
+        return ub, lo, known
+
+
+def build_alias_index(session: Session, map_id: Optional[int]) -> AliasIndex:
+    if map_id is not None:
+        return alias_index_from_snapshot(get_graph_snapshot(session, map_id))
+    stmt = (
+        select(Alias.id, Alias.node_id, Alias.name, Alias.norm_name, Node.x, Node.y)
+        .join(Node, Alias.node_id == Node.id)
+        .order_by(Alias.id)
+    )
+    idx = AliasIndex()
+    for aid, nid, name, norm, x, y in session.exec(stmt):
+        idx.alias_ids.append(aid)
+        idx.node_ids.append(nid)
+        idx.names.append(name)
+        idx.norm.append(norm)
+        idx.xs.append(x)
+        idx.ys.append(y)
+    return idx
+
+
+def alias_index_from_snapshot(snap: GraphSnapshot) -> AliasIndex:
+    g = snap.csr
+    idx = AliasIndex()
+    idx.alias_ids = list(snap.alias_ids)
+    idx.node_ids = list(snap.alias_node)
+    idx.names, idx.norm, _langs = snap.alias_strings()
+    pos = [g.index[nid] for nid in idx.node_ids]
+    idx.xs = [g.xs[i] for i in pos]
+    idx.ys = [g.ys[i] for i in pos]
+    return idx
+
+
+register_builder("aliases", build_alias_index)
+
+
+def get_alias_index(session: Session, map_id: Optional[int] = None) -> AliasIndex:
+    """Chỉ mục alias của map (hoặc của mọi map nếu map_id=None)."""
+    return get_cached(session, map_id, "aliases")
@@ -0,0 +1,144 @@
+"""
+ALT (A*, Landmarks, Triangle inequality) cho CSRGraph.
+
+Chọn K landmark mỗi map (ưu tiên các Node.is_landmark), lưu bảng khoảng cách
+landmark -> mọi node, rồi dùng bất đẳng thức tam giác làm cận dưới cho A*:
+    d(v, t) >= |d(L, t) - d(L, v)|
+Đồ thị định tuyến là vô hướng (xem services/csr.py) nên bảng "xuôi" và "ngược"
+trùng nhau; chỉ lưu một bảng cho mỗi landmark.
+
+Bảng được dựng lười qua cache đồ thị (mất hiệu lực khi map đổi version) và ghi ra
+ARTIFACT_DIR, gắn với chữ ký nội dung đồ thị, để worker khác/khởi động lại đọc
+lại được thay vì tính lại; bảng đọc qua mmap nên các worker dùng chung một bản.
+"""
+
+from array import array
+from typing import Callable, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from backend.core.config import ALT_LANDMARKS
+from backend.models.entities import Node
+from backend.services.artifacts import artifact_lock, artifact_path, map_arrays, write_arrays
+from backend.services.csr import CSRGraph, get_csr
+from backend.services.graph_cache import register_builder, get_cached
+
+MAGIC = b"WFALT2\0\0"
+
+INF = float("inf")
+
+
+class AltTables:
+    __slots__ = ("signature", "landmarks", "dist")
+
+    def __init__(self, signature: str, landmarks: List[int], dist: List[array]):
+        self.signature = signature
+        self.landmarks = landmarks  # chỉ số node (CSR) của các landmark
+        self.dist = dist  # dist[k][v] = d(landmarks[k], v)
+
+    def heuristic(
+        self, t: int, base: Optional[Callable[[int], float]] = None
+    ) -> Callable[[int], float]:
+        """
+        Cận dưới ALT tới t; nếu có `base` (vd. heuristic Euclid) thì lấy max của hai.
+        Max của các heuristic consistent vẫn consistent.
+        """
+        cols = [(tab[t], tab) for tab in self.dist if tab[t] != INF]
+
+        def h(v: int) -> float:
+            best = base(v) if base is not None else 0.0
+            for dt, tab in cols:
+                dv = tab[v]
+                x = dt - dv if dt > dv else dv - dt
+                if x > best:
+                    best = x
+            return best
+
+        return h
+
+
+def select_landmarks(
+    g: CSRGraph, candidates: List[int], k: int
+) -> Tuple[List[int], List[array]]:
+    """
+    Chọn k landmark theo kiểu "farthest": mỗi lần lấy node xa nhất (theo đồ thị)
+    so với tập đã chọn. Ưu tiên trong `candidates`; thiếu thì lấy từ toàn bộ node.
+    Trả (landmarks, bảng khoảng cách tương ứng) để khỏi chạy Dijkstra lại.
+    """
+    n = g.num_nodes
+    if n == 0 or k <= 0:
+        return [], []
+    pool = candidates or list(range(n))
+
+    # bắt đầu từ node xa nhất so với một node tùy ý của pool
+    seed = g.distances_from(pool[0])
+    first = max(pool, key=lambda v: seed[v] if seed[v] != INF else -1.0)
+
+    chosen: List[int] = []
+    tables: List[array] = []
+    mind = [INF] * n
+    nxt = first
+    while nxt is not None and len(chosen) < k:
+        chosen.append(nxt)
+        tab = g.distances_from(nxt)
+        tables.append(tab)
+        for v in range(n):
+            if tab[v] < mind[v]:
+                mind[v] = tab[v]
+
+        nxt = None
+        for group in (pool, range(n)):
+            best = 0.0
+            for v in group:
+                d = mind[v]
+                # node chưa tới được từ landmark nào (thành phần liên thông khác) được ưu tiên
+                score = 1e300 if d == INF else d
+                if score > best and v not in chosen:
+                    best = score
+                    nxt = v
+            if nxt is not None:
+                break
+    return chosen, tables
+
+
+def save_tables(path: str, t: AltTables) -> None:
+    write_arrays(path, MAGIC, t.signature, [array("q", t.landmarks)] + list(t.dist))
+
+
+def load_tables(path: str, signature: str) -> Optional[AltTables]:
+    arrays = map_arrays(path, MAGIC, signature)
+    if not arrays:
+        return None
+    return AltTables(signature, list(arrays[0]), arrays[1:])
+
+
+def build_alt_for_map(session: Session, map_id: int) -> AltTables:
+    g = get_csr(session, map_id)
+    sig = g.signature()
+    path = artifact_path(f"map_{map_id}.alt")
+    cached = load_tables(path, sig)
+    if cached is not None:
+        return cached
+
+    with artifact_lock(path):
+        cached = load_tables(path, sig)
+        if cached is not None:
+            return cached
+        lm_ids = session.exec(
+            select(Node.id).where(Node.map_id == map_id).where(Node.is_landmark == True)
+        ).all()
+        candidates = [g.index[i] for i in lm_ids if i in g.index]
+        landmarks, dist = select_landmarks(g, candidates, ALT_LANDMARKS)
+        tables = AltTables(sig, landmarks, dist)
+        try:
+            save_tables(path, tables)
+        except OSError:
+            return tables  # không ghi được thì vẫn dùng bảng trong bộ nhớ
+    return load_tables(path, sig) or tables
+
+
+register_builder("alt", build_alt_for_map)
+
+
+def get_alt(session: Session, map_id: int) -> AltTables:
+    return get_cached(session, map_id, "alt")
@@ -0,0 +1,155 @@
+"""
+Ghi/đọc dữ liệu dẫn xuất (bảng ALT, CH, ...) dạng nhị phân trong ARTIFACT_DIR.
+
+Một file gồm: magic (8 byte), chữ ký đồ thị (sha1 hex, 40 byte), số mảng, rồi từng
+mảng `array` (typecode 1 byte + số phần tử u64 + dữ liệu little-endian); header và
+dữ liệu mỗi mảng được đệm tới bội của 8 byte để map_arrays trả được view trực tiếp
+lên file (mmap) mà không chép.
+File được ghi ra file tạm rồi os.replace nên worker khác không bao giờ đọc phải
+file dở; worker đang map file cũ vẫn giữ inode cũ tới khi tự chuyển sang file mới.
+Chữ ký lệch (đồ thị đã đổi) thì coi như không có.
+"""
+
+from array import array
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Sequence
+import mmap
+import os
+import struct
+import sys
+
+from backend.core.config import ARTIFACT_DIR, ARTIFACT_MMAP
+
+try:
+    import fcntl
+except ImportError:  # Windows: không khoá file, các worker có thể cùng dựng một artifact
+    fcntl = None
+
+_HEADER = struct.Struct("<8s40sI")
+_ARRAY = struct.Struct("<cQ")
+_ALIGN = 8
+
+
+def _pad(n: int) -> int:
+    return -n % _ALIGN
+
+
+def _typecode(arr) -> str:
+    # array.array hoặc memoryview đã cast (view từ map_arrays)
+    return getattr(arr, "typecode", None) or arr.format
+
+
+def artifact_path(name: str) -> str:
+    return os.path.join(str(ARTIFACT_DIR), name)
+
+
+def dump_arrays(f: BinaryIO, magic: bytes, signature: str, arrays: Sequence) -> None:
+    f.write(_HEADER.pack(magic, signature.encode("ascii"), len(arrays)))
+    f.write(b"\0" * _pad(_HEADER.size))
+    for arr in arrays:
+        code = _typecode(arr)
+        f.write(_ARRAY.pack(code.encode("ascii"), len(arr)))
+        f.write(b"\0" * _pad(_ARRAY.size))
+        if sys.byteorder != "little":
+            arr = array(code, arr)
+            arr.byteswap()
+        data = arr.tobytes()
+        f.write(data)
+        f.write(b"\0" * _pad(len(data)))
+
+
+def load_arrays(f: BinaryIO, magic: bytes, signature: Optional[str]) -> Optional[List[array]]:
+    """Như read_arrays trên file object; signature=None thì không kiểm tra chữ ký."""
+    try:
+        m, sig, count = _HEADER.unpack(f.read(_HEADER.size))
+        if m != magic or (signature is not None and sig.decode("ascii") != signature):
+            return None
+        f.read(_pad(_HEADER.size))
+        out = []
+        for _ in range(count):
+            code, length = _ARRAY.unpack(f.read(_ARRAY.size))
+            f.read(_pad(_ARRAY.size))
+            arr = array(code.decode("ascii"))
+            nbytes = arr.itemsize * length
+            arr.frombytes(f.read(nbytes))
+            if len(arr) != length:
+                return None
+            f.read(_pad(nbytes))
+            if sys.byteorder != "little":
+                arr.byteswap()
+            out.append(arr)
+        return out
+    except (struct.error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def write_arrays(path: str, magic: bytes, signature: str, arrays: List[array]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        dump_arrays(f, magic, signature, arrays)
+    os.replace(tmp, path)
+
+
+def read_arrays(path: str, magic: bytes, signature: str) -> Optional[List[array]]:
+    try:
+        with open(path, "rb") as f:
+            return load_arrays(f, magic, signature)
+    except OSError:
+        return None
+
+
+def map_arrays(path: str, magic: bytes, signature: str) -> Optional[List]:
+    """
+    Như read_arrays nhưng không chép: mmap file chỉ-đọc và trả memoryview đã cast
+    theo typecode của từng mảng (đánh chỉ số, len, tobytes như array; np.frombuffer
+    dùng thẳng được). Mọi worker map cùng một file dùng chung trang vật lý trong
+    page cache. File chỉ được giải phóng khi không còn view nào tham chiếu.
+    Tắt (WAYFINDER_ARTIFACT_MMAP=0) hoặc máy big-endian thì quay về read_arrays.
+    """
+    if not ARTIFACT_MMAP or sys.byteorder != "little":
+        return read_arrays(path, magic, signature)
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # ValueError: file rỗng
+        return None
+    buf = memoryview(mm)
+    try:
+        m, sig, count = _HEADER.unpack_from(buf, 0)
+        if m != magic or sig.decode("ascii") != signature:
+            return None
+        pos = _HEADER.size + _pad(_HEADER.size)
+        out = []
+        for _ in range(count):
+            code, length = _ARRAY.unpack_from(buf, pos)
+            pos += _ARRAY.size + _pad(_ARRAY.size)
+            code = code.decode("ascii")
+            nbytes = array(code).itemsize * length
+            if pos + nbytes > len(buf):
+                return None
+            out.append(buf[pos : pos + nbytes].cast(code))
+            pos += nbytes + _pad(nbytes)
+        return out
+    except (struct.error, UnicodeDecodeError, ValueError, TypeError):
+        return None
+
+
+@contextmanager
+def artifact_lock(path: str) -> Iterator[None]:
+    """Khoá độc quyền giữa các tiến trình (file `<path>.lock`) quanh việc dựng + ghi artifact."""
+    if fcntl is None:
+        yield
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        f = open(f"{path}.lock", "ab")
+    except OSError:
+        yield
+        return
+    with f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,272 @@
+"""
+Contraction Hierarchies (CH) trên CSRGraph của một map.
+
+Tiền xử lý: lần lượt "co" từng node theo thứ tự ưu tiên (edge difference, số
+hàng xóm đã co, độ sâu), thêm shortcut u-x qua v khi không có đường chứng
+(witness) ngắn hơn. Truy vấn: Dijkstra hai chiều chỉ đi lên theo thứ hạng (rank).
+
+Mỗi cạnh của đồ thị "đi lên" nhớ hoặc slot cạnh gốc (Edge), hoặc node giữa của
+shortcut; nhờ vậy đường tìm được được bung lại thành dãy Edge gốc và phần ghép
+polyline (orient_polyline_to_uv / merge_polys_with_tol) không phải đổi gì.
+"""
+
+from array import array
+from heapq import heappush, heappop, heapify
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from backend.services.artifacts import artifact_lock, artifact_path, map_arrays, write_arrays
+from backend.services.csr import CSRGraph, get_csr
+from backend.services.graph_cache import register_builder, get_cached
+
+MAGIC = b"WFCH2\0\0\0"
+
+INF = float("inf")
+
+# Giới hạn tìm đường chứng khi co node (đánh đổi thời gian tiền xử lý / số shortcut)
+WITNESS_SETTLE_LIMIT = 60
+
+
+class CHGraph:
+    __slots__ = ("rank", "up_indptr", "up_indices", "up_weights", "up_via")
+
+    def __init__(self):
+        self.rank = array("q")
+        self.up_indptr = array("q", [0])
+        self.up_indices = array("q")
+        self.up_weights = array("d")
+        # >= 0: node giữa của shortcut; < 0: cạnh gốc có slot = -via - 1
+        self.up_via = array("q")
+
+    @property
+    def num_shortcuts(self) -> int:
+        return sum(1 for x in self.up_via if x >= 0)
+
+    def _up_edge(self, a: int, b: int) -> Tuple[float, int]:
+        """(weight, via) của cạnh a-b trong đồ thị đi lên (lấy từ đầu có rank thấp hơn)."""
+        if self.rank[a] > self.rank[b]:
+            a, b = b, a
+        best = (INF, 0)
+        for k in range(self.up_indptr[a], self.up_indptr[a + 1]):
+            if self.up_indices[k] == b and self.up_weights[k] < best[0]:
+                best = (self.up_weights[k], self.up_via[k])
+        return best
+
+    def _unpack(self, a: int, b: int, out_nodes: List[int], out_slots: List[int]) -> None:
+        # khử đệ quy bằng stack để shortcut lồng sâu không tràn stack Python
+        stack = [(a, b)]
+        while stack:
+            u, v = stack.pop()
+            _w, via = self._up_edge(u, v)
+            if via < 0:
+                out_slots.append(-via - 1)
+                out_nodes.append(v)
+            else:
+                stack.append((via, v))
+                stack.append((u, via))
+
+    def query(self, s: int, t: int) -> Optional[Tuple[List[int], List[int], int]]:
+        """
+        Dijkstra hai chiều trên đồ thị đi lên.
+        Trả (node trên đường, slot cạnh gốc, số node đã settle) hoặc None.
+        """
+        if s == t:
+            return [s], [], 1
+        indptr, indices, weights = self.up_indptr, self.up_indices, self.up_weights
+        dist = ({s: 0.0}, {t: 0.0})
+        pred: Tuple[Dict[int, int], Dict[int, int]] = ({}, {})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        settled = 0
+        mu = INF
+        meet = -1
+        side = 0
+        while heaps[0] or heaps[1]:
+            # xen kẽ 2 chiều; dừng chiều nào có đỉnh heap >= mu
+            if not heaps[side] or heaps[side][0][0] >= mu:
+                side ^= 1
+                if not heaps[side] or heaps[side][0][0] >= mu:
+                    break
+            d, u = heappop(heaps[side])
+            du = dist[side]
+            if d > du.get(u, INF):
+                side ^= 1
+                continue
+            settled += 1
+            other = dist[side ^ 1].get(u)
+            if other is not None and d + other < mu:
+                mu = d + other
+                meet = u
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                nd = d + weights[k]
+                if nd < du.get(v, INF):
+                    du[v] = nd
+                    pred[side][v] = u
+                    heappush(heaps[side], (nd, v))
+            side ^= 1
+
+        if meet < 0:
+            return None
+
+        # chuỗi node trên đồ thị CH: s ... meet ... t
+        up_path = [meet]
+        u = meet
+        while u != s:
+            u = pred[0][u]
+            up_path.append(u)
+        up_path.reverse()
+        u = meet
+        while u != t:
+            u = pred[1][u]
+            up_path.append(u)
+
+        nodes = [s]
+        slots: List[int] = []
+        for i in range(1, len(up_path)):
+            self._unpack(up_path[i - 1], up_path[i], nodes, slots)
+        return nodes, slots, settled
+
+
+def build_ch(g: CSRGraph) -> CHGraph:
+    n = g.num_nodes
+    # đồ thị còn lại (chưa co): adj[u][v] = (w, via)
+    adj: List[Dict[int, Tuple[float, int]]] = [dict() for _ in range(n)]
+    for u in range(n):
+        for a in range(g.indptr[u], g.indptr[u + 1]):
+            v = g.indices[a]
+            if v == u:
+                continue
+            w = g.weights[a]
+            cur = adj[u].get(v)
+            if cur is None or w < cur[0]:
+                adj[u][v] = (w, -g.arc_edge[a] - 1)
+
+    contracted = [False] * n
+    deleted_nb = [0] * n
+    level = [0] * n  # độ sâu trong hierarchy, giữ cây shortcut không quá cao
+    up: List[List[Tuple[int, float, int]]] = [[] for _ in range(n)]
+
+    def witness(src: int, skip: int, limit: float, targets: set) -> Dict[int, float]:
+        dist = {src: 0.0}
+        heap = [(0.0, src)]
+        settled = 0
+        found = 0
+        while heap and settled < WITNESS_SETTLE_LIMIT:
+            d, u = heappop(heap)
+            if d > limit:
+                break
+            if d > dist[u]:
+                continue
+            settled += 1
+            if u in targets:
+                found += 1
+                if found == len(targets):
+                    break
+            for v, (w, _via) in adj[u].items():
+                if v == skip:
+                    continue
+                nd = d + w
+                if nd < dist.get(v, INF):
+                    dist[v] = nd
+                    heappush(heap, (nd, v))
+        return dist
+
+    def shortcuts_for(v: int, apply: bool) -> int:
+        nbs = list(adj[v].items())
+        count = 0
+        for i, (u, (wu, _)) in enumerate(nbs):
+            targets = {x for x, _ in nbs[i + 1:]}
+            if not targets:
+                continue
+            limit = wu + max(adj[v][x][0] for x in targets)
+            wd = witness(u, v, limit, targets)
+            for x, (wx, _) in nbs[i + 1:]:
+                via_w = wu + wx
+                if wd.get(x, INF) <= via_w:
+                    continue
+                count += 1
+                if apply:
+                    cur = adj[u].get(x)
+                    if cur is None or via_w < cur[0]:
+                        adj[u][x] = (via_w, v)
+                        adj[x][u] = (via_w, v)
+        return count
+
+    def priority(v: int) -> int:
+        edge_diff = shortcuts_for(v, False) - len(adj[v])
+        return 2 * edge_diff + deleted_nb[v] + level[v]
+
+    heap = [(priority(v), v) for v in range(n)]
+    heapify(heap)
+    rank = [0] * n
+    order = 0
+    while heap:
+        _p, v = heappop(heap)
+        if contracted[v]:
+            continue
+        # lazy update: tính lại ưu tiên, nếu không còn nhỏ nhất thì đẩy lại
+        p = priority(v)
+        if heap and p > heap[0][0]:
+            heappush(heap, (p, v))
+            continue
+        shortcuts_for(v, True)
+        for u, (w, via) in adj[v].items():
+            up[v].append((u, w, via))
+            del adj[u][v]
+            deleted_nb[u] += 1
+            level[u] = max(level[u], level[v] + 1)
+        adj[v] = {}
+        contracted[v] = True
+        rank[v] = order
+        order += 1
+
+    ch = CHGraph()
+    ch.rank = array("q", rank)
+    for v in range(n):
+        for u, w, via in up[v]:
+            ch.up_indices.append(u)
+            ch.up_weights.append(w)
+            ch.up_via.append(via)
+        ch.up_indptr.append(len(ch.up_indices))
+    return ch
+
+
+def _load_ch(path: str, sig: str) -> Optional[CHGraph]:
+    # view mmap chỉ-đọc, dùng chung giữa các worker
+    arrays = map_arrays(path, MAGIC, sig)
+    if arrays is None or len(arrays) != 5:
+        return None
+    ch = CHGraph()
+    ch.rank, ch.up_indptr, ch.up_indices, ch.up_weights, ch.up_via = arrays
+    return ch
+
+
+def build_ch_for_map(session: Session, map_id: int) -> CHGraph:
+    g = get_csr(session, map_id)
+    sig = g.signature()
+    path = artifact_path(f"map_{map_id}.ch")
+    ch = _load_ch(path, sig)
+    if ch is not None:
+        return ch
+
+    with artifact_lock(path):
+        ch = _load_ch(path, sig)
+        if ch is not None:
+            return ch
+        ch = build_ch(g)
+        try:
+            write_arrays(
+                path, MAGIC, sig,
+                [ch.rank, ch.up_indptr, ch.up_indices, ch.up_weights, ch.up_via],
+            )
+        except OSError:
+            return ch
+    return _load_ch(path, sig) or ch
+
+
+register_builder("ch", build_ch_for_map)
+
+
+def get_ch(session: Session, map_id: int) -> CHGraph:
+    return get_cached(session, map_id, "ch")
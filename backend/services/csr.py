@@ -0,0 +1,430 @@
+"""
+Engine tìm đường dạng mảng (CSR - compressed sparse row).
+
+Node được đánh chỉ số nguyên 0..n-1; kề của node i là các cung
+indices[indptr[i]:indptr[i+1]] với trọng số weights[...] và cạnh gốc arc_edge[...].
+Giống networkx.Graph đang dùng trước đây, đồ thị được xem là VÔ HƯỚNG: mỗi Edge
+sinh 2 cung (u->v, v->u).
+"""
+
+from array import array
+from bisect import bisect_left
+from heapq import heappush, heappop
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import hashlib
+import math
+
+from sqlmodel import Session, select
+
+from backend.models.entities import Node, Edge
+from backend.services.graph import edge_heuristic_ratio
+from backend.services.graph_cache import register_builder, get_cached
+from backend.utils.polyline import polyline_xy
+
+Point = Tuple[float, float]
+
+
+class SortedIdIndex:
+    """
+    Node.id -> chỉ số bằng tìm nhị phân trên node_ids đã sắp tăng dần (vd. view mmap
+    của snapshot): cùng giao diện đọc với dict nhưng không tốn bộ nhớ riêng mỗi worker.
+    """
+
+    __slots__ = ("ids",)
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def get(self, node_id: int, default: Optional[int] = None) -> Optional[int]:
+        ids = self.ids
+        i = bisect_left(ids, node_id)
+        return i if i < len(ids) and ids[i] == node_id else default
+
+    def __getitem__(self, node_id: int) -> int:
+        i = self.get(node_id)
+        if i is None:
+            raise KeyError(node_id)
+        return i
+
+    def __contains__(self, node_id) -> bool:
+        return self.get(node_id) is not None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+
+class CSRGraph:
+    __slots__ = (
+        "node_ids",
+        "index",
+        "xs",
+        "ys",
+        "floors",
+        "indptr",
+        "indices",
+        "weights",
+        "arc_edge",
+        "edge_ids",
+        "poly_ptr",
+        "poly_xy",
+        "h_scale",
+    )
+
+    def __init__(self):
+        self.node_ids = array("q")  # chỉ số -> Node.id
+        self.index: Dict[int, int] = {}  # Node.id -> chỉ số (hoặc SortedIdIndex)
+        self.xs = array("d")
+        self.ys = array("d")
+        self.floors = array("l")
+        self.indptr = array("q", [0])
+        self.indices = array("q")  # cung -> chỉ số node đích
+        self.weights = array("d")  # cung -> trọng số
+        self.arc_edge = array("q")  # cung -> slot cạnh (0..m-1)
+        self.edge_ids = array("q")  # slot -> Edge.id
+        self.poly_ptr = array("q", [0])  # slot -> offset (theo điểm) trong poly_xy
+        self.poly_xy = array("d")  # polyline phẳng: x0, y0, x1, y1, ...
+        # hệ số cho heuristic Euclid (xem heuristic_scale trong services/graph.py)
+        self.h_scale = 1.0
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_ids)
+
+    def has_node(self, node_id: int) -> bool:
+        return node_id in self.index
+
+    def node_pos(self, i: int) -> Point:
+        return (self.xs[i], self.ys[i])
+
+    def edge_polyline(self, slot: int) -> List[Point]:
+        a, b = self.poly_ptr[slot], self.poly_ptr[slot + 1]
+        xy = self.poly_xy
+        return [(xy[2 * k], xy[2 * k + 1]) for k in range(a, b)]
+
+    def nbytes(self) -> int:
+        arrays = (
+            self.node_ids, self.xs, self.ys, self.floors, self.indptr, self.indices,
+            self.weights, self.arc_edge, self.edge_ids, self.poly_ptr, self.poly_xy,
+        )
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    # ------- Search -------
+
+    def dijkstra(self, s: int, t: int) -> Optional[Tuple[List[int], List[int], int]]:
+        """
+        Dijkstra heap từ s tới t (theo chỉ số).
+        Trả (các node trên đường, các cung đã đi, số node đã settle) hoặc None nếu không tới được.
+        """
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        inf = float("inf")
+        dist = [inf] * len(self.node_ids)
+        pred = [-1] * len(self.node_ids)  # node -> cung đi vào
+        dist[s] = 0.0
+        settled = 0
+        heap = [(0.0, s)]
+        while heap:
+            d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            settled += 1
+            if u == t:
+                return self._unwind(s, t, pred) + (settled,)
+            for a in range(indptr[u], indptr[u + 1]):
+                v = indices[a]
+                nd = d + weights[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = a
+                    heappush(heap, (nd, v))
+        return None
+
+    def astar(
+        self, s: int, t: int, h: Callable[[int], float]
+    ) -> Optional[Tuple[List[int], List[int], int]]:
+        """A* với heuristic h(i) (phải admissible + consistent). Kết quả như dijkstra()."""
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        inf = float("inf")
+        dist = [inf] * len(self.node_ids)
+        pred = [-1] * len(self.node_ids)
+        dist[s] = 0.0
+        settled = 0
+        heap = [(h(s), 0.0, s)]
+        while heap:
+            _f, d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            settled += 1
+            if u == t:
+                return self._unwind(s, t, pred) + (settled,)
+            for a in range(indptr[u], indptr[u + 1]):
+                v = indices[a]
+                nd = d + weights[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = a
+                    heappush(heap, (nd + h(v), nd, v))
+        return None
+
+    def search_seeded(
+        self,
+        seeds: List[Tuple[int, float]],
+        t: int,
+        h: Optional[Callable[[int], float]] = None,
+    ) -> Optional[Tuple[List[int], List[int], int]]:
+        """
+        Dijkstra/A* tới t từ nhiều node khởi đầu với chi phí ban đầu [(node, cost)],
+        vd. hai đầu của cạnh chứa một điểm ảo (không phải chép/sửa đồ thị).
+        Kết quả như dijkstra(); node đầu của đường là seed đã dùng.
+        """
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        inf = float("inf")
+        dist = [inf] * len(self.node_ids)
+        pred = [-1] * len(self.node_ids)
+        heap = []
+        for s, c in seeds:
+            if c < dist[s]:
+                dist[s] = c
+                heappush(heap, ((c + h(s)) if h else c, c, s))
+        settled = 0
+        while heap:
+            _f, d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            settled += 1
+            if u == t:
+                nodes = [t]
+                arcs: List[int] = []
+                while pred[u] != -1:
+                    a = pred[u]
+                    arcs.append(a)
+                    u = self._arc_tail(a)
+                    nodes.append(u)
+                nodes.reverse()
+                arcs.reverse()
+                return nodes, arcs, settled
+            for a in range(indptr[u], indptr[u + 1]):
+                v = indices[a]
+                nd = d + weights[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = a
+                    heappush(heap, ((nd + h(v)) if h else nd, nd, v))
+        return None
+
+    def shortest_tree(
+        self, s: int, targets: Optional[Set[int]] = None, limit: Optional[int] = None
+    ) -> Tuple[List[float], List[int], int]:
+        """
+        Cây đường đi ngắn nhất một-nguồn-nhiều-đích: Dijkstra từ s, dừng sớm khi mọi
+        node trong `targets` đã settle (None = duyệt hết), hoặc khi đã settle `limit`
+        đích (k đích gần nhất).
+        Trả (dist, pred, số node đã settle); đường tới t lấy bằng path_in_tree().
+        Đích chưa settle lúc dừng có dist = inf.
+        """
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        inf = float("inf")
+        dist = [inf] * len(self.node_ids)
+        pred = [-1] * len(self.node_ids)
+        dist[s] = 0.0
+        remaining = set(targets) if targets is not None else None
+        found = 0
+        settled = 0
+        heap = [(0.0, s)]
+        while heap:
+            d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            settled += 1
+            if remaining is not None and u in remaining:
+                remaining.discard(u)
+                found += 1
+                if not remaining or found == limit:
+                    # đích chưa settle giữ inf (dist tạm của chúng chưa chắc tối ưu)
+                    for v in remaining:
+                        dist[v] = inf
+                    break
+            elif remaining is not None and not remaining:
+                break
+            for a in range(indptr[u], indptr[u + 1]):
+                v = indices[a]
+                nd = d + weights[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = a
+                    heappush(heap, (nd, v))
+        return dist, pred, settled
+
+    def path_in_tree(
+        self, s: int, t: int, dist: List[float], pred: List[int]
+    ) -> Optional[Tuple[List[int], List[int]]]:
+        """(các node, các cung) từ s tới t trong cây của shortest_tree(s), hoặc None."""
+        if dist[t] == float("inf"):
+            return None
+        return self._unwind(s, t, pred)
+
+    def distances_from(self, s: int) -> array:
+        """Dijkstra đầy đủ từ s: mảng khoảng cách tới mọi node (inf nếu không tới được)."""
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        dist = [float("inf")] * len(self.node_ids)
+        dist[s] = 0.0
+        heap = [(0.0, s)]
+        while heap:
+            d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            for a in range(indptr[u], indptr[u + 1]):
+                v = indices[a]
+                nd = d + weights[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heappush(heap, (nd, v))
+        return array("d", dist)
+
+    def signature(self) -> str:
+        """Dấu vân tay nội dung đồ thị (node, kề, trọng số) để gắn cho dữ liệu dẫn xuất."""
+        h = hashlib.sha1()
+        for a in (self.node_ids, self.indptr, self.indices, self.weights):
+            h.update(a.tobytes())
+        return h.hexdigest()
+
+    def euclid_heuristic(self, t: int) -> Optional[Callable[[int], float]]:
+        """h(i) = h_scale * |pos(i) - pos(t)|; None nếu không dùng được (h_scale = 0)."""
+        k = self.h_scale
+        if k <= 0.0:
+            return None
+        xs, ys = self.xs, self.ys
+        tx, ty = xs[t], ys[t]
+        hypot = math.hypot
+        return lambda i: k * hypot(xs[i] - tx, ys[i] - ty)
+
+    def _unwind(self, s: int, t: int, pred: List[int]) -> Tuple[List[int], List[int]]:
+        arcs: List[int] = []
+        nodes = [t]
+        u = t
+        while u != s:
+            a = pred[u]
+            arcs.append(a)
+            u = self._arc_tail(a)
+            nodes.append(u)
+        nodes.reverse()
+        arcs.reverse()
+        return nodes, arcs
+
+    def _arc_tail(self, a: int) -> int:
+        # indptr tăng dần -> tìm nhị phân node sở hữu cung a
+        lo, hi = 0, len(self.indptr) - 2
+        indptr = self.indptr
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if indptr[mid] <= a:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+
+def build_csr(node_rows, edge_rows) -> CSRGraph:
+    """
+    node_rows: iterable (id, x, y, floor)
+    edge_rows: iterable (id, start_node_id, end_node_id, weight, polyline), polyline là
+    [[x,y],...] hoặc blob Edge.polyline_xy - bytes, bytearray hoặc memoryview (psycopg2
+    trả bytea dạng memoryview) - nối thẳng vào poly_xy bằng frombytes
+    """
+    g = CSRGraph()
+    for nid, x, y, floor in node_rows:
+        g.index[nid] = len(g.node_ids)
+        g.node_ids.append(nid)
+        g.xs.append(float(x))
+        g.ys.append(float(y))
+        g.floors.append(int(floor))
+
+    n = len(g.node_ids)
+    tails: List[int] = []
+    heads: List[int] = []
+    ws: List[float] = []
+    slots: List[int] = []
+    for eid, u_id, v_id, w, poly in edge_rows:
+        u = g.index.get(u_id)
+        v = g.index.get(v_id)
+        if u is None or v is None:
+            continue
+        slot = len(g.edge_ids)
+        g.edge_ids.append(eid)
+        if isinstance(poly, (bytes, bytearray, memoryview)):
+            # blob Edge.polyline_xy: chép thẳng vào poly_xy, không tạo float Python nào
+            g.poly_xy.extend(polyline_xy(poly))
+        else:
+            for x, y in poly:
+                g.poly_xy.append(float(x))
+                g.poly_xy.append(float(y))
+        g.poly_ptr.append(len(g.poly_xy) // 2)
+        g.h_scale = min(
+            g.h_scale, edge_heuristic_ratio(w, g.xs[u], g.ys[u], g.xs[v], g.ys[v])
+        )
+        # vô hướng như nx.Graph: luôn thêm cả 2 chiều
+        tails += (u, v)
+        heads += (v, u)
+        ws += (float(w), float(w))
+        slots += (slot, slot)
+
+    # counting sort theo node nguồn
+    counts = [0] * (n + 1)
+    for u in tails:
+        counts[u + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    g.indptr = array("q", counts)
+    m2 = len(tails)
+    indices = [0] * m2
+    weights = [0.0] * m2
+    arc_edge = [0] * m2
+    fill = counts[:-1]
+    for k in range(m2):
+        u = tails[k]
+        p = fill[u]
+        fill[u] = p + 1
+        indices[p] = heads[k]
+        weights[p] = ws[k]
+        arc_edge[p] = slots[k]
+    g.indices = array("q", indices)
+    g.weights = array("d", weights)
+    g.arc_edge = array("q", arc_edge)
+    return g
+
+
+def build_csr_for_map(session: Session, map_id: int) -> CSRGraph:
+    """Dựng CSRGraph trực tiếp từ các hàng Node/Edge của map (không qua networkx)."""
+    nodes = session.exec(
+        select(Node.id, Node.x, Node.y, Node.floor).where(Node.map_id == map_id)
+    ).all()
+    edges = session.exec(
+        select(
+            Edge.id, Edge.start_node_id, Edge.end_node_id, Edge.weight, Edge.polyline_xy
+        )
+        .where(Edge.map_id == map_id)
+        .where(Edge.kind == "walk")  # cạnh nối tầng: xem services/floors.py
+    ).all()
+    return build_csr(nodes, edges)
+
+
+def _csr_from_snapshot(session: Session, map_id: int) -> CSRGraph:
+    # CSR nằm sẵn trong snapshot nhị phân của map (không json.loads polyline);
+    # import trong hàm vì graph_snapshot import module này
+    from backend.services.graph_snapshot import get_graph_snapshot
+
+    return get_graph_snapshot(session, map_id).csr
+
+
+register_builder("csr", _csr_from_snapshot)
+
+
+def get_csr(session: Session, map_id: int) -> CSRGraph:
+    """CSRGraph của map từ cache đồ thị (dựng lại khi map đổi version)."""
+    return get_cached(session, map_id, "csr")
@@ -0,0 +1,75 @@
+"""
+Khoảng cách di chuyển một-nguồn-nhiều-đích trên đồ thị của map (theo engine cấu
+hình), dùng cho ma trận khoảng cách và "điểm gần nhất".
+
+Đồ thị vô hướng nên d(a, b) = d(b, a): ma trận N x M có thể chạy từ phía ít điểm
+hơn rồi chuyển vị.
+"""
+
+from typing import List, Optional, Tuple
+
+import networkx as nx
+from sqlmodel import Session
+
+from backend.core.config import ROUTING_ENGINE
+from backend.services.csr import get_csr
+from backend.services.graph_cache import get_graph
+
+
+def one_to_many(
+    session: Session,
+    map_id: int,
+    source_id: int,
+    target_ids: List[int],
+    limit: Optional[int] = None,
+) -> Optional[Tuple[List[Optional[float]], int]]:
+    """
+    Khoảng cách từ source_id tới từng target_ids (None nếu không tới được, hoặc nằm
+    ngoài `limit` đích gần nhất) và số node đã settle.
+    Trả None nếu source_id không thuộc map.
+    """
+    if ROUTING_ENGINE == "networkx":
+        G, _node_pos = get_graph(session, map_id)
+        if source_id not in G.nodes:
+            return None
+        lengths = nx.single_source_dijkstra_path_length(G, source_id, weight="weight")
+        out = [lengths.get(t) for t in target_ids]
+        if limit is not None:
+            keep = sorted(d for d in out if d is not None)[:limit]
+            cut = keep[-1] if keep else None
+            out = [d if d is not None and cut is not None and d <= cut else None for d in out]
+        return out, len(lengths)
+
+    g = get_csr(session, map_id)
+    s = g.index.get(source_id)
+    if s is None:
+        return None
+    idx = [g.index.get(t) for t in target_ids]
+    dist, _pred, settled = g.shortest_tree(s, {i for i in idx if i is not None}, limit)
+    inf = float("inf")
+    return [None if i is None or dist[i] == inf else dist[i] for i in idx], settled
+
+
+def distance_matrix(
+    session: Session, map_id: int, source_ids: List[int], target_ids: List[int]
+) -> Tuple[List[List[Optional[float]]], int]:
+    """
+    Ma trận khoảng cách len(source_ids) x len(target_ids) (None = không tới được,
+    hàng toàn None nếu nguồn không thuộc map) và tổng số node đã settle.
+    """
+    transpose = len(source_ids) > len(target_ids)
+    rows_from, cols_to = (target_ids, source_ids) if transpose else (source_ids, target_ids)
+
+    rows: List[List[Optional[float]]] = []
+    settled = 0
+    for src in rows_from:
+        res = one_to_many(session, map_id, src, cols_to)
+        if res is None:
+            rows.append([None] * len(cols_to))
+            continue
+        rows.append(res[0])
+        settled += res[1]
+
+    if transpose:
+        rows = [list(col) for col in zip(*rows)] if rows else [[] for _ in source_ids]
+    return rows, settled
@@ -0,0 +1,85 @@
+"""
+Quy tắc tạo cạnh dùng chung cho POST /edges và nhập hàng loạt (services/importer.py):
+kiểm tra loại cạnh và tầng, polyline mặc định (rút gọn Douglas-Peucker nếu bật
+WAYFINDER_EDGE_SIMPLIFY_PX), trọng số.
+"""
+
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+
+from backend.core.config import EDGE_SIMPLIFY_PX
+from backend.utils.geo import polyline_length, simplify_polyline
+
+# Loại cạnh: "walk" đi trong một tầng; còn lại là cạnh nối tầng
+EDGE_KINDS = ("walk", "stairs", "elevator")
+# Chi phí mặc định (đơn vị như weight, px) cho mỗi tầng chênh lệch khi không truyền cost
+CONNECTOR_COST_PER_FLOOR = {"stairs": 150.0, "elevator": 250.0}
+
+
+def stored_polyline(poly: List[List[float]]) -> List[List[float]]:
+    """Polyline sẽ ghi vào Edge.polyline_xy: bỏ đỉnh thừa (nét vẽ rung tay) nếu bật rút gọn."""
+    if EDGE_SIMPLIFY_PX > 0 and len(poly) > 2:
+        return simplify_polyline(poly, EDGE_SIMPLIFY_PX)
+    return poly
+
+
+def edge_geometry(
+    kind: str,
+    s,
+    e,
+    floor: Optional[int] = None,
+    polyline: Optional[List[List[float]]] = None,
+    cost: Optional[float] = None,
+) -> Tuple[int, List[List[float]], float]:
+    """
+    (floor, polyline, weight) cho cạnh từ node s tới node e (có .x, .y, .floor);
+    HTTP 400 nếu không hợp lệ.
+    """
+    if kind not in EDGE_KINDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"kind không hợp lệ: {kind} (chọn một trong {', '.join(EDGE_KINDS)}).",
+        )
+    connector = kind != "walk"
+
+    # Xác định floor:
+    # - Cạnh nối tầng: 2 node phải khác tầng, floor = tầng của node start
+    # - Nếu payload.floor có -> phải khớp với cả 2 node
+    # - Nếu không -> lấy theo node start, và kiểm tra end cùng tầng
+    if connector:
+        if s.floor == e.floor:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cạnh nối tầng cần 2 node khác tầng: start({s.floor}) = end({e.floor}).",
+            )
+        floor = int(s.floor)
+    elif floor is not None:
+        floor = int(floor)
+        if s.floor != floor or e.floor != floor:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Floor không khớp: start({s.floor})/end({e.floor}) ≠ payload({floor}).",
+            )
+    else:
+        if s.floor != e.floor:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Hai node không cùng tầng: start({s.floor}) vs end({e.floor}).",
+            )
+        floor = int(s.floor)
+
+    # Nếu polyline rỗng, tự tạo đoạn thẳng từ (s) tới (e)
+    poly = polyline or []
+    if len(poly) < 2:
+        poly = [[s.x, s.y], [e.x, e.y]]
+    elif not connector:
+        poly = stored_polyline(poly)
+
+    # tính trọng số theo pixel; cạnh nối tầng dùng chi phí riêng
+    if connector:
+        if cost is not None and cost < 0:
+            raise HTTPException(status_code=400, detail="cost phải >= 0.")
+        w = float(cost) if cost is not None else CONNECTOR_COST_PER_FLOOR[kind] * abs(s.floor - e.floor)
+    else:
+        w = polyline_length(poly)
+    return floor, poly, w
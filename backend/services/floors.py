@@ -0,0 +1,218 @@
+"""
+Tìm đường nhiều tầng theo phân cấp.
+
+Mỗi tầng là một CSRGraph riêng chỉ gồm node và cạnh "walk" của tầng đó, dựng lười
+khi tìm kiếm chạm tới tầng. Lớp overlay gồm các node đầu mút của cạnh nối tầng
+(cầu thang, thang máy) - gọi là "cổng":
+  - giữa hai cổng cùng tầng: khoảng cách đi bộ trong tầng (tính lười, nhớ lại),
+  - giữa hai tầng: chi phí (weight) của cạnh nối.
+Dijkstra trên overlay chỉ mở rộng, và chỉ nạp, các tầng nằm trong bán kính chi phí
+của đường tốt nhất, nên chi phí truy vấn không tăng theo tổng số tầng của toà nhà.
+"""
+
+from heapq import heappush, heappop
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import threading
+
+from sqlmodel import Session
+
+from backend.services.csr import CSRGraph, build_csr
+from backend.services.edge_rules import EDGE_KINDS
+from backend.services.graph_cache import register_builder, get_cached
+from backend.services.graph_snapshot import GraphSnapshot, get_graph_snapshot
+from backend.utils.geo import orient_polyline_to_uv
+
+Point = Tuple[float, float]
+
+
+class Connector(NamedTuple):
+    edge_id: int
+    u: int  # Node.id
+    v: int
+    weight: float
+    kind: str  # "stairs" | "elevator"
+
+
+class FloorLeg(NamedTuple):
+    floor: int
+    node_ids: List[int]
+    polys: List[List[Point]]  # polyline từng cạnh, đã ORIENT theo chiều đi
+    via: Optional[Connector]  # cạnh nối tầng đi tiếp sau chặng này (None ở chặng cuối)
+
+
+def build_floor_csr(snap: GraphSnapshot, floor: int) -> CSRGraph:
+    """CSR chỉ gồm node và cạnh "walk" của một tầng, cắt ra từ snapshot của map."""
+    g = snap.csr
+    floors = g.floors
+    nodes = [
+        (nid, g.xs[i], g.ys[i], floor) for i, nid in enumerate(g.node_ids) if floors[i] == floor
+    ]
+    edges = (
+        (g.edge_ids[slot], snap.edge_u[slot], snap.edge_v[slot], snap.edge_w[slot], g.edge_polyline(slot))
+        for slot in range(len(g.edge_ids))
+        if floors[g.index[snap.edge_u[slot]]] == floor
+    )
+    return build_csr(nodes, edges)
+
+
+class FloorOverlay:
+    def __init__(self, map_id: int):
+        self.map_id = map_id
+        self.node_floor: Dict[int, int] = {}
+        self.connectors: List[Connector] = []
+        self.incident: Dict[int, List[int]] = {}  # node -> chỉ số connector
+        self.portals: Dict[int, List[int]] = {}  # tầng -> các cổng trên tầng
+        self._floors: Dict[int, CSRGraph] = {}
+        self._rows: Dict[int, Dict[int, float]] = {}  # cổng -> {cổng cùng tầng: khoảng cách}
+        self._lock = threading.Lock()
+        self.min_cost_per_floor = 0.0  # min(weight / số tầng vượt qua) trên các connector
+
+    @property
+    def floors_loaded(self) -> List[int]:
+        return sorted(self._floors)
+
+    def floor_graph(self, session: Session, floor: int) -> CSRGraph:
+        g = self._floors.get(floor)
+        if g is None:
+            with self._lock:
+                g = self._floors.get(floor)
+                if g is None:
+                    g = build_floor_csr(get_graph_snapshot(session, self.map_id), floor)
+                    self._floors[floor] = g
+        return g
+
+    def _within(self, session: Session, node_id: int, targets: List[int]) -> Dict[int, float]:
+        """Khoảng cách đi bộ trong tầng của node_id tới các targets (cùng tầng), một cây Dijkstra."""
+        g = self.floor_graph(session, self.node_floor[node_id])
+        s = g.index.get(node_id)
+        if s is None:
+            return {}
+        idx = {t: g.index[t] for t in targets if t in g.index}
+        dist, _pred, _settled = g.shortest_tree(s, set(idx.values()))
+        inf = float("inf")
+        return {t: dist[i] for t, i in idx.items() if dist[i] != inf}
+
+    def _portal_row(self, session: Session, p: int) -> Dict[int, float]:
+        row = self._rows.get(p)
+        if row is None:
+            f = self.node_floor[p]
+            row = self._within(session, p, [q for q in self.portals.get(f, ()) if q != p])
+            self._rows[p] = row
+        return row
+
+    def route(
+        self, session: Session, start_id: int, end_id: int
+    ) -> Optional[Tuple[List[FloorLeg], float, int]]:
+        """
+        Đường tốt nhất start -> end qua các tầng: (các chặng theo tầng, tổng chi phí,
+        số node overlay đã settle), hoặc None nếu không tới được.
+        """
+        fs = self.node_floor[start_id]
+        ft = self.node_floor[end_id]
+        from_s = self._within(
+            session, start_id, self.portals.get(fs, []) + ([end_id] if fs == ft else [])
+        )
+        # đồ thị vô hướng: khoảng cách cổng -> end = end -> cổng
+        to_t = self._within(session, end_id, self.portals.get(ft, []))
+
+        # A* trên overlay: cận dưới = số tầng còn phải đổi x chi phí rẻ nhất cho mỗi tầng,
+        # nên tầng nằm xa ngoài hướng đi không bị mở rộng (và không phải nạp)
+        per_floor = self.min_cost_per_floor
+
+        def h(node: int) -> float:
+            return abs(self.node_floor[node] - ft) * per_floor
+
+        dist: Dict[int, float] = {start_id: 0.0}
+        pred: Dict[int, Tuple[int, Optional[int]]] = {}  # node -> (node trước, connector hoặc None)
+        done = set()
+        heap = [(h(start_id), start_id)]
+        while heap:
+            _f, x = heappop(heap)
+            if x in done:
+                continue
+            d = dist[x]
+            done.add(x)
+            if x == end_id:
+                break
+            if x == start_id:
+                moves = list(from_s.items())
+            else:
+                moves = list(self._portal_row(session, x).items())
+                if x in to_t and self.node_floor[x] == ft:
+                    moves.append((end_id, to_t[x]))
+            steps = [(y, w, None) for y, w in moves]
+            for ci in self.incident.get(x, ()):
+                c = self.connectors[ci]
+                steps.append((c.v if c.u == x else c.u, c.weight, ci))
+            for y, w, ci in steps:
+                nd = d + w
+                if nd < dist.get(y, float("inf")):
+                    dist[y] = nd
+                    pred[y] = (x, ci)
+                    heappush(heap, (nd + h(y), y))
+        if end_id not in done:
+            return None
+
+        hops: List[Tuple[int, int, Optional[int]]] = []
+        y = end_id
+        while y != start_id:
+            x, ci = pred[y]
+            hops.append((x, y, ci))
+            y = x
+        hops.reverse()
+        return self._unpack(session, start_id, hops), dist[end_id], len(done)
+
+    def _unpack(
+        self, session: Session, start_id: int, hops: List[Tuple[int, int, Optional[int]]]
+    ) -> List[FloorLeg]:
+        legs: List[FloorLeg] = []
+        node_ids = [start_id]
+        polys: List[List[Point]] = []
+        for a, b, ci in hops:
+            if ci is not None:
+                legs.append(FloorLeg(self.node_floor[a], node_ids, polys, self.connectors[ci]))
+                node_ids, polys = [b], []
+                continue
+            # đi trong tầng: bung lại đường thật trên đồ thị tầng
+            g = self.floor_graph(session, self.node_floor[a])
+            path_idx, arcs, _settled = g.dijkstra(g.index[a], g.index[b])
+            for k, arc in enumerate(arcs):
+                u, v = path_idx[k], path_idx[k + 1]
+                polys.append(
+                    orient_polyline_to_uv(
+                        g.edge_polyline(g.arc_edge[arc]), g.node_pos(u), g.node_pos(v)
+                    )
+                )
+            node_ids += [g.node_ids[i] for i in path_idx[1:]]
+        legs.append(FloorLeg(self.node_floor[node_ids[0]], node_ids, polys, None))
+        return legs
+
+
+def build_floor_overlay(session: Session, map_id: int) -> FloorOverlay:
+    snap = get_graph_snapshot(session, map_id)
+    g = snap.csr
+    ov = FloorOverlay(map_id)
+    for nid, floor in zip(g.node_ids, g.floors):
+        ov.node_floor[nid] = int(floor)
+    per_floor = []
+    for k in range(len(snap.conn_ids)):
+        u, v, w = snap.conn_u[k], snap.conn_v[k], snap.conn_w[k]
+        span = abs(ov.node_floor[u] - ov.node_floor[v])
+        if span:
+            per_floor.append(w / span)
+        ci = len(ov.connectors)
+        ov.connectors.append(Connector(snap.conn_ids[k], u, v, w, EDGE_KINDS[snap.conn_kind[k]]))
+        for p in (u, v):
+            lst = ov.incident.setdefault(p, [])
+            if not lst:
+                ov.portals.setdefault(ov.node_floor[p], []).append(p)
+            lst.append(ci)
+    ov.min_cost_per_floor = min(per_floor, default=0.0)
+    return ov
+
+
+register_builder("floors", build_floor_overlay)
+
+
+def get_floor_overlay(session: Session, map_id: int) -> FloorOverlay:
+    return get_cached(session, map_id, "floors")
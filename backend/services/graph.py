@@ -1,14 +1,29 @@
-from typing import Tuple, List
-import json
+from typing import Tuple, List, Optional
+from heapq import heappush, heappop
+import math
 import networkx as nx
 from sqlmodel import Session, select
 from backend.models.entities import Node, Edge
+from backend.utils.polyline import unpack_polyline
+
+
+def edge_heuristic_ratio(w: float, ux: float, uy: float, vx: float, vy: float) -> float:
+    """
+    Tỉ lệ weight / khoảng cách thẳng giữa 2 node của cạnh (chặn trên 1.0).
+    Bình thường polyline >= đoạn thẳng nên tỉ lệ >= 1; nếu node bị dời sau khi vẽ
+    cạnh thì polyline có thể ngắn hơn -> phải thu nhỏ heuristic để vẫn admissible.
+    """
+    d = math.hypot(ux - vx, uy - vy)
+    if d <= 1e-9:
+        return 1.0
+    return min(1.0, w / d)
 
 
 def build_graph_for_map(session: Session, map_id: int) -> Tuple[nx.Graph, dict]:
     """
     Trả về:
       - G: networkx.Graph() với trọng số 'weight'
+           (G.graph["h_scale"]: hệ số an toàn cho heuristic Euclid của A*)
       - node_pos: dict { node_id: (x,y) } để dùng cho sinh hướng đi/nearby landmark
     """
     G = nx.Graph()
@@ -19,10 +34,17 @@ def build_graph_for_map(session: Session, map_id: int) -> Tuple[nx.Graph, dict]:
         G.add_node(n.id)
 
     # nạp edges
-    edges = session.exec(select(Edge).where(Edge.map_id == map_id)).all()
+    h_scale = 1.0
+    # chỉ cạnh đi trong tầng; cạnh nối tầng do services/floors.py xử lý
+    edges = session.exec(
+        select(Edge).where(Edge.map_id == map_id).where(Edge.kind == "walk")
+    ).all()
     for e in edges:
-        poly = json.loads(e.polyline)
+        poly = unpack_polyline(e.polyline_xy)
         w = e.weight
+        if e.start_node_id in node_pos and e.end_node_id in node_pos:
+            (ux, uy), (vx, vy) = node_pos[e.start_node_id], node_pos[e.end_node_id]
+            h_scale = min(h_scale, edge_heuristic_ratio(w, ux, uy, vx, vy))
         # cạnh xuôi
         G.add_edge(e.start_node_id, e.end_node_id, weight=w, polyline=poly, edge_id=e.id)
 
@@ -35,4 +57,44 @@ def build_graph_for_map(session: Session, map_id: int) -> Tuple[nx.Graph, dict]:
                 edge_id=e.id,
             )
 
+    G.graph["h_scale"] = h_scale
     return G, node_pos
+
+
+def astar_path(
+    G: nx.Graph, node_pos: dict, source: int, target: int
+) -> Optional[Tuple[List[int], int]]:
+    """
+    A* trên G với heuristic h = h_scale * khoảng cách Euclid tới target (theo node_pos).
+    Trả (path node ids, số node đã settle) hoặc None nếu không có đường.
+    """
+    k = G.graph.get("h_scale", 1.0)
+    tx, ty = node_pos[target]
+
+    def h(n):
+        x, y = node_pos[n]
+        return k * math.hypot(x - tx, y - ty)
+
+    dist = {source: 0.0}
+    pred = {}
+    done = set()
+    heap = [(h(source), 0.0, source)]
+    while heap:
+        _f, d, u = heappop(heap)
+        if u in done:
+            continue
+        done.add(u)
+        if u == target:
+            path = [u]
+            while u != source:
+                u = pred[u]
+                path.append(u)
+            path.reverse()
+            return path, len(done)
+        for v, data in G.adj[u].items():
+            nd = d + data["weight"]
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                pred[v] = u
+                heappush(heap, (nd + h(v), nd, v))
+    return None
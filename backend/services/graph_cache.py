@@ -0,0 +1,230 @@
+"""
+Cache đồ thị định tuyến theo map_id (trong bộ nhớ tiến trình).
+
+Mỗi map có một bộ đếm phiên bản (version). Các API ghi (nodes/edges/aliases/admin)
+gọi `bump_map_version(map_id)` sau khi commit; lần đọc kế tiếp thấy version lệch
+sẽ dựng lại đồ thị, còn lại trả về đồ thị "ấm" đã dựng sẵn.
+map_id = None là phạm vi "mọi map" (vd. chỉ mục alias toàn cục): version của nó
+tăng mỗi khi bất kỳ map nào đổi.
+
+Version là của riêng tiến trình; để các worker uvicorn khác biết map đã đổi, mỗi
+lần bump còn ghi một stamp ngẫu nhiên vào ARTIFACT_DIR/versions/map_<id> (và
+versions/all). get_map_version đọc lại stamp theo chu kỳ VERSION_POLL_MS; stamp
+khác lần trước thì bump cục bộ, nên lần đọc sau dựng lại (thường chỉ là map lại
+snapshot mà worker đã sửa vừa ghi). map_revision trả chính stamp đó làm
+định danh nội dung của map, giống nhau ở mọi worker (ETag của các API danh sách).
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+from sqlmodel import Session
+
+from backend.core.config import VERSION_POLL_MS
+from backend.services.artifacts import artifact_path
+from backend.services.graph import build_graph_for_map
+
+Builder = Callable[[Session, Optional[int]], Any]
+
+_lock = threading.Lock()
+_versions: Dict[Optional[int], int] = {}
+# (map_id, kind) -> (version, value)
+_entries: Dict[Tuple[Optional[int], str], Tuple[int, Any]] = {}
+_build_locks: Dict[Tuple[Optional[int], str], threading.Lock] = {}
+_builders: Dict[str, Builder] = {"nx": build_graph_for_map}
+_stats: Dict[str, Dict[str, float]] = {}
+# gọi listener(map_id) sau mỗi lần bump (cache kết quả ngoài cache đồ thị, vd. route_cache)
+_listeners: List[Callable[[int], None]] = []
+# stamp dùng chung giữa các tiến trình: map_id -> (lần đọc cuối, nội dung đã thấy)
+_stamps: Dict[Optional[int], Tuple[float, Optional[bytes]]] = {}
+# False sau khi ghi stamp lỗi: stamp trên đĩa có thể cũ, map_revision dùng version cục bộ
+_stamps_ok = True
+# phân biệt version cục bộ của tiến trình này với tiến trình khác / lần chạy trước
+_BOOT = os.urandom(4).hex()
+
+
+def _kind_stats(kind: str) -> Dict[str, float]:
+    st = _stats.get(kind)
+    if st is None:
+        st = {"hits": 0, "misses": 0, "rebuilds": 0, "rebuild_ms_total": 0.0, "rebuild_ms_last": 0.0}
+        _stats[kind] = st
+    return st
+
+
+def register_builder(kind: str, builder: Builder) -> None:
+    """Đăng ký hàm dựng cấu trúc dữ liệu `kind` cho một map: builder(session, map_id)."""
+    _builders[kind] = builder
+
+
+def add_invalidation_listener(listener: Callable[[int], None]) -> None:
+    """Đăng ký hàm được gọi với map_id mỗi khi dữ liệu map đổi."""
+    _listeners.append(listener)
+
+
+def _stamp_path(map_id: Optional[int]) -> str:
+    return artifact_path(os.path.join("versions", "all" if map_id is None else f"map_{map_id}"))
+
+
+def _read_stamp(map_id: Optional[int]) -> Optional[bytes]:
+    try:
+        with open(_stamp_path(map_id), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_stamp(map_id: Optional[int]) -> None:
+    path = _stamp_path(map_id)
+    token = os.urandom(8).hex().encode("ascii")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(token)
+        os.replace(tmp, path)
+    except OSError:
+        global _stamps_ok
+        _stamps_ok = False
+        return  # không ghi được: chỉ tiến trình này biết map đã đổi
+    _stamps[map_id] = (time.monotonic(), token)
+
+
+def _sync_shared(map_id: Optional[int]) -> None:
+    """Bump cục bộ nếu worker khác đã ghi stamp mới cho map (đọc tối đa mỗi VERSION_POLL_MS)."""
+    now = time.monotonic()
+    seen = _stamps.get(map_id)
+    if seen is not None and (now - seen[0]) * 1000.0 < VERSION_POLL_MS:
+        return
+    token = _read_stamp(map_id)
+    _stamps[map_id] = (now, token)
+    # lần đầu gặp map: cache của nó chưa có gì để bỏ
+    if seen is not None and token != seen[1]:
+        _bump_local(map_id)
+
+
+def get_map_version(map_id: Optional[int]) -> int:
+    _sync_shared(map_id)
+    return _versions.get(map_id, 0)
+
+
+def map_revision(map_id: Optional[int]) -> str:
+    """
+    Chuỗi đổi mỗi khi dữ liệu map đổi (map_id = None: bất kỳ map nào). Là stamp dùng
+    chung nên giống nhau ở mọi worker; map chưa từng có stamp thì là nonce của tiến
+    trình + version cục bộ (chỉ đúng trong tiến trình này).
+    """
+    version = get_map_version(map_id)
+    seen = _stamps.get(map_id)
+    if seen is None or seen[1] is None or not _stamps_ok:
+        return f"{_BOOT}.{version}"
+    return seen[1].decode("ascii", "replace")
+
+
+def map_stamp(map_id: int) -> Optional[str]:
+    """
+    Stamp version dùng chung hiện tại của map, đọc thẳng từ đĩa ("0" nếu map chưa
+    từng bị bump) - tên của artifact theo version (graph_snapshot). None nếu tiến
+    trình này đã ghi stamp lỗi: stamp trên đĩa có thể cũ hơn dữ liệu.
+    """
+    if not _stamps_ok:
+        return None
+    token = _read_stamp(map_id)
+    return "0" if token is None else token.decode("ascii", "replace")
+
+
+def _bump_local(map_id: Optional[int]) -> int:
+    with _lock:
+        if map_id is not None:
+            _versions[map_id] = _versions.get(map_id, 0) + 1
+        _versions[None] = _versions.get(None, 0) + 1
+        for key in [k for k in _entries if k[0] is None or k[0] == map_id]:
+            del _entries[key]
+    if map_id is not None:
+        for listener in _listeners:
+            listener(map_id)
+    return _versions.get(map_id, 0)
+
+
+def bump_map_version(map_id: Optional[int]) -> int:
+    """Đánh dấu dữ liệu của map đã đổi; bỏ mọi entry cache của map đó (ở mọi worker)."""
+    if map_id is None:
+        return 0
+    v = _bump_local(map_id)
+    _write_stamp(map_id)
+    _write_stamp(None)
+    return v
+
+
+def peek_cached(map_id: Optional[int], kind: str) -> Optional[Any]:
+    """Trả entry còn hợp lệ (không dựng lại, không tính hit/miss), hoặc None."""
+    ent = _entries.get((map_id, kind))
+    if ent is not None and ent[0] == get_map_version(map_id):
+        return ent[1]
+    return None
+
+
+def get_cached(session: Session, map_id: Optional[int], kind: str) -> Any:
+    """Lấy cấu trúc `kind` của map từ cache; dựng lại nếu thiếu hoặc đã cũ."""
+    key = (map_id, kind)
+    st = _kind_stats(kind)
+    ent = _entries.get(key)
+    if ent is not None and ent[0] == get_map_version(map_id):
+        st["hits"] += 1
+        return ent[1]
+
+    with _lock:
+        block = _build_locks.setdefault(key, threading.Lock())
+    with block:
+        # có thể luồng khác vừa dựng xong trong lúc chờ lock
+        version = _versions.get(map_id, 0)
+        ent = _entries.get(key)
+        if ent is not None and ent[0] == version:
+            st["hits"] += 1
+            return ent[1]
+
+        st["misses"] += 1
+        builder = _builders.get(kind)
+        if builder is None:
+            raise KeyError(f"Không có builder cho loại cache '{kind}'.")
+        t0 = time.perf_counter()
+        value = builder(session, map_id)
+        ms = (time.perf_counter() - t0) * 1000.0
+        st["rebuilds"] += 1
+        st["rebuild_ms_total"] += ms
+        st["rebuild_ms_last"] = ms
+
+        with _lock:
+            # chỉ lưu nếu trong lúc dựng không có ai bump version
+            if _versions.get(map_id, 0) == version:
+                _entries[key] = (version, value)
+        return value
+
+
+def get_graph(session: Session, map_id: int):
+    """Thay thế cho build_graph_for_map: trả (G, node_pos) từ cache."""
+    return get_cached(session, map_id, "nx")
+
+
+def cache_stats() -> dict:
+    with _lock:
+        kinds = {}
+        for kind, st in _stats.items():
+            lookups = st["hits"] + st["misses"]
+            kinds[kind] = {
+                **st,
+                "hit_rate": (st["hits"] / lookups) if lookups else 0.0,
+                "rebuild_ms_avg": (st["rebuild_ms_total"] / st["rebuilds"]) if st["rebuilds"] else 0.0,
+            }
+        return {
+            "entries": len(_entries),
+            "versions": {("*" if k is None else k): v for k, v in _versions.items()},
+            "kinds": kinds,
+        }
+
+
+def clear_graph_cache() -> None:
+    with _lock:
+        _entries.clear()
+        _stats.clear()
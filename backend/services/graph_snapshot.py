@@ -0,0 +1,306 @@
+"""
+Snapshot nhị phân của đồ thị một map (ARTIFACT_DIR/map_<id>.<stamp>.snap).
+
+Nội dung: toạ độ/tầng/landmark của node, CSR (indptr, indices, weights, cung ->
+cạnh), polyline phẳng, đầu mút + chiều của từng cạnh, cạnh nối tầng và chuỗi
+alias (tên, norm_name, lang) - đủ để dựng CSRGraph, chỉ mục alias và bảng tên
+mà không phải truy vấn từng hàng hay giải mã từng Edge.polyline_xy.
+
+File theo định dạng của services/artifacts.py với MAGIC mang số phiên bản định
+dạng. Tên file mang stamp version của map (graph_cache.map_stamp), stamp đổi ở
+mỗi bump_map_version nên mọi sửa qua API đều ra file mới, dựng lại từ DB ở lần
+đọc kế tiếp; file của stamp cũ bị xoá khi ghi file mới. Chữ ký trong file là sha1
+của một dấu vân tay rẻ lấy từ DB (đếm, id lớn nhất và tổng có trọng số của các
+cột bằng hàm tổng hợp SQL) - chỉ là chốt chặn thêm cho sửa DB ngoài API (không
+bump), vì nó không thấy mọi thay đổi (vd. dời một đỉnh polyline giữ nguyên số
+đỉnh); sửa DB trực tiếp thì nên xoá ARTIFACT_DIR. Snapshot được nạp lúc khởi
+động (load_snapshots).
+
+Worker đọc snapshot qua mmap (artifacts.map_arrays): các mảng của CSRGraph và
+GraphSnapshot là view trên file, không chép, nên N worker uvicorn cùng một file
+chỉ tốn một bản trong page cache. Dựng + ghi file chạy dưới khoá liên tiến trình;
+worker tới sau map lại file vừa ghi thay vì tự dựng. Sửa map -> stamp mới, nên
+worker đầu tiên đọc lại ghi file mới (ghi tạm rồi os.replace) và xoá file của
+stamp cũ; worker khác thấy stamp mới (graph_cache) thì map file mới - không bao
+giờ map lại file của version trước. View cũ vẫn hợp lệ tới khi request đang chạy
+trên nó kết thúc (xoá file không gỡ vùng đã mmap).
+"""
+
+from array import array
+from typing import List, Optional, Tuple
+import hashlib
+import io
+import os
+
+from sqlalchemy import Integer, cast, func
+from sqlmodel import Session, select
+
+from backend.models.entities import Alias, Edge, Map, Node
+from backend.services.artifacts import (
+    artifact_lock,
+    artifact_path,
+    dump_arrays,
+    load_arrays,
+    map_arrays,
+    read_arrays,
+    write_arrays,
+)
+from backend.services.csr import CSRGraph, SortedIdIndex, build_csr
+from backend.services.edge_rules import EDGE_KINDS
+from backend.services.graph_cache import register_builder, get_cached, map_stamp, peek_cached
+
+MAGIC = b"WFSNAP02"  # 2 ký tự cuối = phiên bản định dạng
+
+# thứ tự các mảng trong file
+_FIELDS = (
+    "meta",  # d: [h_scale]
+    "node_ids", "xs", "ys", "floors", "landmark",
+    "indptr", "indices", "weights", "arc_edge", "edge_ids", "poly_ptr", "poly_xy",
+    "edge_u", "edge_v", "edge_w", "edge_bidir",  # theo slot cạnh (Node.id, như trong DB)
+    "conn_ids", "conn_u", "conn_v", "conn_w", "conn_kind", "conn_bidir",
+    "alias_ids", "alias_node", "alias_weight", "alias_generated",
+    "alias_text_ptr", "alias_text",  # 3 chuỗi utf-8 mỗi alias: name, norm_name, lang
+)
+
+
+class GraphSnapshot:
+    __slots__ = ("signature", "csr") + tuple(
+        f for f in _FIELDS if f != "meta" and f not in CSRGraph.__slots__
+    )
+
+    def alias_strings(self) -> Tuple[List[str], List[str], List[str]]:
+        """(names, norm_names, langs) theo thứ tự alias_ids."""
+        text = self.alias_text.tobytes()
+        ptr = self.alias_text_ptr
+        cols: Tuple[List[str], List[str], List[str]] = ([], [], [])
+        for k in range(len(ptr) - 1):
+            cols[k % 3].append(text[ptr[k] : ptr[k + 1]].decode("utf-8"))
+        return cols
+
+    def to_arrays(self) -> List[array]:
+        g = self.csr
+        out = []
+        for f in _FIELDS:
+            if f == "meta":
+                out.append(array("d", [g.h_scale]))
+            elif f == "floors" and not isinstance(g.floors, memoryview):
+                out.append(array("q", g.floors))  # "l" khác cỡ giữa các nền tảng
+            elif f in CSRGraph.__slots__:
+                out.append(getattr(g, f))
+            else:
+                out.append(getattr(self, f))
+        return out
+
+    @classmethod
+    def from_arrays(cls, signature: str, arrays: List) -> Optional["GraphSnapshot"]:
+        """Dựng từ các mảng của file (array, hoặc memoryview trên mmap - giữ nguyên, không chép)."""
+        if len(arrays) != len(_FIELDS):
+            return None
+        snap = cls()
+        snap.signature = signature
+        g = CSRGraph()
+        for f, arr in zip(_FIELDS, arrays):
+            if f == "meta":
+                g.h_scale = arr[0]
+            elif f in CSRGraph.__slots__:
+                setattr(g, f, arr)
+            else:
+                setattr(snap, f, arr)
+        ids = g.node_ids
+        # build_snapshot_from_db xếp node theo id -> tìm nhị phân thay cho dict riêng mỗi worker
+        if all(ids[i] < ids[i + 1] for i in range(len(ids) - 1)):
+            g.index = SortedIdIndex(ids)
+        else:
+            g.index = {nid: i for i, nid in enumerate(ids)}
+        snap.csr = g
+        return snap
+
+
+def snapshot_path(map_id: int) -> Optional[str]:
+    """File snapshot của stamp version hiện tại của map; None nếu stamp không tin được."""
+    stamp = map_stamp(map_id)
+    if stamp is None:
+        return None
+    return artifact_path(f"map_{map_id}.{stamp}.snap")
+
+
+def _remove_stale(map_id: int, keep: str) -> None:
+    """Xoá snapshot (và file khoá) của các stamp cũ; worker đang map file cũ vẫn đọc được."""
+    folder = os.path.dirname(keep)
+    prefix = f"map_{map_id}."
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(folder, name)
+        stale = name.endswith(".snap") or name.endswith(".snap.lock")
+        if name.startswith(prefix) and stale and path not in (keep, f"{keep}.lock"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _total(expr):
+    # SUM khả chuyển giữa các DB (func.total chỉ có ở SQLite); 0 khi map không có hàng
+    return func.coalesce(func.sum(expr), 0)
+
+
+def db_signature(session: Session, map_id: int) -> str:
+    """Dấu vân tay rẻ (chỉ hàm tổng hợp, không đọc polyline) của node/cạnh/alias của map."""
+    nodes = session.exec(
+        select(
+            func.count(Node.id), func.max(Node.id),
+            _total(Node.x * (Node.id % 997 + 1)), _total(Node.y * (Node.id % 991 + 1)),
+            _total(Node.floor * (Node.id % 983 + 1)),
+            _total(cast(Node.is_landmark, Integer) * (Node.id % 977 + 1)),
+        ).where(Node.map_id == map_id)
+    ).one()
+    edges = session.exec(
+        select(
+            func.count(Edge.id), func.max(Edge.id),
+            _total(Edge.weight * (Edge.id % 997 + 1)),
+            _total(func.length(Edge.polyline_xy) * (Edge.id % 991 + 1)),
+            _total((Edge.start_node_id * 31 + Edge.end_node_id) * (Edge.id % 983 + 1)),
+            _total(cast(Edge.bidirectional, Integer) * (Edge.id % 977 + 1)),
+            _total(func.length(Edge.kind) * (Edge.id % 971 + 1)),
+        ).where(Edge.map_id == map_id)
+    ).one()
+    aliases = session.exec(
+        select(
+            func.count(Alias.id), func.max(Alias.id),
+            _total(func.length(Alias.name) * (Alias.id % 997 + 1)),
+            _total(Alias.weight * (Alias.id % 991 + 1)),
+            _total(Alias.node_id * (Alias.id % 983 + 1)),
+        )
+        .join(Node, Alias.node_id == Node.id)
+        .where(Node.map_id == map_id)
+    ).one()
+    raw = repr((MAGIC, map_id, tuple(nodes), tuple(edges), tuple(aliases)))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def build_snapshot_from_db(session: Session, map_id: int, signature: str) -> GraphSnapshot:
+    nodes = session.exec(
+        select(Node.id, Node.x, Node.y, Node.floor, Node.is_landmark)
+        .where(Node.map_id == map_id)
+        .order_by(Node.id)
+    ).all()
+    edges = session.exec(
+        select(
+            Edge.id, Edge.start_node_id, Edge.end_node_id, Edge.weight, Edge.polyline_xy,
+            Edge.kind, Edge.bidirectional,
+        )
+        .where(Edge.map_id == map_id)
+        .order_by(Edge.id)
+    ).all()
+    aliases = session.exec(
+        select(Alias.id, Alias.node_id, Alias.name, Alias.norm_name, Alias.lang, Alias.weight, Alias.generated)
+        .join(Node, Alias.node_id == Node.id)
+        .where(Node.map_id == map_id)
+        .order_by(Alias.id)
+    ).all()
+
+    known = {row[0] for row in nodes}
+    walk = [r for r in edges if r[5] == "walk" and r[1] in known and r[2] in known]
+    conns = [r for r in edges if r[5] != "walk" and r[1] in known and r[2] in known]
+
+    snap = GraphSnapshot()
+    snap.signature = signature
+    snap.csr = build_csr(
+        ((nid, x, y, floor) for nid, x, y, floor, _lm in nodes),
+        ((eid, u, v, w, p) for eid, u, v, w, p, _k, _b in walk),
+    )
+    snap.landmark = array("b", (1 if lm else 0 for *_r, lm in nodes))
+    snap.edge_u = array("q", (r[1] for r in walk))
+    snap.edge_v = array("q", (r[2] for r in walk))
+    snap.edge_w = array("d", (float(r[3]) for r in walk))
+    snap.edge_bidir = array("b", (1 if r[6] else 0 for r in walk))
+    snap.conn_ids = array("q", (r[0] for r in conns))
+    snap.conn_u = array("q", (r[1] for r in conns))
+    snap.conn_v = array("q", (r[2] for r in conns))
+    snap.conn_w = array("d", (float(r[3]) for r in conns))
+    snap.conn_kind = array("b", (EDGE_KINDS.index(r[5]) if r[5] in EDGE_KINDS else 0 for r in conns))
+    snap.conn_bidir = array("b", (1 if r[6] else 0 for r in conns))
+
+    snap.alias_ids = array("q", (r[0] for r in aliases))
+    snap.alias_node = array("q", (r[1] for r in aliases))
+    snap.alias_weight = array("d", (float(r[5]) for r in aliases))
+    snap.alias_generated = array("b", (1 if r[6] else 0 for r in aliases))
+    ptr = array("q", [0])
+    text = bytearray()
+    for r in aliases:
+        for s in (r[2], r[3], r[4] or ""):
+            text += s.encode("utf-8")
+            ptr.append(len(text))
+    snap.alias_text_ptr = ptr
+    snap.alias_text = array("B", bytes(text))
+    return snap
+
+
+def snapshot_bytes(snap: GraphSnapshot) -> bytes:
+    buf = io.BytesIO()
+    dump_arrays(buf, MAGIC, snap.signature, snap.to_arrays())
+    return buf.getvalue()
+
+
+def snapshot_from_bytes(data: bytes) -> Optional[GraphSnapshot]:
+    """Đọc snapshot đã xuất (không kiểm tra chữ ký - dùng khi nhập sang map khác)."""
+    buf = io.BytesIO(data)
+    arrays = load_arrays(buf, MAGIC, None)
+    if arrays is None:
+        return None
+    signature = data[len(MAGIC) : len(MAGIC) + 40].decode("ascii", "replace")
+    return GraphSnapshot.from_arrays(signature, arrays)
+
+
+def load_snapshot_file(path: str, signature: str, copy: bool = False) -> Optional[GraphSnapshot]:
+    """Snapshot từ file nếu chữ ký khớp: view mmap dùng chung, hoặc bản chép riêng (copy=True)."""
+    arrays = read_arrays(path, MAGIC, signature) if copy else map_arrays(path, MAGIC, signature)
+    if arrays is None:
+        return None
+    return GraphSnapshot.from_arrays(signature, arrays)
+
+
+def build_graph_snapshot(session: Session, map_id: int) -> GraphSnapshot:
+    sig = db_signature(session, map_id)
+    path = snapshot_path(map_id)
+    if path is None:
+        # stamp có thể cũ hơn dữ liệu: không tin file nào, dựng từ DB, không ghi
+        return build_snapshot_from_db(session, map_id, sig)
+    snap = load_snapshot_file(path, sig)
+    if snap is not None:
+        return snap
+    with artifact_lock(path):
+        # worker khác có thể vừa dựng xong trong lúc chờ khoá
+        snap = load_snapshot_file(path, sig)
+        if snap is not None:
+            return snap
+        snap = build_snapshot_from_db(session, map_id, sig)
+        try:
+            write_arrays(path, MAGIC, sig, snap.to_arrays())
+        except OSError:
+            return snap  # không ghi được thì vẫn dùng snapshot trong bộ nhớ
+    _remove_stale(map_id, path)
+    # bỏ bản vừa dựng, dùng view trên file như các worker khác
+    return load_snapshot_file(path, sig) or snap
+
+
+register_builder("graph_snapshot", build_graph_snapshot)
+
+
+def get_graph_snapshot(session: Session, map_id: int) -> GraphSnapshot:
+    return get_cached(session, map_id, "graph_snapshot")
+
+
+def load_snapshots(session: Session) -> int:
+    """Nạp snapshot còn hợp lệ của mọi map có file (lúc khởi động); trả số map đã nạp."""
+    loaded = 0
+    for map_id in session.exec(select(Map.id)).all():
+        path = snapshot_path(map_id)
+        if path is None or not os.path.exists(path) or peek_cached(map_id, "graph_snapshot"):
+            continue
+        get_graph_snapshot(session, map_id)
+        loaded += 1
+    return loaded
@@ -0,0 +1,355 @@
+"""
+Nhập hàng loạt node + alias + cạnh cho một map trong một giao dịch.
+
+Tài liệu là JSON {"nodes": [...], "aliases": [...], "edges": [...]} hoặc GeoJSON
+FeatureCollection (Point = node, LineString = cạnh). Node mang id tạm do client
+đặt (chuỗi hoặc số); alias/cạnh tham chiếu node mới qua id tạm, hoặc node đã có
+trong DB qua start_node_id/end_node_id (vd. cầu thang nối sang tầng đã nhập).
+Mọi kiểm tra (tham chiếu, tầng, loại cạnh, trọng số - cùng quy tắc với POST /edges)
+chạy trước khi ghi; lỗi ở bất kỳ phần tử nào thì không ghi gì cả.
+"""
+
+from typing import Annotated, Any, Dict, List, NamedTuple, Optional, Tuple, Union
+import json
+import time
+
+from fastapi import HTTPException
+from pydantic import BaseModel, BeforeValidator, ValidationError
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from backend.models.entities import Alias, Edge, Node
+from backend.services.edge_rules import EDGE_KINDS, edge_geometry
+from backend.services.graph_cache import bump_map_version
+from backend.services.graph_snapshot import GraphSnapshot
+from backend.utils.norm import normalize_name
+from backend.utils.polyline import pack_polyline
+
+TempId = Union[int, str]
+
+
+def _not_bool(v: Any) -> Any:
+    # int của pydantic nhận true/false như 1/0
+    if isinstance(v, bool):
+        raise ValueError("tầng phải là số nguyên, không phải true/false")
+    return v
+
+
+Floor = Annotated[int, BeforeValidator(_not_bool)]
+
+
+class ImportNode(BaseModel):
+    id: TempId
+    x: float
+    y: float
+    floor: Floor = 1
+    is_landmark: bool = False
+    meta: Optional[Any] = None
+    names: List[str] = []  # alias viết gọn ngay trên node
+
+
+class ImportAlias(BaseModel):
+    node: TempId
+    name: str
+    lang: str = "vi"
+    weight: float = 1.0
+    generated: bool = False
+
+
+class ImportEdge(BaseModel):
+    start: Optional[TempId] = None
+    end: Optional[TempId] = None
+    start_node_id: Optional[int] = None  # node đã có trong DB
+    end_node_id: Optional[int] = None
+    polyline: Optional[List[List[float]]] = None
+    bidirectional: bool = True
+    kind: str = "walk"
+    cost: Optional[float] = None
+    floor: Optional[Floor] = None
+    meta: Optional[Any] = None
+
+
+class ImportDoc(BaseModel):
+    nodes: List[ImportNode] = []
+    aliases: List[ImportAlias] = []
+    edges: List[ImportEdge] = []
+
+
+class ImportResult(BaseModel):
+    map_id: int
+    nodes: int
+    aliases: int
+    edges: int
+    node_ids: Dict[str, int]  # id tạm -> Node.id
+    elapsed_ms: float
+    rows_per_s: float
+
+
+class _Pt(NamedTuple):
+    x: float
+    y: float
+    floor: int
+
+
+def _bad(detail: str):
+    raise HTTPException(status_code=400, detail=detail)
+
+
+def _meta_str(meta: Any) -> Optional[str]:
+    if meta is None or isinstance(meta, str):
+        return meta
+    return json.dumps(meta, ensure_ascii=False)
+
+
+def _position(p: Any, where: str) -> List[float]:
+    """Vị trí GeoJSON [x, y, ...] -> [x, y] (HTTP 400 nếu sai dạng)."""
+    if (
+        not isinstance(p, list)
+        or len(p) < 2
+        or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in p[:2])
+    ):
+        _bad(f"{where}: toạ độ phải là [x, y], không phải {json.dumps(p)[:80]}.")
+    return [float(p[0]), float(p[1])]
+
+
+def _from_geojson(doc: Dict[str, Any]) -> ImportDoc:
+    nodes: List[Dict[str, Any]] = []
+    edges: List[Dict[str, Any]] = []
+    # chỉ số feature của từng node / cạnh, để báo lỗi theo features[i]
+    feat_of: Dict[str, List[int]] = {"nodes": [], "edges": []}
+    features = doc.get("features") or []
+    if not isinstance(features, list):
+        _bad("features phải là danh sách Feature.")
+    for i, feat in enumerate(features):
+        if not isinstance(feat, dict):
+            _bad(f"features[{i}]: phải là một Feature.")
+        geom = feat.get("geometry") or {}
+        props = feat.get("properties") or {}
+        if not isinstance(geom, dict) or not isinstance(props, dict):
+            _bad(f"features[{i}]: geometry và properties phải là object.")
+        props = dict(props)
+        gtype = geom.get("type")
+        coords = geom.get("coordinates")
+        where = f"features[{i}].geometry.coordinates"
+        if gtype == "Point":
+            x, y = _position(coords, where)
+            names = props.pop("names", None) or []
+            if props.get("name"):
+                names = [props.pop("name")] + list(names)
+            props.setdefault("id", feat.get("id", f"#{i}"))
+            nodes.append({**props, "x": x, "y": y, "names": names})
+            feat_of["nodes"].append(i)
+        elif gtype == "LineString":
+            if not isinstance(coords, list) or len(coords) < 2:
+                _bad(f"{where}: LineString cần ít nhất 2 điểm.")
+            edges.append({**props, "polyline": [_position(p, f"{where}[{k}]") for k, p in enumerate(coords)]})
+            feat_of["edges"].append(i)
+        else:
+            _bad(f"features[{i}]: chỉ hỗ trợ Point (node) và LineString (cạnh), không phải {gtype}.")
+
+    # properties (floor, id, ...) được kiểm tra trước khi dùng để khớp đầu mút
+    try:
+        out = ImportDoc.model_validate({"nodes": nodes, "edges": edges})
+    except ValidationError as ex:
+        err = ex.errors()[0]
+        part, k, *field = err["loc"]
+        _bad(f"features[{feat_of[part][k]}]: {'.'.join(str(p) for p in field)}: {err['msg']}")
+
+    # LineString không ghi start/end -> khớp đầu mút với toạ độ Point đã nhập
+    by_xy: Dict[Tuple[float, float], List[ImportNode]] = {}
+    for n in out.nodes:
+        by_xy.setdefault((round(n.x, 6), round(n.y, 6)), []).append(n)
+    for k, e in enumerate(out.edges):
+        for end, pt in (("start", e.polyline[0]), ("end", e.polyline[-1])):
+            if getattr(e, end) is not None or getattr(e, f"{end}_node_id") is not None:
+                continue
+            cands = by_xy.get((round(pt[0], 6), round(pt[1], 6)), [])
+            if e.floor is not None and e.kind == "walk":
+                cands = [n for n in cands if n.floor == e.floor]
+            if len(cands) != 1:
+                _bad(
+                    f"features[{feat_of['edges'][k]}]: không xác định được node {end} từ toạ độ {pt} "
+                    f"({len(cands)} node khớp)."
+                )
+            setattr(e, end, cands[0].id)
+    return out
+
+
+def parse_import(doc: Dict[str, Any]) -> ImportDoc:
+    """Tài liệu JSON/GeoJSON -> ImportDoc (HTTP 400 nếu sai định dạng)."""
+    try:
+        if doc.get("type") == "FeatureCollection":
+            return _from_geojson(doc)
+        return ImportDoc.model_validate(doc)
+    except ValidationError as ex:
+        err = ex.errors()[0]
+        _bad(f"Dữ liệu nhập không hợp lệ: {'.'.join(str(p) for p in err['loc'])}: {err['msg']}")
+
+
+def import_doc_from_snapshot(snap: GraphSnapshot) -> ImportDoc:
+    """Snapshot nhị phân (GET /maps/{id}/snapshot) -> ImportDoc, id node cũ làm id tạm."""
+    g = snap.csr
+    names, _norm, langs = snap.alias_strings()
+    nodes = [
+        ImportNode(id=nid, x=g.xs[i], y=g.ys[i], floor=g.floors[i], is_landmark=bool(snap.landmark[i]))
+        for i, nid in enumerate(g.node_ids)
+    ]
+    aliases = [
+        ImportAlias(
+            node=snap.alias_node[k],
+            name=names[k],
+            lang=langs[k] or "vi",
+            weight=snap.alias_weight[k],
+            generated=bool(snap.alias_generated[k]),
+        )
+        for k in range(len(snap.alias_ids))
+    ]
+    edges = [
+        ImportEdge(
+            start=snap.edge_u[slot],
+            end=snap.edge_v[slot],
+            polyline=[[x, y] for x, y in g.edge_polyline(slot)],
+            bidirectional=bool(snap.edge_bidir[slot]),
+        )
+        for slot in range(len(g.edge_ids))
+    ]
+    edges += [
+        ImportEdge(
+            start=snap.conn_u[k],
+            end=snap.conn_v[k],
+            kind=EDGE_KINDS[snap.conn_kind[k]],
+            cost=snap.conn_w[k],
+            bidirectional=bool(snap.conn_bidir[k]),
+        )
+        for k in range(len(snap.conn_ids))
+    ]
+    return ImportDoc(nodes=nodes, aliases=aliases, edges=edges)
+
+
+def import_graph(session: Session, map_id: int, doc: ImportDoc) -> ImportResult:
+    t0 = time.perf_counter()
+
+    # --- kiểm tra toàn bộ trước khi ghi ---
+    temp: Dict[str, int] = {}  # id tạm -> vị trí trong doc.nodes
+    for i, n in enumerate(doc.nodes):
+        key = str(n.id)
+        if key in temp:
+            _bad(f"nodes[{i}]: id tạm '{key}' bị trùng.")
+        temp[key] = i
+
+    existing_ids = {
+        nid
+        for e in doc.edges
+        for nid in (e.start_node_id, e.end_node_id)
+        if nid is not None
+    }
+    existing: Dict[int, Node] = {}
+    if existing_ids:
+        for n in session.exec(select(Node).where(Node.id.in_(existing_ids))):
+            existing[n.id] = n
+
+    def endpoint(k: int, tmp: Optional[TempId], real: Optional[int], end: str):
+        if tmp is not None:
+            pos = temp.get(str(tmp))
+            if pos is None:
+                _bad(f"edges[{k}]: {end} '{tmp}' không có trong nodes.")
+            n = doc.nodes[pos]
+            return ("tmp", pos), _Pt(n.x, n.y, n.floor)
+        if real is not None:
+            n = existing.get(real)
+            if n is None or n.map_id != map_id:
+                _bad(f"edges[{k}]: {end}_node_id {real} không tồn tại hoặc khác map.")
+            return ("db", real), n
+        _bad(f"edges[{k}]: thiếu {end} (id tạm) hoặc {end}_node_id.")
+
+    edge_plan = []
+    for k, e in enumerate(doc.edges):
+        s_ref, s = endpoint(k, e.start, e.start_node_id, "start")
+        e_ref, t = endpoint(k, e.end, e.end_node_id, "end")
+        try:
+            floor, poly, w = edge_geometry(e.kind, s, t, e.floor, e.polyline, e.cost)
+        except HTTPException as ex:
+            _bad(f"edges[{k}]: {ex.detail}")
+        edge_plan.append((s_ref, e_ref, floor, poly, w, e))
+
+    alias_plan: List[Tuple[int, str, str, float, bool]] = []
+    for i, n in enumerate(doc.nodes):
+        for name in n.names:
+            alias_plan.append((i, name, "vi", 1.0, False))
+    for j, a in enumerate(doc.aliases):
+        pos = temp.get(str(a.node))
+        if pos is None:
+            _bad(f"aliases[{j}]: node '{a.node}' không có trong nodes.")
+        alias_plan.append((pos, a.name, a.lang, a.weight, a.generated))
+
+    # --- ghi: executemany, một giao dịch ---
+    node_ids: List[int] = []
+    if doc.nodes:
+        rows = session.execute(
+            insert(Node).returning(Node.id, sort_by_parameter_order=True),
+            [
+                {
+                    "map_id": map_id,
+                    "x": n.x,
+                    "y": n.y,
+                    "is_landmark": n.is_landmark,
+                    "floor": n.floor,
+                    "meta": _meta_str(n.meta),
+                }
+                for n in doc.nodes
+            ],
+        ).all()
+        node_ids = [r[0] for r in rows]
+
+    if alias_plan:
+        session.execute(
+            insert(Alias),
+            [
+                {
+                    "node_id": node_ids[pos],
+                    "name": name,
+                    "norm_name": normalize_name(name),
+                    "lang": lang,
+                    "weight": weight,
+                    "generated": generated,
+                }
+                for pos, name, lang, weight, generated in alias_plan
+            ],
+        )
+
+    def real_id(ref) -> int:
+        return node_ids[ref[1]] if ref[0] == "tmp" else ref[1]
+
+    if edge_plan:
+        session.execute(
+            insert(Edge),
+            [
+                {
+                    "map_id": map_id,
+                    "start_node_id": real_id(s_ref),
+                    "end_node_id": real_id(e_ref),
+                    "floor": floor,
+                    "polyline_xy": pack_polyline(poly),
+                    "weight": w,
+                    "bidirectional": e.bidirectional,
+                    "meta": _meta_str(e.meta),
+                    "kind": e.kind,
+                }
+                for s_ref, e_ref, floor, poly, w, e in edge_plan
+            ],
+        )
+
+    session.commit()
+    bump_map_version(map_id)
+
+    secs = time.perf_counter() - t0
+    total = len(node_ids) + len(alias_plan) + len(edge_plan)
+    return ImportResult(
+        map_id=map_id,
+        nodes=len(node_ids),
+        aliases=len(alias_plan),
+        edges=len(edge_plan),
+        node_ids={str(n.id): nid for n, nid in zip(doc.nodes, node_ids)},
+        elapsed_ms=secs * 1000.0,
+        rows_per_s=total / secs if secs > 0 else 0.0,
+    )
@@ -0,0 +1,65 @@
+"""
+GET có điều kiện (ETag / If-None-Match) cho các API danh sách: /maps, /nodes,
+/edges, /aliases.
+
+ETag = revision của map (graph_cache.map_revision, đổi ở mỗi lần bump và giống
+nhau ở mọi worker) + crc của tham số truy vấn. ETag khớp -> 304 ngay, không đụng
+DB, không serialize; không khớp -> body JSON đã serialize sẵn của revision đó
+(SizedLRUCache theo byte), trượt mới truy vấn. Kèm Cache-Control: no-cache để
+trình duyệt luôn hỏi lại bằng If-None-Match thay vì tải lại cả danh sách.
+"""
+
+from typing import Callable, Hashable, Optional, Tuple
+import zlib
+
+from fastapi import Request, Response
+
+from backend.core.config import LIST_CACHE_MB
+from backend.services.graph_cache import add_invalidation_listener, map_revision
+from backend.services.route_cache import SizedLRUCache
+
+# (map_id hoặc None, tên API, tham số..., revision) -> (etag, body)
+list_cache = SizedLRUCache(int(LIST_CACHE_MB * 1024 * 1024))
+
+
+def _invalidate(map_id: int) -> None:
+    # danh sách phạm vi mọi map (/maps, /aliases) cũng cũ đi khi một map đổi
+    list_cache.invalidate_map(map_id)
+    list_cache.invalidate_map(None)
+
+
+add_invalidation_listener(_invalidate)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """So If-None-Match (danh sách ETag hoặc *) với etag theo kiểu so sánh yếu (RFC 9110)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+def cached_list(
+    request: Request, map_id: Optional[int], key: Tuple[Hashable, ...], build: Callable[[], bytes]
+) -> Response:
+    """
+    Trả danh sách của map_id (None = mọi map) có ETag: 304 nếu client đã có bản
+    hiện tại, ngược lại body đã cache của revision hoặc build() (bytes JSON).
+    """
+    rev = map_revision(map_id)
+    etag = f'"{rev}-{zlib.crc32(repr(key).encode("utf-8")):08x}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    ckey = (map_id,) + key + (rev,)
+    body = list_cache.get(ckey)
+    if body is None:
+        body = build()
+        list_cache.put(ckey, body, len(body) + 200)
+    return Response(content=body, media_type="application/json", headers=headers)
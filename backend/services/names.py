@@ -0,0 +1,35 @@
+"""
+Bảng tên hiển thị node_id -> tên alias 'đẹp' nhất của một map (trong bộ nhớ).
+
+Thứ tự chọn giống trước đây: Alias.weight cao nhất, hoà thì Alias.id nhỏ nhất.
+Bảng dựng từ snapshot của map (services/graph_snapshot.py) và nằm trong cache đồ
+thị nên tự dựng lại khi node/alias của map thay đổi.
+"""
+
+from typing import Dict
+
+from sqlmodel import Session
+
+from backend.services.graph_cache import register_builder, get_cached
+from backend.services.graph_snapshot import get_graph_snapshot
+
+
+def build_node_names(session: Session, map_id: int) -> Dict[int, str]:
+    snap = get_graph_snapshot(session, map_id)
+    all_names = snap.alias_strings()[0]
+    order = sorted(
+        range(len(snap.alias_ids)),
+        key=lambda k: (snap.alias_node[k], -snap.alias_weight[k], snap.alias_ids[k]),
+    )
+    names: Dict[int, str] = {}
+    for k in order:
+        # alias đầu tiên của mỗi node là alias tốt nhất
+        names.setdefault(snap.alias_node[k], all_names[k])
+    return names
+
+
+register_builder("names", build_node_names)
+
+
+def get_node_names(session: Session, map_id: int) -> Dict[int, str]:
+    return get_cached(session, map_id, "names")
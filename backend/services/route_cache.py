@@ -0,0 +1,110 @@
+"""
+Cache LRU giới hạn theo dung lượng (byte) cho kết quả đã tính xong.
+
+Khoá là tuple bắt đầu bằng map_id và có version của map (get_map_version), nên
+entry cũ không bao giờ được trả về sau khi map đổi; ngoài ra cache đăng ký
+listener với graph_cache để bỏ ngay các entry của map vừa bump, trả lại bộ nhớ.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+from backend.core.config import RESOLVE_CACHE_MB, ROUTE_CACHE_MB, ROUTE_CACHE_TTL
+from backend.services.graph_cache import add_invalidation_listener
+
+
+class SizedLRUCache:
+    def __init__(self, max_bytes: int, ttl: float = 0.0):
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        # key -> (hết hạn lúc (monotonic) hoặc 0, số byte, value); cuối = dùng gần nhất
+        self._data: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            ent = self._data.get(key)
+            if ent is None:
+                self.misses += 1
+                return None
+            expires, nbytes, value = ent
+            if expires and expires < time.monotonic():
+                del self._data[key]
+                self.bytes -= nbytes
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, nbytes: int) -> None:
+        if nbytes > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (expires, nbytes, value)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                _k, (_e, b, _v) = self._data.popitem(last=False)
+                self.bytes -= b
+                self.evictions += 1
+
+    def invalidate_map(self, map_id: int) -> None:
+        """Bỏ mọi entry có key[0] == map_id."""
+        with self._lock:
+            for key in [k for k in self._data if k[0] == map_id]:
+                self.bytes -= self._data.pop(key)[1]
+                self.invalidated += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+            }
+
+
+# RouteResponse đã hoàn chỉnh (polyline + hướng dẫn) theo
+# (map_id, start_id, end_id, version map, thuật toán)
+route_cache = SizedLRUCache(int(ROUTE_CACHE_MB * 1024 * 1024), ROUTE_CACHE_TTL)
+add_invalidation_listener(route_cache.invalidate_map)
+
+# Phân giải câu hỏi tự nhiên -> (có A?, start_id, end_id) theo
+# (map_id, q chuẩn hoá, cx/cy làm tròn, version map); xem routes.resolve_query
+resolve_cache = SizedLRUCache(int(RESOLVE_CACHE_MB * 1024 * 1024), ROUTE_CACHE_TTL)
+add_invalidation_listener(resolve_cache.invalidate_map)
+# ước lượng chi phí một entry (tuple khoá + kết quả) ngoài độ dài câu hỏi
+RESOLVE_ENTRY_BYTES = 240
+# ước lượng cỡ JSON của một RouteResponse theo số phần tử (không serialize lại khi
+# put): phần cố định, mỗi điểm polyline, mỗi node, mỗi hướng dẫn (ngoài text), mỗi chặng
+ROUTE_ENTRY_BYTES = 160
+ROUTE_POINT_BYTES = 32
+ROUTE_NODE_BYTES = 6
+ROUTE_INSTRUCTION_BYTES = 70
+ROUTE_LEG_BYTES = 50
@@ -0,0 +1,127 @@
+"""
+Phục vụ đọc từ snapshot trong bộ nhớ (chế độ WAYFINDER_SERVING_MODE=async).
+
+Các handler sync (route_api, nl_route, search_alias) chỉ chạm DB khi một cấu trúc
+trong cache đồ thị còn thiếu hoặc đã cũ. `serve` gọi thẳng handler với
+SNAPSHOT_ONLY thay cho Session: nếu mọi thứ cần thiết đã "ấm", request được trả
+lời ngay trên event loop, không chiếm worker của threadpool; chỉ cần một truy cập
+DB là SnapshotMiss được ném ra và request chạy lại trong AsyncSession.run_sync
+(aiosqlite qua SQLAlchemy async): mỗi truy vấn là một await, event loop rảnh
+trong lúc chờ DB.
+"""
+
+from typing import Any, Callable, Dict, FrozenSet, List
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.core.config import ROUTING_ALGORITHM, ROUTING_ENGINE
+from backend.core.db import get_async_engine, read_engine
+from backend.models.entities import Map
+from backend.services.graph_cache import register_builder, get_cached
+
+
+class SnapshotMiss(Exception):
+    """Request cần đọc DB (snapshot còn thiếu hoặc đã cũ)."""
+
+
+class _SnapshotOnly:
+    """Thay cho Session: mọi truy cập DB đều là trượt snapshot."""
+
+    def __getattr__(self, name):
+        raise SnapshotMiss(name)
+
+
+SNAPSHOT_ONLY: Any = _SnapshotOnly()
+
+_stats: Dict[str, int] = {"snapshot": 0, "fallback": 0}
+
+
+def build_map_ids(session: Session, _map_id: None) -> FrozenSet[int]:
+    return frozenset(session.exec(select(Map.id)).all())
+
+
+register_builder("map_ids", build_map_ids)
+
+
+def map_exists(session: Session, map_id: int) -> bool:
+    # một entry chung cho mọi map (phạm vi None, đổi khi bất kỳ map nào đổi):
+    # hỏi map_id không tồn tại không thêm entry nào vào cache
+    return map_id in get_cached(session, None, "map_ids")
+
+
+def snapshot_kinds() -> List[str]:
+    """Các loại cache mà /route, /nl-route, /aliases/search cần với cấu hình hiện tại."""
+    kinds = ["names", "aliases", "landmarks", "floors"]
+    if ROUTING_ENGINE == "networkx":
+        kinds.append("nx")
+    else:
+        kinds += ["csr", "snap"]
+        if ROUTING_ALGORITHM in ("alt", "ch"):
+            kinds.append(ROUTING_ALGORITHM)
+    return kinds
+
+
+def warm_snapshots() -> int:
+    """Dựng sẵn snapshot của mọi map (gọi lúc khởi động); trả số map."""
+    kinds = snapshot_kinds()
+    with Session(read_engine) as session:
+        map_ids = session.exec(select(Map.id)).all()
+        get_cached(session, None, "map_ids")
+        get_cached(session, None, "aliases")
+        for map_id in map_ids:
+            for kind in kinds:
+                get_cached(session, map_id, kind)
+    return len(map_ids)
+
+
+# Lần chạy lại qua AsyncSession giữ lock dựng của graph_cache (threading.Lock) và
+# flock của artifact qua các await; coroutine khác trên cùng luồng event loop mà
+# chờ đúng lock đó sẽ treo cả loop. Lần thử từ snapshot không có await nào nên
+# chạy trọn giữa hai lần nhường; lock này chỉ bắt nó chờ khi đang có request đọc DB.
+_db_lock = asyncio.Lock()
+
+
+def _call_with_session(fn: Callable, args, kwargs):
+    with Session(read_engine) as session:
+        return fn(*args, session=session, **kwargs)
+
+
+def _from_snapshot(fn: Callable, args, kwargs):
+    """Chạy handler chỉ với snapshot; ném SnapshotMiss nếu cần đọc DB (đếm vào "fallback")."""
+    try:
+        res = fn(*args, session=SNAPSHOT_ONLY, **kwargs)
+    except SnapshotMiss:
+        _stats["fallback"] += 1
+        raise
+    _stats["snapshot"] += 1
+    return res
+
+
+async def serve(fn: Callable, *args, **kwargs):
+    """
+    Gọi handler sync `fn(*args, session=..., **kwargs)`: trước hết chỉ từ snapshot
+    (trên event loop), trượt thì chạy lại qua AsyncSession (hoặc threadpool nếu
+    không có driver async).
+    """
+    aengine = get_async_engine()
+    if aengine is None:
+        try:
+            return _from_snapshot(fn, args, kwargs)
+        except SnapshotMiss:
+            return await run_in_threadpool(_call_with_session, fn, args, kwargs)
+
+    async with _db_lock:
+        try:
+            return _from_snapshot(fn, args, kwargs)
+        except SnapshotMiss:
+            pass
+        async with AsyncSession(aengine) as session:
+            return await session.run_sync(lambda sync_session: fn(*args, session=sync_session, **kwargs))
+
+
+def serving_stats() -> Dict[str, Any]:
+    total = _stats["snapshot"] + _stats["fallback"]
+    return {**_stats, "snapshot_rate": (_stats["snapshot"] / total) if total else 0.0}
@@ -0,0 +1,298 @@
+"""
+Chỉ mục không gian dạng lưới đều (uniform grid) cho toạ độ pixel trên map.
+
+Mỗi ô lưới cạnh `cell` px giữ danh sách phần tử nằm trong ô; truy vấn theo bán
+kính chỉ duyệt các ô giao với hình vuông bao quanh vòng tròn tìm kiếm, truy vấn
+"gần nhất" không giới hạn thì duyệt các vòng ô loang dần từ ô chứa điểm và dừng
+khi vòng kế tiếp chắc chắn xa hơn kết quả tốt nhất.
+"""
+
+from array import array
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+import math
+
+from sqlmodel import Session, select
+
+from backend.models.entities import Node
+from backend.services.csr import get_csr
+from backend.services.graph_cache import register_builder, get_cached
+from backend.services.names import get_node_names
+from backend.utils.geo import project_point_to_segment
+
+T = TypeVar("T")
+Key = Tuple[int, int]
+
+
+class _Grid:
+    def __init__(self, cell: float):
+        self.cell = float(cell)
+        self.cells: Dict[Key, list] = {}
+        self.size = 0
+        # khung bao các ô có dữ liệu (imin, imax, jmin, jmax), tính lười khi truy vấn
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+
+    def _key(self, x: float, y: float) -> Key:
+        return (int(math.floor(x / self.cell)), int(math.floor(y / self.cell)))
+
+    def _put(self, key: Key, entry) -> None:
+        bucket = self.cells.get(key)
+        if bucket is None:
+            self.cells[key] = [entry]
+            self._bounds = None
+        else:
+            bucket.append(entry)
+
+    def _rings(self, x: float, y: float) -> Iterator[Tuple[float, list]]:
+        """
+        Các ô quanh (x,y) theo vòng vuông r = 0, 1, 2, ... (tới khi phủ hết khung bao).
+        Sinh (khoảng cách tối thiểu từ (x,y) tới mọi điểm của vòng, bucket).
+        """
+        if not self.cells:
+            return
+        if self._bounds is None:
+            iis = [k[0] for k in self.cells]
+            jjs = [k[1] for k in self.cells]
+            self._bounds = (min(iis), max(iis), min(jjs), max(jjs))
+        ci, cj = self._key(x, y)
+        imin, imax, jmin, jmax = self._bounds
+        r_max = max(ci - imin, imax - ci, cj - jmin, jmax - cj, 0)
+        cells = self.cells
+        for r in range(r_max + 1):
+            ring_d = max(0.0, (r - 1) * self.cell)
+            if r == 0:
+                keys: List[Key] = [(ci, cj)]
+            else:
+                keys = [(ci + d, cj - r) for d in range(-r, r + 1)]
+                keys += [(ci + d, cj + r) for d in range(-r, r + 1)]
+                keys += [(ci - r, cj + d) for d in range(-r + 1, r)]
+                keys += [(ci + r, cj + d) for d in range(-r + 1, r)]
+            for key in keys:
+                bucket = cells.get(key)
+                if bucket:
+                    yield ring_d, bucket
+
+
+class GridIndex(_Grid, Generic[T]):
+    """Lưới các điểm (x, y, item)."""
+
+    def __init__(self, cell: float = 64.0):
+        super().__init__(cell)
+
+    def add(self, x: float, y: float, item: T) -> None:
+        self._put(self._key(x, y), (x, y, item))
+        self.size += 1
+
+    def nearest(
+        self, x: float, y: float, radius: float
+    ) -> Optional[Tuple[T, float]]:
+        """Phần tử gần (x,y) nhất trong bán kính `radius` (tính cả biên), hoặc None."""
+        best: Optional[T] = None
+        best_d = math.inf
+        i0, j0 = self._key(x - radius, y - radius)
+        i1, j1 = self._key(x + radius, y + radius)
+        cells = self.cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                bucket = cells.get((i, j))
+                if not bucket:
+                    continue
+                for px, py, item in bucket:
+                    d = math.hypot(px - x, py - y)
+                    if d <= radius and d < best_d:
+                        best = item
+                        best_d = d
+        if best is None:
+            return None
+        return best, best_d
+
+    def nearest_any(self, x: float, y: float) -> Optional[Tuple[T, float]]:
+        """Phần tử gần (x,y) nhất, không giới hạn bán kính."""
+        best: Optional[T] = None
+        best_d = math.inf
+        for ring_d, bucket in self._rings(x, y):
+            if ring_d > best_d:
+                break
+            for px, py, item in bucket:
+                d = math.hypot(px - x, py - y)
+                if d < best_d:
+                    best = item
+                    best_d = d
+        if best is None:
+            return None
+        return best, best_d
+
+
+class SegmentGrid(_Grid, Generic[T]):
+    """Lưới các đoạn thẳng (a, b, item); mỗi đoạn nằm trong mọi ô mà hộp bao của nó chạm tới."""
+
+    def __init__(self, cell: float = 64.0):
+        super().__init__(cell)
+
+    def add(self, ax: float, ay: float, bx: float, by: float, item: T) -> None:
+        c = self.cell
+        i0, i1 = int(min(ax, bx) // c), int(max(ax, bx) // c)
+        j0, j1 = int(min(ay, by) // c), int(max(ay, by) // c)
+        entry = ((ax, ay), (bx, by), item)
+        self.size += 1
+        if i0 == i1 and j0 == j1:
+            bucket = self.cells.get((i0, j0))
+            if bucket is not None:
+                bucket.append(entry)
+            else:
+                self._put((i0, j0), entry)
+            return
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                self._put((i, j), entry)
+
+    def nearest_any(self, x: float, y: float) -> Optional[Tuple[T, Tuple[float, float], float]]:
+        """Đoạn gần (x,y) nhất: (item, điểm chiếu trên đoạn, khoảng cách), hoặc None."""
+        best = None
+        best_d = math.inf
+        p = (x, y)
+        for ring_d, bucket in self._rings(x, y):
+            if ring_d > best_d:
+                break
+            for a, b, item in bucket:
+                _t, q, d = project_point_to_segment(p, a, b)
+                if d < best_d:
+                    best = (item, q)
+                    best_d = d
+        if best is None:
+            return None
+        return best[0], best[1], best_d
+
+
+# ------- Snap index: (cx, cy) -> node / điểm trên cạnh gần nhất -------
+
+# Cạnh ô lưới ~ 2 lần khoảng cách trung bình giữa các đoạn, kẹp trong khoảng này (px)
+SNAP_CELL_MIN = 8.0
+SNAP_CELL_MAX = 256.0
+
+
+class SnapIndex:
+    """
+    Theo từng tầng: lưới node (theo chỉ số CSR) và lưới đoạn polyline cạnh (theo slot
+    CSR) của map, kèm 2 đầu + trọng số mỗi slot để dựng node ảo trên cạnh. Các tầng
+    chồng lên nhau cùng toạ độ nên mỗi truy vấn chỉ xét một tầng (floor=None: mọi tầng).
+    """
+
+    __slots__ = ("cell", "nodes", "segments", "slot_u", "slot_v", "slot_w")
+
+    def __init__(self, cell: float = 64.0):
+        self.cell = cell
+        self.nodes: Dict[int, GridIndex[int]] = {}
+        self.segments: Dict[int, SegmentGrid[int]] = {}
+        self.slot_u = array("q")
+        self.slot_v = array("q")
+        self.slot_w = array("d")
+
+    def add_node(self, floor: int, x: float, y: float, i: int) -> None:
+        grid = self.nodes.get(floor)
+        if grid is None:
+            grid = self.nodes[floor] = GridIndex(self.cell)
+        grid.add(x, y, i)
+
+    def add_segment(self, floor: int, ax: float, ay: float, bx: float, by: float, slot: int) -> None:
+        grid = self.segments.get(floor)
+        if grid is None:
+            grid = self.segments[floor] = SegmentGrid(self.cell)
+        grid.add(ax, ay, bx, by, slot)
+
+    @staticmethod
+    def _nearest(grids: Dict[int, _Grid], floor: Optional[int], x: float, y: float):
+        """(tầng, kết quả nearest_any) gần nhất trên tầng `floor` hoặc mọi tầng; khoảng cách ở cuối."""
+        best = None
+        for f in grids if floor is None else (floor,):
+            grid = grids.get(f)
+            hit = grid.nearest_any(x, y) if grid is not None else None
+            if hit is not None and (best is None or hit[-1] < best[1][-1]):
+                best = (f, hit)
+        return best
+
+    def nearest_node(self, x: float, y: float, floor: Optional[int] = None) -> Optional[Tuple[int, float]]:
+        """(chỉ số node CSR, khoảng cách) gần (x,y) nhất trên tầng `floor`."""
+        best = self._nearest(self.nodes, floor, x, y)
+        return best[1] if best is not None else None
+
+    def nearest_edge(
+        self, x: float, y: float, floor: Optional[int] = None
+    ) -> Optional[Tuple[int, Tuple[float, float], float]]:
+        """(slot cạnh, điểm chiếu trên cạnh, khoảng cách) gần (x,y) nhất trên tầng `floor`."""
+        best = self._nearest(self.segments, floor, x, y)
+        return best[1] if best is not None else None
+
+    def nearest_floor(self, x: float, y: float) -> Optional[int]:
+        """Tầng có node hoặc cạnh gần (x,y) nhất."""
+        hits = [h for h in (self._nearest(self.nodes, None, x, y), self._nearest(self.segments, None, x, y)) if h]
+        return min(hits, key=lambda h: h[1][-1])[0] if hits else None
+
+
+def build_snap_index(session: Session, map_id: int) -> SnapIndex:
+    g = get_csr(session, map_id)
+    n_seg = len(g.poly_xy) // 2 - g.num_edges
+    cell = SNAP_CELL_MAX
+    if g.num_nodes and n_seg > 0:
+        area = (max(g.xs) - min(g.xs) + 1.0) * (max(g.ys) - min(g.ys) + 1.0)
+        cell = min(SNAP_CELL_MAX, max(SNAP_CELL_MIN, 2.0 * math.sqrt(area / n_seg)))
+    idx = SnapIndex(cell)
+    floors = g.floors
+    for i in range(g.num_nodes):
+        idx.add_node(floors[i], g.xs[i], g.ys[i], i)
+
+    m = g.num_edges
+    idx.slot_u = array("q", [-1]) * m
+    idx.slot_v = array("q", [-1]) * m
+    idx.slot_w = array("d", [0.0]) * m
+    indptr, indices, arc_edge, weights = g.indptr, g.indices, g.arc_edge, g.weights
+    for u in range(g.num_nodes):
+        for a in range(indptr[u], indptr[u + 1]):
+            slot = arc_edge[a]
+            if idx.slot_u[slot] == -1:
+                idx.slot_u[slot] = u
+                idx.slot_v[slot] = indices[a]
+                idx.slot_w[slot] = weights[a]
+
+    xy, ptr, add = g.poly_xy, g.poly_ptr, idx.add_segment
+    for slot in range(m):
+        f = floors[idx.slot_u[slot]]
+        for k in range(ptr[slot], ptr[slot + 1] - 1):
+            add(f, xy[2 * k], xy[2 * k + 1], xy[2 * k + 2], xy[2 * k + 3], slot)
+    return idx
+
+
+register_builder("snap", build_snap_index)
+
+
+def get_snap_index(session: Session, map_id: int) -> SnapIndex:
+    return get_cached(session, map_id, "snap")
+
+
+# ------- Landmark index (cho build_instructions) -------
+
+
+def build_landmark_index(session: Session, map_id: int) -> Dict[int, GridIndex[str]]:
+    """
+    Theo từng tầng (như SnapIndex.nodes): lưới các Node.is_landmark của map, mỗi
+    phần tử là tên alias 'đẹp' nhất của node.
+    """
+    names = get_node_names(session, map_id)
+    rows = session.exec(
+        select(Node.id, Node.x, Node.y, Node.floor)
+        .where(Node.map_id == map_id)
+        .where(Node.is_landmark == True)
+    ).all()
+    index: Dict[int, GridIndex[str]] = {}
+    for nid, x, y, floor in rows:
+        grid = index.get(floor)
+        if grid is None:
+            grid = index[floor] = GridIndex(cell=80.0)
+        grid.add(x, y, names.get(nid, f"điểm {nid}"))
+    return index
+
+
+register_builder("landmarks", build_landmark_index)
+
+
+def get_landmark_index(session: Session, map_id: int) -> Dict[int, GridIndex[str]]:
+    return get_cached(session, map_id, "landmarks")
@@ -1,5 +1,8 @@
+from itertools import chain
+from typing import List, Sequence, Tuple
 import math
-from typing import List, Tuple
+
+import numpy as np
 
 Point = Tuple[float, float]
 
@@ -211,3 +214,191 @@ def initial_heading_text_from_angle(angle_deg: float) -> str:
         return "từ dưới lên"
     else:
         return "từ phải sang trái"
+
+
+def project_point_to_segment(p: Point, a: Point, b: Point) -> Tuple[float, Point, float]:
+    """
+    Chiếu p lên đoạn a-b. Trả (t trong [0,1], điểm chiếu, khoảng cách p -> điểm chiếu).
+    """
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    L2 = dx * dx + dy * dy
+    if L2 <= 1e-12:
+        t = 0.0
+    else:
+        t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / L2
+        t = max(0.0, min(1.0, t))
+    q = (a[0] + t * dx, a[1] + t * dy)
+    return t, q, math.hypot(p[0] - q[0], p[1] - q[1])
+
+
+def project_point_to_polyline(poly: List[Point], p: Point) -> Tuple[int, Point, float, float]:
+    """
+    Điểm gần p nhất trên polyline.
+    Trả (k: chỉ số đoạn poly[k]-poly[k+1], điểm chiếu, quãng đường từ poly[0] tới điểm chiếu,
+    khoảng cách p -> điểm chiếu).
+    """
+    best = (0, tuple(poly[0]), 0.0, dist(p, poly[0]))
+    along = 0.0
+    for k in range(len(poly) - 1):
+        a, b = poly[k], poly[k + 1]
+        t, q, d = project_point_to_segment(p, a, b)
+        seg = dist(a, b)
+        if d < best[3]:
+            best = (k, q, along + t * seg, d)
+        along += seg
+    return best
+
+
+# ------- Kernel vector hoá trên mảng (N, 2) float64 -------
+# Pipeline hậu xử lý tuyến (routers/routes.py) giữ một mảng liền khối từ lúc ghép
+# polyline tới lúc sinh hướng dẫn, thay vì đổi qua lại list/tuple và lặp từng đỉnh.
+
+
+def as_xy(poly: Sequence[Sequence[float]]) -> np.ndarray:
+    """Polyline [(x, y), ...] -> mảng (N, 2) float64 (N = 0 vẫn có shape (0, 2))."""
+    # fromiter trên dãy phẳng nhanh hơn np.asarray dò từng cặp lồng nhau
+    flat = np.fromiter(chain.from_iterable(poly), dtype=np.float64, count=2 * len(poly))
+    return flat.reshape(-1, 2)
+
+
+def merge_polys_xy(polys: List[List[Point]], tol: float = 1.5) -> np.ndarray:
+    """
+    Như merge_polys_with_tol nhưng trả mảng (N, 2): quyết định nối/đảo chỉ xét hai
+    đầu mút mỗi polyline, các đỉnh được chép một lần vào mảng kết quả.
+    """
+    pts: List[Point] = []
+    for poly in polys:
+        if not poly:
+            continue
+        if not pts:
+            pts.extend(poly)
+        elif almost_same(pts[-1], poly[0], tol):
+            pts.extend(poly[1:])
+        elif almost_same(pts[-1], poly[-1], tol):
+            pts.extend(poly[-2::-1])
+        else:
+            pts.extend(poly)
+    return as_xy(pts)
+
+
+def segment_lengths(xy: np.ndarray) -> np.ndarray:
+    """Độ dài N-1 đoạn liên tiếp."""
+    d = np.diff(xy, axis=0)
+    return np.hypot(d[:, 0], d[:, 1])
+
+
+def cumulative_distance(xy: np.ndarray) -> np.ndarray:
+    """Quãng đường từ đỉnh 0 tới từng đỉnh (N phần tử, bắt đầu bằng 0)."""
+    out = np.zeros(len(xy))
+    if len(xy) > 1:
+        np.cumsum(segment_lengths(xy), out=out[1:])
+    return out
+
+
+def dedupe_mask(xy: np.ndarray, tol: float = 1.0) -> np.ndarray:
+    """
+    Mặt nạ giữ đỉnh, cùng kết quả với dedupe_polyline: đỉnh được giữ nếu cách đỉnh
+    GIỮ gần nhất phía trước > tol. Phép so với đỉnh liền trước được vector hoá; chỉ
+    các đỉnh đứng sau một đỉnh bị bỏ mới phải so lại tuần tự.
+    """
+    n = len(xy)
+    keep = np.ones(n, dtype=bool)
+    if n < 2:
+        return keep
+    keep[1:] = segment_lengths(xy) > tol
+    drops = np.flatnonzero(~keep).tolist()
+    k = 0
+    while k < len(drops):
+        # mọi đỉnh trước drops[k] đã chốt, đỉnh liền trước nó được giữ
+        j = drops[k]
+        last = j - 1
+        lx, ly = xy.item(last, 0), xy.item(last, 1)
+        while j < n:
+            if math.hypot(xy.item(j, 0) - lx, xy.item(j, 1) - ly) > tol:
+                keep[j] = True
+                break
+            keep[j] = False
+            j += 1
+        # sau đỉnh j vừa giữ, phép so liền trước lại đúng tới đỉnh bỏ kế tiếp
+        while k < len(drops) and drops[k] <= j:
+            k += 1
+    return keep
+
+
+def turn_angles(xy: np.ndarray) -> np.ndarray:
+    """
+    Góc rẽ tại các đỉnh 1..N-2 (N-2 phần tử), như signed_turn_angle_screen:
+    độ trong (-180, 180], dương = rẽ phải trên màn hình (y hướng xuống).
+    """
+    if len(xy) < 3:
+        return np.zeros(0)
+    d = np.diff(xy, axis=0)
+    theta = np.arctan2(d[:, 1], d[:, 0])
+    a = np.degrees(theta[1:] - theta[:-1])
+    # |hiệu| <= 360 nên một lần cộng/trừ là đủ (giống vòng while của bản vô hướng)
+    a = np.where(a <= -180.0, a + 360.0, a)
+    return np.where(a > 180.0, a - 360.0, a)
+
+
+def heading_angle_xy(xy: np.ndarray, min_dist: float = 25.0) -> float:
+    """Như heading_angle_from_polyline trên mảng (N, 2) đã dedupe."""
+    if len(xy) < 2:
+        return 0.0
+    cum = cumulative_distance(xy)
+    k = int(np.searchsorted(cum, min_dist))
+    k = min(max(k, 1), len(xy) - 1)
+    ang = math.degrees(math.atan2(xy[k, 1] - xy[0, 1], xy[k, 0] - xy[0, 0]))
+    if ang <= -180.0:
+        ang += 360.0
+    return ang
+
+
+def simplify_mask(xy: np.ndarray, tol: float) -> np.ndarray:
+    """
+    Douglas-Peucker: mặt nạ các đỉnh giữ lại sao cho mọi đỉnh bỏ đi cách đoạn nối
+    hai đỉnh giữ bao quanh nó không quá tol px. Hai đầu luôn được giữ.
+    Mọi khoảng đang chờ chia được xử lý cùng lúc theo từng tầng đệ quy (một lượt
+    numpy mỗi tầng), nên chi phí Python tỉ lệ với độ sâu chứ không với số khoảng.
+    """
+    n = len(xy)
+    keep = np.zeros(n, dtype=bool)
+    if n <= 2 or tol <= 0:
+        keep[:] = True
+        return keep
+    keep[0] = keep[-1] = True
+    a = np.array([0])
+    b = np.array([n - 1])
+    while len(a):
+        inner = b - a - 1
+        live = inner > 0
+        a, b, inner = a[live], b[live], inner[live]
+        if not len(a):
+            break
+        # các đỉnh trong của mọi khoảng, nối liền: seg = khoảng chứa đỉnh
+        seg = np.repeat(np.arange(len(a)), inner)
+        starts = np.cumsum(inner) - inner
+        idx = np.arange(len(seg)) - starts[seg] + a[seg] + 1
+        p = xy[a][seg]
+        d = (xy[b] - xy[a])[seg]
+        v = xy[idx] - p
+        l2 = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]
+        t = np.divide(v[:, 0] * d[:, 0] + v[:, 1] * d[:, 1], l2, out=np.zeros(len(seg)), where=l2 > 0.0)
+        v -= np.clip(t, 0.0, 1.0)[:, None] * d
+        dist = np.hypot(v[:, 0], v[:, 1])
+        # đỉnh xa nhất của từng khoảng (đỉnh đầu tiên nếu bằng nhau)
+        best = np.maximum.reduceat(dist, starts)
+        hit = np.flatnonzero(dist == best[seg])
+        _u, first = np.unique(seg[hit], return_index=True)
+        far = idx[hit[first]]
+        split = best > tol
+        far, a, b = far[split], a[split], b[split]
+        keep[far] = True
+        a, b = np.concatenate((a, far)), np.concatenate((far, b))
+    return keep
+
+
+def simplify_polyline(poly: List[Point], tol: float) -> List[List[float]]:
+    """Douglas-Peucker trên polyline dạng list (vd. polyline cạnh lúc ghi)."""
+    xy = as_xy([(float(x), float(y)) for x, y in poly])
+    return xy[simplify_mask(xy, tol)].tolist()
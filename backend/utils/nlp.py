@@ -7,16 +7,22 @@ PATTERNS = [
     r"^(?P<a>.+?)\s*->\s*(?P<b>.+)$",
     r"(?:den|đến|toi|tới)\s+(?P<b>.+)\s+(?:tu|từ)\s+(?P<a>.+)$",
 ]
+# Trường hợp chỉ có "đến B" hoặc "tới B"
+TO_ONLY_PATTERN = r"(?:den|đến|toi|tới)\s+(?P<b>.+)$"
+
+# Biên dịch sẵn một lần (re.search với chuỗi mẫu phải tra cache regex mỗi lần gọi)
+_COMPILED = [re.compile(p, flags=re.IGNORECASE) for p in PATTERNS]
+_TO_ONLY = re.compile(TO_ONLY_PATTERN, flags=re.IGNORECASE)
 
 
 def extract_a_b(q: str) -> Tuple[Optional[str], Optional[str]]:
     s = q.strip()
-    for pat in PATTERNS:
-        m = re.search(pat, s, flags=re.IGNORECASE)
+    for pat in _COMPILED:
+        m = pat.search(s)
         if m:
             return (m.groupdict().get("a"), m.groupdict().get("b"))
     # Trường hợp chỉ có "đến B" hoặc "tới B": coi A = None
-    m2 = re.search(r"(?:den|đến|toi|tới)\s+(?P<b>.+)$", s, flags=re.IGNORECASE)
+    m2 = _TO_ONLY.search(s)
     if m2:
         return (None, m2.group("b"))
     # Không tách được
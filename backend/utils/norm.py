@@ -1,12 +1,15 @@
 import re
 from unidecode import unidecode
 
+_NON_NAME = re.compile(r"[^a-z0-9\s\-_/]")
+_SPACES = re.compile(r"\s+")
+
 
 def normalize_name(s: str) -> str:
     s = s.strip().lower()
     s = unidecode(s)
-    s = re.sub(r"[^a-z0-9\s\-_/]", " ", s)
-    s = re.sub(r"\s+", " ", s)
+    s = _NON_NAME.sub(" ", s)
+    s = _SPACES.sub(" ", s)
     # một vài thay thế đồng nghĩa cơ bản
     s = s.replace("toa ", "toa ").replace("toà ", "toa ")
     s = s.replace("nha ", "toa ").replace("khoi ", "khu ")
@@ -0,0 +1,143 @@
+"""
+Mã hoá polyline gọn (như "encoded polyline" của Google Maps) cho client di động.
+
+Mỗi toạ độ được làm tròn tới `precision` chữ số thập phân (1 = 0.1 px), lấy hiệu
+với điểm trước (x, y xen kẽ: x0, y0, dx1, dy1, ...), zigzag để số âm thành số
+dương nhỏ, rồi viết varint 5 bit/ký tự (bit 0x20 = còn tiếp) cộng 63 thành ký tự
+ASCII in được - an toàn trong JSON, không cần escape.
+Cả hai chiều đều vector hoá bằng NumPy, không lặp từng điểm.
+
+Cũng ở đây: dạng lưu của Edge.polyline_xy - blob float64 little-endian
+x0, y0, x1, y1, ... (16 byte/đỉnh), đọc thẳng bằng array.frombytes/np.frombuffer.
+"""
+
+from array import array
+from itertools import chain
+from typing import List, Sequence, Tuple, Union
+import sys
+
+import numpy as np
+
+# một số nguyên 64 bit cần tối đa 13 nhóm 5 bit
+_MAX_CHUNKS = 13
+_SHIFTS = np.arange(_MAX_CHUNKS, dtype=np.uint64) * np.uint64(5)
+
+
+def _zigzag_chunks(d: np.ndarray) -> Tuple[bytes, np.ndarray]:
+    """Các hiệu nguyên -> (chuỗi ký tự varint, số ký tự của từng giá trị)."""
+    v = ((d << 1) ^ (d >> 63)).astype(np.uint64)  # zigzag: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ...
+    groups = v[:, None] >> _SHIFTS
+    # số nhóm 5 bit của mỗi giá trị = vị trí nhóm khác 0 cao nhất + 1 (ít nhất 1)
+    count = np.maximum(_MAX_CHUNKS - np.argmax((groups != 0)[:, ::-1], axis=1), 1)
+    count[v == 0] = 1
+    k = np.arange(_MAX_CHUNKS)
+    more = (k < (count - 1)[:, None]).astype(np.uint64) << np.uint64(5)
+    out = ((groups & np.uint64(31)) | more) + np.uint64(63)
+    return out[k < count[:, None]].astype(np.uint8).tobytes(), count
+
+
+def _encode_flat(flat: np.ndarray, lens: np.ndarray, precision: int) -> List[str]:
+    """Toạ độ phẳng x0, y0, x1, y1, ... của nhiều polyline (lens = số đỉnh mỗi cái) -> chuỗi."""
+    if not len(flat):
+        return [""] * len(lens)
+    q = np.round(flat * 10.0 ** precision).astype(np.int64)
+    d = np.empty_like(q)
+    d[:2] = q[:2]
+    d[2:] = q[2:] - q[:-2]
+    first = 2 * (np.cumsum(lens) - lens)[lens > 0]
+    d[first] = q[first]
+    d[first + 1] = q[first + 1]
+    data, count = _zigzag_chunks(d)
+    text = data.decode("ascii")
+    ends = np.concatenate(([0], np.cumsum(count)))[2 * np.cumsum(lens)].tolist()
+    out = []
+    prev = 0
+    for e in ends:
+        out.append(text[prev:e])
+        prev = e
+    return out
+
+
+def encode_polylines(
+    polys: Sequence[Sequence[Sequence[float]]], precision: int = 1
+) -> List[str]:
+    """
+    Mã hoá nhiều polyline trong một lượt NumPy (vd. GET /edges): hiệu toạ độ bắt
+    đầu lại từ 0 ở đầu mỗi polyline, chuỗi kết quả được cắt theo số ký tự.
+    """
+    lens = np.fromiter((len(p) for p in polys), dtype=np.int64, count=len(polys))
+    flat = np.fromiter(
+        chain.from_iterable(chain.from_iterable(polys)), dtype=np.float64, count=2 * int(lens.sum())
+    )
+    return _encode_flat(flat, lens, precision)
+
+
+def encode_polyline_blobs(blobs: Sequence[bytes], precision: int = 1) -> List[str]:
+    """Như encode_polylines nhưng từ blob Edge.polyline_xy (không dựng list điểm)."""
+    lens = np.fromiter((len(b) // 16 for b in blobs), dtype=np.int64, count=len(blobs))
+    return _encode_flat(np.frombuffer(b"".join(blobs), dtype="<f8"), lens, precision)
+
+
+def encode_polyline(poly: Union[np.ndarray, Sequence[Sequence[float]]], precision: int = 1) -> str:
+    """Polyline [[x, y], ...] hoặc mảng (N, 2) -> chuỗi mã hoá."""
+    if not isinstance(poly, np.ndarray):
+        return encode_polylines([poly], precision)[0]  # fromiter nhanh hơn asarray trên list
+    xy = poly.astype(np.float64, copy=False).reshape(-1)
+    if not len(xy):
+        return ""
+    q = np.round(xy * 10.0 ** precision).astype(np.int64)
+    d = np.empty_like(q)
+    d[:2] = q[:2]
+    d[2:] = q[2:] - q[:-2]
+    return _zigzag_chunks(d)[0].decode("ascii")
+
+
+def decode_polyline(text: str, precision: int = 1) -> np.ndarray:
+    """Chuỗi mã hoá -> mảng (N, 2) float64 (ngược lại encode_polyline)."""
+    b = np.frombuffer(text.encode("ascii"), dtype=np.uint8).astype(np.uint64) - np.uint64(63)
+    if not len(b):
+        return np.zeros((0, 2))
+    ends = np.flatnonzero((b & np.uint64(0x20)) == 0)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    group = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shift = (np.arange(len(b)) - starts[group]).astype(np.uint64) * np.uint64(5)
+    v = np.add.reduceat((b & np.uint64(31)) << shift, starts)  # các nhóm không chồng bit
+    d = (v >> np.uint64(1)).astype(np.int64) ^ -(v & np.uint64(1)).astype(np.int64)
+    q = np.empty_like(d)
+    q[0::2] = np.cumsum(d[0::2])
+    q[1::2] = np.cumsum(d[1::2])
+    return (q / 10.0 ** precision).reshape(-1, 2)
+
+
+def pack_polyline(poly: Sequence[Sequence[float]]) -> bytes:
+    """[[x, y], ...] -> blob Edge.polyline_xy."""
+    a = array("d", chain.from_iterable(poly))
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a.tobytes()
+
+
+def polyline_xy(blob: bytes) -> array:
+    """Blob Edge.polyline_xy -> array("d") phẳng x0, y0, x1, y1, ... (một lần chép bộ nhớ)."""
+    a = array("d")
+    a.frombytes(blob)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+
+def unpack_polylines(blobs: Sequence[bytes]) -> List[List[List[float]]]:
+    """Nhiều blob -> các polyline [[x, y], ...] (một np.frombuffer + tolist cho cả lô)."""
+    pts = np.frombuffer(b"".join(blobs), dtype="<f8").reshape(-1, 2).tolist()
+    out = []
+    prev = 0
+    for b in blobs:
+        end = prev + len(b) // 16
+        out.append(pts[prev:end])
+        prev = end
+    return out
+
+
+def unpack_polyline(blob: bytes) -> List[List[float]]:
+    """Blob Edge.polyline_xy -> [[x, y], ...]."""
+    return np.frombuffer(blob, dtype="<f8").reshape(-1, 2).tolist()
@@ -274,7 +274,7 @@ goBtn.addEventListener("click", async () => {
 			const sug = new Set();
 			for (const p of uniq) {
 				const s = await fetchJSON(
-					`/aliases/search?q=${encodeURIComponent(p)}`
+					`/aliases/search?q=${encodeURIComponent(p)}&map_id=${currentMap.id}`
 				);
 				s.forEach((it) =>
 					sug.add(`${p} → #node ${it.node_id} (${it.name})`)